@@ -1,7 +1,13 @@
 from django.contrib import admin, messages
-from django.core.exceptions import ValidationError
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.db.models import BooleanField, Exists, ExpressionWrapper, OuterRef, Q, QuerySet, Subquery
+from django.db.models.functions import Now
+from django.template.response import TemplateResponse
+from django.urls import reverse
 from django.utils.html import format_html
-from reservations.models import Link, Order, StorageUnit, User, Warehouse
+from reservations.dashboard import get_dashboard_stats
+from reservations.models import Link, LinkClickDay, Order, Statistics, StorageUnit, User, Warehouse
+from reservations.pagination import LargeTablePaginator
 
 
 class OrderInline(admin.TabularInline):
@@ -42,9 +48,21 @@ class UserAdmin(admin.ModelAdmin):
 class OrderAdmin(admin.ModelAdmin):
     """Админ-интерфейс для модели заказа.
 
+    Пользователь, ячейка и склад загружаются вместе с заказами, а занятость
+    ячейки, стоимость и просрочка считаются в базе, поэтому страница списка
+    строится постоянным числом запросов и по этим колонкам можно сортировать.
+    Количество заказов берется из кэша или оценки (LargeTablePaginator), а по
+    умолчанию заказы сортируются по индексу даты начала аренды.
+
     Атрибуты:
         list_display (tuple): Поля для отображения в списке заказов.
         list_filter (tuple): Поля для фильтрации заказов.
+        list_select_related (tuple): Связанные объекты, загружаемые вместе с заказами.
+        ordering (tuple): Сортировка по умолчанию по индексу даты начала (новые заказы первыми).
+        date_hierarchy (str): Индексированная дата для навигации по периодам.
+        change_list_template (str): Шаблон списка с навигацией по датам через индекс.
+        paginator (type): Пагинатор без полного пересчета таблицы.
+        show_full_result_count (bool): Не считать все заказы при включенном фильтре.
     """
     list_display: tuple = (
         'user_name',
@@ -60,6 +78,27 @@ class OrderAdmin(admin.ModelAdmin):
         'is_unit_occupied'
     )
     list_filter: tuple = ('status', )
+    list_select_related: tuple = ('user', 'storage_unit__warehouse')
+    ordering: tuple = ('-start_date', '-order_id')
+    date_hierarchy: str = 'start_date'
+    change_list_template: str = 'order_change_list.html'
+    paginator = LargeTablePaginator
+    show_full_result_count: bool = False
+
+    def get_queryset(self, request) -> QuerySet:
+        """Добавляет к заказам занятость ячейки, стоимость и просрочку, посчитанные в базе.
+
+        Args:
+            request (HttpRequest): Запрос пользователя.
+
+        Returns:
+            QuerySet: Заказы с вычисляемыми полями.
+        """
+        unit_active_orders = Order.objects.filter(storage_unit=OuterRef('storage_unit'), status='active')
+        return super().get_queryset(request).with_total_cost().annotate(
+            unit_has_active_orders=Exists(unit_active_orders),
+            is_overdue=ExpressionWrapper(Q(end_date__lt=Now()), output_field=BooleanField()),
+        )
 
     def is_unit_occupied(self, obj: Order) -> bool:
         """Проверяет, занята ли ячейка хранения.
@@ -70,9 +109,10 @@ class OrderAdmin(admin.ModelAdmin):
         Returns:
             bool: True, если ячейка занята; иначе False.
         """
-        return obj.storage_unit.has_active_orders()
+        return obj.unit_has_active_orders
     is_unit_occupied.boolean = True
     is_unit_occupied.short_description = 'Ячейка занята'
+    is_unit_occupied.admin_order_field = 'unit_has_active_orders'
 
     def user_name(self, obj: Order) -> str:
         """Возвращает полное имя пользователя.
@@ -85,6 +125,7 @@ class OrderAdmin(admin.ModelAdmin):
         """
         return obj.user.name
     user_name.short_description = 'ФИО'
+    user_name.admin_order_field = 'user__name'
 
     def user_phone(self, obj: Order) -> str:
         """Возвращает телефон пользователя.
@@ -97,6 +138,7 @@ class OrderAdmin(admin.ModelAdmin):
         """
         return obj.user.phone_number
     user_phone.short_description = 'Телефон'
+    user_phone.admin_order_field = 'user__phone_number'
 
     def storage_unit(self, obj: Order) -> StorageUnit:
         """Возвращает ячейку хранения для заказа.
@@ -109,18 +151,20 @@ class OrderAdmin(admin.ModelAdmin):
         """
         return obj.storage_unit
     storage_unit.short_description = 'Ячейка хранения'
+    storage_unit.admin_order_field = 'storage_unit'
 
-    def total_cost(self, obj: Order) -> float:
+    def total_cost(self, obj: Order) -> int:
         """Возвращает общую стоимость заказа.
 
         Args:
             obj (Order): Объект заказа.
 
         Returns:
-            Decimal: Общая стоимость заказа.
+            int: Общая стоимость заказа.
         """
-        return obj.calculated_total_cost
+        return obj.total_cost_value
     total_cost.short_description = 'Стоимость'
+    total_cost.admin_order_field = 'total_cost_value'
 
     def get_warehouse(self, obj: Order) -> str:
         """Возвращает склад, к которому относится ячейка хранения.
@@ -133,6 +177,7 @@ class OrderAdmin(admin.ModelAdmin):
         """
         return obj.storage_unit.warehouse.name if obj.storage_unit else "Нет склада"
     get_warehouse.short_description = 'Склад'
+    get_warehouse.admin_order_field = 'storage_unit__warehouse__name'
 
     def status_display(self, obj: Order) -> str:
         """Возвращает статус заказа, выделяя просроченный.
@@ -143,10 +188,11 @@ class OrderAdmin(admin.ModelAdmin):
         Returns:
             str: Статус заказа с возможным выделением.
         """
-        if obj.is_expired():
+        if obj.is_overdue:
             return format_html('<span style="color: red;">{}</span>', 'Просрочен')
         return obj.get_status_display()
     status_display.short_description = 'Статус заказа'
+    status_display.admin_order_field = 'status'
 
     def save_model(self, request, obj: Order, form, change: bool) -> None:
         """Сохраняет заказ и отображает соответствующие сообщения.
@@ -164,28 +210,20 @@ class OrderAdmin(admin.ModelAdmin):
             messages.error(request, str(e))
 
     def delete_model(self, request, obj: Order) -> None:
-        """Освобождает ячейку перед удалением заказа.
+        """Удаляет заказ и сообщает, если его ячейка освободилась.
+
+        Занятость ячейки пересчитывает Order.delete.
 
         Args:
             request (HttpRequest): Запрос пользователя.
             obj (Order): Объект заказа.
         """
-        if obj.storage_unit.is_occupied:
-            obj.release_storage_unit()
-            messages.success(request, "Ячейка успешно освобождена.")
+        unit = obj.storage_unit
+        was_occupied = unit.is_occupied
         super().delete_model(request, obj)
-
-    def reminder_date(self, obj: Order) -> str:
-        """Возвращает дату напоминания для заказа.
-
-        Args:
-            obj (Order): Объект заказа.
-
-        Returns:
-            date: Дата напоминания.
-        """
-        return obj.reminder_date()
-    reminder_date.short_description = 'Дата напоминалки'
+        unit.refresh_from_db(fields=['is_occupied'])
+        if was_occupied and not unit.is_occupied:
+            messages.success(request, "Ячейка успешно освобождена.")
 
 
 @admin.register(Warehouse)
@@ -198,12 +236,46 @@ class WarehouseAdmin(admin.ModelAdmin):
     ordering: tuple = ('warehouse_id', 'name',)
 
 
+class UnitOccupancyFilter(admin.SimpleListFilter):
+    """Фильтр ячеек хранения по наличию активного заказа."""
+    title = 'Статус занятости'
+    parameter_name = 'occupied'
+
+    def lookups(self, request, model_admin) -> tuple:
+        """Возвращает варианты фильтра."""
+        return (('yes', 'Занята'), ('no', 'Свободна'))
+
+    def queryset(self, request, queryset: QuerySet) -> QuerySet:
+        """Отбирает ячейки по занятости, посчитанной в StorageUnitAdmin.get_queryset.
+
+        Args:
+            request (HttpRequest): Запрос пользователя.
+            queryset (QuerySet): Ячейки хранения.
+
+        Returns:
+            QuerySet: Отфильтрованные ячейки.
+        """
+        if self.value() == 'yes':
+            return queryset.filter(has_active_order=True)
+        if self.value() == 'no':
+            return queryset.filter(has_active_order=False)
+        return queryset
+
+
 @admin.register(StorageUnit)
 class StorageUnitAdmin(admin.ModelAdmin):
     """Админ-интерфейс для модели ячейки хранения.
 
+    Занятость ячейки и имя арендатора считаются подзапросами в базе, поэтому
+    страница списка строится постоянным числом запросов.
+
     Атрибуты:
         list_display (tuple): Поля для отображения в списке ячеек хранения.
+        list_filter (tuple): Фильтры по складу, размеру и занятости.
+        list_select_related (tuple): Связанные объекты, загружаемые вместе с ячейками.
+        ordering (tuple): Сортировка по умолчанию по первичному ключу.
+        paginator (type): Пагинатор без полного пересчета таблицы.
+        show_full_result_count (bool): Не считать все ячейки при включенном фильтре.
     """
     list_display: tuple = (
         'unit_id',
@@ -212,6 +284,26 @@ class StorageUnitAdmin(admin.ModelAdmin):
         'get_occupied_status',
         'get_user_name',
     )
+    list_filter: tuple = ('warehouse', 'size', UnitOccupancyFilter)
+    list_select_related: tuple = ('warehouse',)
+    ordering: tuple = ('unit_id',)
+    paginator = LargeTablePaginator
+    show_full_result_count: bool = False
+
+    def get_queryset(self, request) -> QuerySet:
+        """Добавляет к ячейкам наличие активного заказа и имя арендатора.
+
+        Args:
+            request (HttpRequest): Запрос пользователя.
+
+        Returns:
+            QuerySet: Ячейки с вычисляемыми полями.
+        """
+        active_orders = Order.objects.filter(storage_unit=OuterRef('pk'), status='active')
+        return super().get_queryset(request).annotate(
+            has_active_order=Exists(active_orders),
+            tenant_name=Subquery(active_orders.order_by('order_id').values('user__name')[:1]),
+        )
 
     def get_occupied_status(self, obj: StorageUnit) -> str:
         """Возвращает статус занятости ячейки.
@@ -222,9 +314,10 @@ class StorageUnitAdmin(admin.ModelAdmin):
         Returns:
             str: 'Занята' или 'Свободна'.
         """
-        return "Занята" if obj.has_active_orders() else "Свободна"
+        return "Занята" if obj.has_active_order else "Свободна"
 
     get_occupied_status.short_description = 'Статус занятости'
+    get_occupied_status.admin_order_field = 'has_active_order'
 
     def get_user_name(self, obj: StorageUnit) -> str:
         """Возвращает имя пользователя, если ячейка занята.
@@ -235,12 +328,71 @@ class StorageUnitAdmin(admin.ModelAdmin):
         Returns:
             str: Имя пользователя или 'Нет'.
         """
-        active_order = Order.objects.filter(
-            storage_unit=obj, status='active'
-        ).first()
-        return active_order.user.name if active_order else "Нет"
+        return obj.tenant_name or "Нет"
 
     get_user_name.short_description = 'Кем занята'
+    get_user_name.admin_order_field = 'tenant_name'
+
+
+@admin.register(Statistics)
+class StatisticsAdmin(admin.ModelAdmin):
+    """Страница сводки по складам и заказам.
+
+    Вместо списка заказов показывает занятость ячеек по складам и размерам,
+    заказы по статусам, ожидаемую выручку и ближайшие окончания аренды.
+    Сводка считается несколькими агрегирующими запросами и кэшируется
+    (см. reservations.dashboard).
+
+    Атрибуты:
+        change_list_template (str): Шаблон страницы сводки.
+    """
+    change_list_template: str = 'statistics_change_list.html'
+
+    def has_add_permission(self, request) -> bool:
+        """Запрещает добавление: у сводки нет своих записей."""
+        return False
+
+    def has_change_permission(self, request, obj=None) -> bool:
+        """Запрещает изменение: заказы редактируются на своей странице."""
+        return False
+
+    def has_delete_permission(self, request, obj=None) -> bool:
+        """Запрещает удаление: заказы удаляются на своей странице."""
+        return False
+
+    def changelist_view(self, request, extra_context=None) -> TemplateResponse:
+        """Показывает сводку без построения списка заказов.
+
+        Args:
+            request (HttpRequest): Запрос пользователя.
+            extra_context (dict, optional): Дополнительный контекст шаблона.
+
+        Returns:
+            TemplateResponse: Страница сводки.
+        """
+        if not self.has_view_or_change_permission(request):
+            raise PermissionDenied
+        context = {
+            **self.admin_site.each_context(request),
+            'title': self.model._meta.verbose_name_plural,
+            'opts': self.model._meta,
+            'stats': get_dashboard_stats(),
+            **(extra_context or {}),
+        }
+        return TemplateResponse(request, self.change_list_template, context)
+
+
+class LinkClickDayInline(admin.TabularInline):
+    """Inline для отображения переходов по короткой ссылке по дням (только чтение)."""
+    model = LinkClickDay
+    fields = ('day', 'clicks')
+    readonly_fields = ('day', 'clicks')
+    ordering = ('-day',)
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None) -> bool:
+        return False
 
 
 @admin.register(Link)
@@ -249,5 +401,18 @@ class LinkAdmin(admin.ModelAdmin):
 
     Атрибуты:
         list_display (tuple): Поля для отображения в списке ссылок.
+        readonly_fields (tuple): Короткая ссылка и переходы, которые нельзя изменить вручную.
+        inlines (list): Переходы по короткой ссылке по дням.
     """
-    list_display: tuple = ('original_url', 'short_url', 'click_count')
+    list_display: tuple = (
+        'original_url', 'short_url', 'click_count', 'stats_updated_at', 'redirect_path', 'redirect_clicks'
+    )
+    readonly_fields: tuple = ('redirect_path', 'redirect_clicks')
+    inlines: list = [LinkClickDayInline]
+
+    def redirect_path(self, obj: Link) -> str:
+        """Возвращает адрес собственной короткой ссылки."""
+        return reverse('link_redirect', args=[obj.code]) if obj.code else '-'
+
+    redirect_path.short_description = 'Короткая ссылка'
+    redirect_path.admin_order_field = 'code'
@@ -0,0 +1,314 @@
+import logging
+import random
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Type
+
+from django.core.exceptions import ValidationError
+from django.db import OperationalError, transaction
+from django.db.models import QuerySet
+
+from reservations.availability import available_units
+from reservations.models import FreeUnitCounter, Order, StorageUnit, User
+
+logger = logging.getLogger(__name__)
+
+# Сколько ячеек-кандидатов выбирать за один раз
+DEFAULT_CANDIDATES = 5
+# Сколько ячеек пробовать забронировать, если их одновременно занимают другие заказы
+DEFAULT_RESERVE_ATTEMPTS = 5
+
+
+@contextmanager
+def reservation_transaction() -> Iterator[None]:
+    """Открывает транзакцию бронирования, которая в SQLite сразу берет блокировку на запись.
+
+    Внешняя транзакция начинается с BEGIN IMMEDIATE, поэтому выбор ячейки и
+    создание заказа не разделяются другой записью, а ожидание блокировки
+    ограничено таймаутом базы. Остальные транзакции (например, в админке)
+    остаются отложенными и не блокируют базу на запись при чтении.
+    """
+    connection = transaction.get_connection()
+    if connection.vendor != 'sqlite' or connection.in_atomic_block:
+        with transaction.atomic():
+            yield
+        return
+
+    # Режим транзакции задается при подключении, поэтому подключаемся заранее
+    connection.ensure_connection()
+    previous_mode = connection.transaction_mode
+    connection.transaction_mode = 'IMMEDIATE'
+    try:
+        with transaction.atomic():
+            # BEGIN IMMEDIATE уже выполнен, вложенные транзакции - точки сохранения
+            connection.transaction_mode = previous_mode
+            yield
+    finally:
+        connection.transaction_mode = previous_mode
+
+
+class AllocationStrategy:
+    """Стратегия выбора ячеек для нового заказа.
+
+    Получает свободные на период ячейки (запрос без выполнения) и возвращает
+    несколько кандидатов в порядке предпочтения. Запрос ограничивается LIMIT,
+    поэтому в память никогда не загружаются все свободные ячейки.
+
+    Методы:
+        choose(units, limit, size, warehouse_id): Возвращает ячейки-кандидаты.
+    """
+    name = ''
+
+    def choose(
+        self,
+        units: QuerySet,
+        limit: int,
+        size: Optional[str] = None,
+        warehouse_id: Optional[int] = None,
+    ) -> List[StorageUnit]:
+        """Возвращает до `limit` ячеек-кандидатов в порядке предпочтения.
+
+        Args:
+            units (QuerySet): Ячейки, свободные на запрошенный период.
+            limit (int): Максимальное количество кандидатов.
+            size (str, optional): Размер ячеек.
+            warehouse_id (int, optional): ID склада.
+
+        Returns:
+            List[StorageUnit]: Ячейки-кандидаты.
+        """
+        raise NotImplementedError
+
+
+class FirstFitStrategy(AllocationStrategy):
+    """Выбирает свободные ячейки с наименьшими ID."""
+    name = 'first_fit'
+
+    def choose(self, units, limit, size=None, warehouse_id=None):
+        return list(units.order_by('unit_id')[:limit])
+
+
+class RandomStrategy(AllocationStrategy):
+    """Выбирает свободные ячейки, начиная со случайного ID.
+
+    Случайная точка берется между минимальным и максимальным ID всех ячеек
+    (по индексу первичного ключа, без проверки занятости), дальше свободные
+    ячейки выбираются по первичному ключу от этой точки по кругу.
+    """
+    name = 'random'
+
+    def choose(self, units, limit, size=None, warehouse_id=None):
+        # Отдельные запросы к краям индекса: MIN и MAX в одном запросе SQLite считает полным сканом
+        unit_ids = StorageUnit.objects.order_by('unit_id').values_list('unit_id', flat=True)
+        min_id, max_id = unit_ids.first(), unit_ids.last()
+        if min_id is None:
+            return []
+        pivot = random.randint(min_id, max_id)
+        chosen = list(units.filter(unit_id__gte=pivot).order_by('unit_id')[:limit])
+        if len(chosen) < limit:
+            chosen += list(units.filter(unit_id__lt=pivot).order_by('unit_id')[:limit - len(chosen)])
+        return chosen
+
+
+class LoadBalancingStrategy(AllocationStrategy):
+    """Выбирает ячейки на складах, где больше всего свободных ячеек.
+
+    Склады упорядочиваются по счетчикам свободных ячеек, внутри склада
+    ячейки выбираются с наименьшими ID.
+    """
+    name = 'load_balancing'
+
+    def choose(self, units, limit, size=None, warehouse_id=None):
+        counters = FreeUnitCounter.objects.filter(free_count__gt=0)
+        if size is not None:
+            counters = counters.filter(size=size)
+        if warehouse_id is not None:
+            counters = counters.filter(warehouse_id=warehouse_id)
+
+        free_by_warehouse: Dict[int, int] = {}
+        for counter_warehouse_id, free_count in counters.values_list('warehouse_id', 'free_count'):
+            free_by_warehouse[counter_warehouse_id] = free_by_warehouse.get(counter_warehouse_id, 0) + free_count
+
+        chosen: List[StorageUnit] = []
+        for counter_warehouse_id in sorted(free_by_warehouse, key=free_by_warehouse.get, reverse=True):
+            chosen += list(
+                units.filter(warehouse_id=counter_warehouse_id).order_by('unit_id')[:limit - len(chosen)]
+            )
+            if len(chosen) >= limit:
+                break
+        return chosen
+
+
+STRATEGIES: Dict[str, Type[AllocationStrategy]] = {
+    strategy.name: strategy
+    for strategy in (RandomStrategy, FirstFitStrategy, LoadBalancingStrategy)
+}
+
+
+class UnitAllocator:
+    """Подбор ячеек для новых заказов по размеру, складу и периоду хранения.
+
+    Атрибуты:
+        strategy (AllocationStrategy): Стратегия выбора ячеек.
+
+    Методы:
+        candidates(start_date, end_date, size, warehouse_id, limit): Ячейки-кандидаты.
+        allocate(start_date, end_date, size, warehouse_id): Лучшая свободная ячейка.
+        reserve(user, start_date, storage_duration, size, warehouse_id): Бронирует ячейку.
+        stats(): Возвращает метрики конкуренции за ячейки.
+    """
+
+    def __init__(self, strategy: AllocationStrategy) -> None:
+        self.strategy = strategy
+        self._stats_lock = threading.Lock()
+        self._stats = {'reserved': 0, 'conflicts': 0, 'lock_timeouts': 0, 'exhausted': 0}
+
+    def _count(self, metric: str) -> None:
+        with self._stats_lock:
+            self._stats[metric] += 1
+
+    def candidates(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        size: Optional[str] = None,
+        warehouse_id: Optional[int] = None,
+        limit: int = DEFAULT_CANDIDATES,
+    ) -> List[StorageUnit]:
+        """Возвращает ячейки, свободные на период [start_date, end_date), в порядке предпочтения.
+
+        Args:
+            start_date (datetime): Начало периода.
+            end_date (datetime): Конец периода (не включается).
+            size (str, optional): Размер ячеек.
+            warehouse_id (int, optional): ID склада.
+            limit (int): Максимальное количество кандидатов.
+
+        Returns:
+            List[StorageUnit]: Ячейки-кандидаты вместе со складами.
+        """
+        units = available_units(start_date, end_date, size=size, warehouse_id=warehouse_id)
+        return self.strategy.choose(
+            units.select_related('warehouse'), limit, size=size, warehouse_id=warehouse_id
+        )
+
+    def allocate(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        size: Optional[str] = None,
+        warehouse_id: Optional[int] = None,
+    ) -> Optional[StorageUnit]:
+        """Возвращает лучшую ячейку, свободную на период [start_date, end_date).
+
+        Args:
+            start_date (datetime): Начало периода.
+            end_date (datetime): Конец периода (не включается).
+            size (str, optional): Размер ячеек.
+            warehouse_id (int, optional): ID склада.
+
+        Returns:
+            Optional[StorageUnit]: Ячейка или None, если свободных ячеек нет.
+        """
+        candidates = self.candidates(start_date, end_date, size=size, warehouse_id=warehouse_id, limit=1)
+        return candidates[0] if candidates else None
+
+    def reserve(
+        self,
+        user: User,
+        start_date: datetime,
+        storage_duration: int,
+        size: Optional[str] = None,
+        warehouse_id: Optional[int] = None,
+        max_attempts: int = DEFAULT_RESERVE_ATTEMPTS,
+    ) -> Optional[Order]:
+        """Бронирует свободную ячейку и создает в ней заказ.
+
+        Каждая попытка - одна транзакция: ячейка выбирается и заказ создается
+        вместе, а Order.save блокирует ячейку и заново проверяет пересечения.
+        В SQLite транзакция бронирования сразу берет блокировку на запись
+        (см. reservation_transaction), поэтому выбор ячейки не расходится
+        с параллельными бронированиями. Если ячейку все же
+        занял другой заказ или база занята слишком долго, выбирается следующая,
+        но не более `max_attempts` раз.
+
+        Args:
+            user (User): Пользователь.
+            start_date (datetime): Дата начала аренды.
+            storage_duration (int): Срок хранения в днях.
+            size (str, optional): Размер ячейки.
+            warehouse_id (int, optional): ID склада.
+            max_attempts (int): Максимальное количество попыток.
+
+        Returns:
+            Optional[Order]: Созданный заказ или None, если свободных ячеек не осталось.
+        """
+        end_date, _ = Order.calculate_dates(start_date, storage_duration)
+        for _ in range(max_attempts):
+            try:
+                with reservation_transaction():
+                    unit = self.allocate(start_date, end_date, size=size, warehouse_id=warehouse_id)
+                    if unit is None:
+                        return None
+                    order = Order.objects.create(
+                        user=user,
+                        start_date=start_date,
+                        storage_unit=unit,
+                        storage_duration=storage_duration,
+                    )
+            except ValidationError:
+                self._count('conflicts')
+                logger.info("Ячейку %s заняли во время бронирования, пробуем следующую", unit.pk)
+                continue
+            except OperationalError:
+                self._count('lock_timeouts')
+                logger.warning("База занята при бронировании ячейки, пробуем еще раз")
+                continue
+            self._count('reserved')
+            return order
+
+        self._count('exhausted')
+        logger.warning("Не удалось забронировать ячейку за %s попыток", max_attempts)
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        """Возвращает метрики бронирования.
+
+        Returns:
+            Dict[str, Any]: Количество успешных бронирований, конфликтов с параллельными
+            заказами, ожиданий блокировки базы и бронирований, исчерпавших попытки.
+        """
+        with self._stats_lock:
+            return dict(self._stats)
+
+
+_allocator = UnitAllocator(RandomStrategy())
+
+
+def configure_allocator(strategy: str = RandomStrategy.name) -> UnitAllocator:
+    """Задает стратегию выбора ячеек для новых заказов.
+
+    Args:
+        strategy (str): 'random', 'first_fit' или 'load_balancing'.
+
+    Returns:
+        UnitAllocator: Настроенный подборщик ячеек.
+
+    Raises:
+        ValueError: Если стратегия с таким названием не поддерживается.
+    """
+    global _allocator
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Неизвестная стратегия выбора ячеек: {strategy}")
+    _allocator = UnitAllocator(STRATEGIES[strategy]())
+    return _allocator
+
+
+def get_allocator() -> UnitAllocator:
+    """Возвращает подборщик ячеек для новых заказов.
+
+    Returns:
+        UnitAllocator: Подборщик ячеек.
+    """
+    return _allocator
@@ -0,0 +1,112 @@
+import asyncio
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from telegram import Bot, Message
+from telegram.error import BadRequest
+
+from reservations.models import TelegramAsset
+from reservations.runtime import run_orm
+
+logger = logging.getLogger(__name__)
+
+ASSETS_DIR = Path(__file__).resolve().parent
+CONSENT_FORM = 'consent_form.pdf'
+
+
+class AssetCache:
+    """Кэш статических файлов бота, загруженных в Telegram.
+
+    Каждый файл загружается в Telegram один раз, выданный file_id сохраняется
+    в таблице TelegramAsset по хэшу содержимого и используется при следующих
+    отправках. Наличие файлов проверяется при запуске бота.
+
+    Методы:
+        load(): Читает файлы и загружает сохраненные file_id.
+        is_available(name): Проверяет, найден ли файл при запуске.
+        send_document(bot, chat_id, name): Отправляет файл документом.
+    """
+
+    def __init__(self, paths: Iterable[Path]) -> None:
+        self._paths = {path.name: path for path in paths}
+        self._contents: Dict[str, bytes] = {}
+        self._hashes: Dict[str, str] = {}
+        self._file_ids: Dict[str, str] = {}
+        self._upload_locks: Dict[str, asyncio.Lock] = {}
+
+    def load(self) -> None:
+        """Читает файлы, вычисляет их хэши и загружает сохраненные file_id.
+
+        Отсутствующие файлы записываются в лог и не отправляются пользователям.
+        """
+        for name, path in self._paths.items():
+            try:
+                content = path.read_bytes()
+            except FileNotFoundError:
+                logger.error("Файл %s не найден", path)
+                continue
+            self._contents[name] = content
+            self._hashes[name] = hashlib.sha256(content).hexdigest()
+
+        self._file_ids = dict(
+            TelegramAsset.objects.filter(file_hash__in=self._hashes.values())
+            .values_list('file_hash', 'file_id')
+        )
+
+    def is_available(self, name: str) -> bool:
+        """Проверяет, был ли файл найден при запуске.
+
+        Args:
+            name (str): Имя файла.
+
+        Returns:
+            bool: True, если файл можно отправить.
+        """
+        return name in self._hashes
+
+    async def send_document(self, bot: Bot, chat_id: int, name: str) -> Optional[Message]:
+        """Отправляет файл документом, загружая его в Telegram только при первой отправке.
+
+        Args:
+            bot (Bot): Бот, через который отправляется файл.
+            chat_id (int): ID чата.
+            name (str): Имя файла.
+
+        Returns:
+            Optional[Message]: Отправленное сообщение или None, если файл не найден.
+        """
+        file_hash = self._hashes.get(name)
+        if file_hash is None:
+            return None
+
+        file_id = self._file_ids.get(file_hash)
+        if file_id is not None:
+            try:
+                return await bot.send_document(chat_id=chat_id, document=file_id)
+            except BadRequest:
+                logger.warning("file_id файла %s больше не действителен, загружаем заново", name)
+                self._file_ids.pop(file_hash, None)
+
+        lock = self._upload_locks.setdefault(file_hash, asyncio.Lock())
+        async with lock:
+            # Пока ждали блокировку, файл мог загрузить другой обработчик
+            file_id = self._file_ids.get(file_hash)
+            if file_id is not None:
+                return await bot.send_document(chat_id=chat_id, document=file_id)
+
+            message = await bot.send_document(
+                chat_id=chat_id, document=self._contents[name], filename=name
+            )
+            file_id = message.document.file_id
+            self._file_ids[file_hash] = file_id
+            await run_orm(
+                TelegramAsset.objects.update_or_create,
+                file_hash=file_hash,
+                defaults={'name': name, 'file_id': file_id},
+            )
+            return message
+
+
+asset_cache = AssetCache([ASSETS_DIR / CONSENT_FORM])
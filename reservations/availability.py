@@ -0,0 +1,58 @@
+from datetime import datetime
+from typing import Optional
+
+from django.db.models import Exists, OuterRef, QuerySet
+
+from reservations.models import Order, StorageUnit
+
+
+def available_units(
+    start_date: datetime,
+    end_date: datetime,
+    size: Optional[str] = None,
+    warehouse_id: Optional[int] = None,
+) -> QuerySet:
+    """Возвращает ячейки, свободные на весь период [start_date, end_date).
+
+    Отвечает одним запросом для всего склада: пересечения проверяются
+    подзапросом NOT EXISTS по индексу (ячейка, дата окончания) заказов.
+
+    Args:
+        start_date (datetime): Начало периода.
+        end_date (datetime): Конец периода (не включается).
+        size (str, optional): Размер ячеек.
+        warehouse_id (int, optional): ID склада.
+
+    Returns:
+        QuerySet: Свободные ячейки.
+    """
+    units = StorageUnit.objects.all()
+    if size is not None:
+        units = units.filter(size=size)
+    if warehouse_id is not None:
+        units = units.filter(warehouse_id=warehouse_id)
+    busy = Order.objects.overlapping(start_date, end_date).filter(storage_unit=OuterRef('pk'))
+    return units.filter(~Exists(busy))
+
+
+def is_unit_available(
+    unit_id: int,
+    start_date: datetime,
+    end_date: datetime,
+    exclude_order_id: Optional[int] = None,
+) -> bool:
+    """Проверяет, свободна ли ячейка на весь период [start_date, end_date).
+
+    Args:
+        unit_id (int): ID ячейки.
+        start_date (datetime): Начало периода.
+        end_date (datetime): Конец периода (не включается).
+        exclude_order_id (int, optional): Заказ, который не учитывается (например, изменяемый).
+
+    Returns:
+        bool: True, если ячейка свободна.
+    """
+    orders = Order.objects.filter(storage_unit_id=unit_id).overlapping(start_date, end_date)
+    if exclude_order_id is not None:
+        orders = orders.exclude(order_id=exclude_order_id)
+    return not orders.exists()
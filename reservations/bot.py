@@ -1,38 +1,37 @@
+import asyncio
 import logging
 import os
-import random
 import re
 import time
-from datetime import datetime, timedelta
-from io import BytesIO
+from datetime import datetime, time as dt_time
+from zoneinfo import ZoneInfo
+from typing import Optional
 
 import django
-import qrcode
-import schedule
-import telegram
+from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.db.models import Count
 from django.utils import timezone
 from django.utils.timezone import now
 from environs import Env
 from telegram import (
-    Bot,
     InlineKeyboardButton,
     InlineKeyboardMarkup,
     InputFile,
-    ParseMode,
     ReplyKeyboardMarkup,
     ReplyKeyboardRemove,
     Update,
 )
+from telegram.constants import ParseMode
+from telegram.error import Forbidden, TelegramError
 from telegram.ext import (
+    Application,
+    BasePersistence,
     CallbackContext,
     CallbackQueryHandler,
     CommandHandler,
     ConversationHandler,
-    Filters,
     MessageHandler,
-    Updater,
+    filters,
 )
 
 # Настройка Django
@@ -40,11 +39,22 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'storage_bot.settings')
 django.setup()
 
 from reservations.models import (
+    FreeUnitCounter,
     Order,
     StorageUnit,
     User,
     Warehouse
 )
+from reservations.assets import CONSENT_FORM, asset_cache
+from reservations.allocation import configure_allocator, get_allocator
+from reservations.link_refresher import refresh_link_stats
+from reservations.persistence import DEFAULT_FLUSH_INTERVAL, make_persistence
+from reservations.qr import configure_qr_pool, get_order_qr_code, qr_cache, shutdown_qr_pool
+from reservations.rate_limiter import BULK, PriorityRateLimiter
+from reservations.runtime import configure_orm_pool, run_orm, shutdown_orm_pool
+from reservations.sweeper import sweep_order_statuses
+from reservations.update_processor import ChatOrderedUpdateProcessor
+from reservations.webhook import is_webhook_mode
 
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -61,8 +71,28 @@ REQUEST_START_DATE = 4
 REQUEST_DURATION = 5
 REQUEST_ADDRESS = 6
 
+# Сколько заказов показывать на одной странице "Мои заказы"
+ORDERS_PAGE_SIZE = 5
 
-def start(update: Update, context: CallbackContext):
+# Напоминание об окончании хранения: во сколько отправлять
+# и сколько заказов обрабатывать за один запрос
+REMINDER_TIME = dt_time(9, 0)
+REMINDER_BATCH_SIZE = 100
+# Через сколько секунд после запуска проверить пропущенные напоминания
+REMINDER_STARTUP_DELAY = 60
+
+# Как часто писать в лог статистику очереди обновлений (секунды)
+UPDATE_STATS_INTERVAL = 300
+
+# Как часто обновлять статусы заказов по датам аренды (секунды)
+STATUS_SWEEP_INTERVAL = 600
+
+# Как часто обновлять статистику сокращенных ссылок VK и через сколько после запуска начать (секунды)
+LINK_REFRESH_INTERVAL = 3600
+LINK_REFRESH_STARTUP_DELAY = 120
+
+
+async def start(update: Update, context: CallbackContext):
     """
         Обработчик команды /start. Приветствует пользователя и запрашивает согласие на обработку персональных данных.
 
@@ -81,23 +111,20 @@ def start(update: Update, context: CallbackContext):
         "но выбрасывать их жалко.\n\n"
         "Для продолжения работы с ботом необходимо дать согласие на обработку персональных данных."
     )
-    update.message.reply_text(welcome_message)
+    await update.message.reply_text(welcome_message)
 
-    # Отправляем файл с согласием на обработку данных
-    pdf_file = "consent_form.pdf"
-    try:
-        with open(pdf_file, "rb") as file:
-            context.bot.send_document(
-                chat_id=update.effective_chat.id, document=file)
-    except FileNotFoundError:
-        update.message.reply_text(
+    # Отправляем файл с согласием на обработку данных (загружается в Telegram один раз)
+    if asset_cache.is_available(CONSENT_FORM):
+        await asset_cache.send_document(context.bot, update.effective_chat.id, CONSENT_FORM)
+    else:
+        await update.message.reply_text(
             "Файл с соглашением не найден. Пожалуйста, попробуйте позже.")
 
     # Показываем кнопки для подтверждения
     reply_markup = ReplyKeyboardMarkup([["Принять"], ["Отказаться"]],
                                        one_time_keyboard=True,
                                        resize_keyboard=True)
-    update.message.reply_text(
+    await update.message.reply_text(
         "После ознакомления с документом выберите действие:\n\n"
         "✅ Нажмите 'Принять', чтобы продолжить пользоваться услугами нашего сервиса.\n\n"
 
@@ -107,7 +134,7 @@ def start(update: Update, context: CallbackContext):
     return CONSENT
 
 
-def handle_consent(update: Update, context: CallbackContext):
+async def handle_consent(update: Update, context: CallbackContext):
     """
         Обработчик ответа пользователя на запрос согласия на обработку персональных данных.
 
@@ -131,7 +158,7 @@ def handle_consent(update: Update, context: CallbackContext):
             [["Мои заказы", "Тарифы и условия хранения"], ["Заказать ячейку"]],
             resize_keyboard=True
         )
-        update.message.reply_text(
+        await update.message.reply_text(
             "Спасибо! Вы приняли условия обработки персональных данных. "
             "Теперь мы можем продолжить работу. 🛠️\n\n"
             "Выберите действие из меню ниже:",
@@ -143,7 +170,7 @@ def handle_consent(update: Update, context: CallbackContext):
         reply_markup = ReplyKeyboardMarkup([["Принять"], ["Отказаться"]],
                                            one_time_keyboard=True,
                                            resize_keyboard=True)
-        update.message.reply_text(
+        await update.message.reply_text(
             "Вы отказались от обработки персональных данных. "
             "Без этого мы не можем предоставить услугу. Если передумаете, выберите 'Принять'.",
             reply_markup=reply_markup
@@ -154,14 +181,14 @@ def handle_consent(update: Update, context: CallbackContext):
         reply_markup = ReplyKeyboardMarkup([["Принять"], ["Отказаться"]],
                                            one_time_keyboard=True,
                                            resize_keyboard=True)
-        update.message.reply_text(
+        await update.message.reply_text(
             "Пожалуйста, выберите одну из предложенных опций: Принять или Отказаться.",
             reply_markup=reply_markup
         )
         return CONSENT
 
 
-def tariffs(update: Update, context: CallbackContext):
+async def tariffs(update: Update, context: CallbackContext):
     """
         Отправляет информацию о тарифах на хранение вещей и количестве свободных ячеек.
 
@@ -170,27 +197,21 @@ def tariffs(update: Update, context: CallbackContext):
 
         Также включает список запрещенных к хранению вещей.
     """
-    # Тарифы для каждого размера
-    tariffs_data = {
-        'small': 100,
-        'medium': 300,
-        'large': 500,
-    }
-    size_labels = dict(StorageUnit.SIZE_CHOICES)
-
-    # Подсчитываем количество свободных ячеек по каждому размеру
-    free_sizes_count = (
-        StorageUnit.objects.filter(is_occupied=False)
-        .values('size')
-        .annotate(count=Count('size'))
+    # Количество свободных ячеек по каждому размеру берем из счетчиков складов
+    free_counters = await run_orm(
+        list, FreeUnitCounter.objects.values_list('size', 'free_count')
     )
+    free_sizes_count = {}
+    for size, count in free_counters:
+        free_sizes_count[size] = free_sizes_count.get(size, 0) + count
 
     tariffs_info = "📋 *Тарифы на хранение и количество свободных ячеек:*\n\n"
-    for size_data in free_sizes_count:
-        size = size_data['size']
-        count = size_data['count']
-        price = tariffs_data.get(size, 0)
-        tariffs_info += (f"- {size_labels.get(size, 'Неизвестно')} "
+    for size, label in StorageUnit.SIZE_CHOICES:
+        count = free_sizes_count.get(size, 0)
+        if not count:
+            continue
+        price = StorageUnit.DAILY_RATES.get(size, 0)
+        tariffs_info += (f"- {label} "
                          f"({count} свободных): {price} руб./день\n")
 
     tariffs_info += (
@@ -205,21 +226,21 @@ def tariffs(update: Update, context: CallbackContext):
         "- любое имущество, нарушающее законодательство РФ."
     )
 
-    update.message.reply_text(
-        tariffs_info, parse_mode=telegram.ParseMode.MARKDOWN)
+    await update.message.reply_text(
+        tariffs_info, parse_mode=ParseMode.MARKDOWN)
 
 
-def handle_self_delivery(update: Update, context: CallbackContext):
+async def handle_self_delivery(update: Update, context: CallbackContext):
     """
         Обрабатывает выбор пользователем самостоятельной доставки вещей на склад.
 
         Функция отправляет пользователю список доступных складов для самостоятельной доставки
         и предлагает продолжить оформление заказа.
     """
-    update.callback_query.answer()
+    await update.callback_query.answer()
     context.user_data['delivery_type'] = "self"
 
-    warehouses = Warehouse.objects.all()
+    warehouses = await run_orm(list, Warehouse.objects.all())
 
     self_delivery_info = "🚗 *Адреса складов для самостоятельной доставки ваших вещей:*\n\n"
     for idx, warehouse in enumerate(warehouses, start=1):
@@ -236,21 +257,21 @@ def handle_self_delivery(update: Update, context: CallbackContext):
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
 
-    update.callback_query.message.reply_text(
+    await update.callback_query.message.reply_text(
         self_delivery_info,
-        parse_mode=telegram.ParseMode.MARKDOWN,
+        parse_mode=ParseMode.MARKDOWN,
         reply_markup=reply_markup
     )
 
 
-def handle_courier_delivery(update: Update, context: CallbackContext):
+async def handle_courier_delivery(update: Update, context: CallbackContext):
     """
         Обрабатывает выбор пользователем курьерской доставки.
 
         Функция информирует пользователя о процессе курьерской доставки, преимуществах,
         а также позволяет перейти к следующему шагу оформления заказа.
     """
-    update.callback_query.answer()
+    await update.callback_query.answer()
     context.user_data['delivery_type'] = "courier"
 
     courier_info = (
@@ -271,14 +292,14 @@ def handle_courier_delivery(update: Update, context: CallbackContext):
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
 
-    update.callback_query.message.reply_text(
+    await update.callback_query.message.reply_text(
         courier_info,
-        parse_mode=telegram.ParseMode.MARKDOWN,
+        parse_mode=ParseMode.MARKDOWN,
         reply_markup=reply_markup
     )
 
 
-def order_box(update: Update, context: CallbackContext):
+async def order_box(update: Update, context: CallbackContext):
     """
         Обрабатывает запрос пользователя на выбор способа доставки вещей в ячейку.
 
@@ -293,7 +314,7 @@ def order_box(update: Update, context: CallbackContext):
                               callback_data="self_delivery")]
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
-    update.message.reply_text(
+    await update.message.reply_text(
         "Как вы хотите доставить ваши вещи в ячейку? Выберите способ доставки.",
         reply_markup=reply_markup
     )
@@ -301,22 +322,22 @@ def order_box(update: Update, context: CallbackContext):
     return ConversationHandler.END
 
 
-def start_order_form(update: Update, context: CallbackContext):
+async def start_order_form(update: Update, context: CallbackContext):
     """
         Начинает процесс оформления заказа, запрашивая у пользователя ФИО.
 
         Функция инициирует процесс сбора данных для заказа, отправляя пользователю запрос на ввод ФИО.
         После этого временно убирает главное меню и ожидает ввода данных от пользователя.
     """
-    update.callback_query.answer()
-    update.callback_query.message.reply_text(
+    await update.callback_query.answer()
+    await update.callback_query.message.reply_text(
         "👤 Для начала укажите ваше ФИО: (например: Иванов Иван Иванович)",
         reply_markup=ReplyKeyboardRemove()  # Убираем временно главное меню
     )
     return REQUEST_NAME
 
 
-def check_name_and_request_phone(update: Update, context: CallbackContext):
+async def check_name_and_request_phone(update: Update, context: CallbackContext):
     """
         Проверяет корректность введённого пользователем ФИО и запрашивает номер телефона.
 
@@ -326,17 +347,17 @@ def check_name_and_request_phone(update: Update, context: CallbackContext):
     """
     user_name = update.message.text.strip()
     if not re.match(r"^[А-ЯЁ][а-яё]+\s[А-ЯЁ][а-яё]+\s[А-ЯЁ][а-яё]+$", user_name):
-        update.message.reply_text(
+        await update.message.reply_text(
             "⚠️ Пожалуйста, укажите ваше ФИО в формате: Иванов Иван Иванович.")
         return REQUEST_NAME
 
     context.user_data['name'] = user_name
-    update.message.reply_text(
+    await update.message.reply_text(
         "📞 Укажите ваш номер телефона (например: +79991234567 или 89991234567):")
     return REQUEST_PHONE
 
 
-def check_phone_and_request_start_date(update: Update, context: CallbackContext):
+async def check_phone_and_request_start_date(update: Update, context: CallbackContext):
     """
         Проверяет корректность введённого пользователем номера телефона и запрашивает дату начала хранения.
 
@@ -346,19 +367,19 @@ def check_phone_and_request_start_date(update: Update, context: CallbackContext)
     """
     phone = update.message.text.strip()
     if not re.match(r"^\+7\d{10}$|^8\d{10}$", phone):
-        update.message.reply_text(
+        await update.message.reply_text(
             "⚠️ Пожалуйста, укажите корректный номер телефона в формате: "
             "+79991234567 или 89991234567."
         )
         return REQUEST_PHONE
 
     context.user_data['phone'] = phone
-    update.message.reply_text(
+    await update.message.reply_text(
         "📅 Укажите дату начала хранения (в формате ДД.ММ.ГГГГ):")
     return REQUEST_START_DATE
 
 
-def check_start_date_and_request_duration(update: Update, context: CallbackContext):
+async def check_start_date_and_request_duration(update: Update, context: CallbackContext):
     """
         Проверяет корректность введённой даты начала хранения и запрашивает срок хранения.
 
@@ -371,19 +392,19 @@ def check_start_date_and_request_duration(update: Update, context: CallbackConte
         start_date = datetime.strptime(start_date_str, "%d.%m.%Y")
         start_date = timezone.make_aware(start_date)
         if start_date.date() < datetime.now().date():
-            update.message.reply_text(
+            await update.message.reply_text(
                 "⚠️ Дата начала хранения не может быть раньше текущего дня.")
             return REQUEST_START_DATE
     except ValueError:
-        update.message.reply_text("⚠️ Укажите дату в формате ДД.ММ.ГГГГ.")
+        await update.message.reply_text("⚠️ Укажите дату в формате ДД.ММ.ГГГГ.")
         return REQUEST_START_DATE
 
     context.user_data['start_date'] = start_date
-    update.message.reply_text("📦 Укажите срок хранения в днях (например: 30):")
+    await update.message.reply_text("📦 Укажите срок хранения в днях (например: 30):")
     return REQUEST_DURATION
 
 
-def check_duration_and_request_address(update: Update, context: CallbackContext):
+async def check_duration_and_request_address(update: Update, context: CallbackContext):
     """
         Проверяет корректность введённого срока хранения и запрашивает адрес доставки (если необходимо).
 
@@ -400,29 +421,57 @@ def check_duration_and_request_address(update: Update, context: CallbackContext)
         # Проверяем тип доставки
         delivery_type = context.user_data.get('delivery_type')
         if delivery_type == "self":
-            return finalize_order_self(update, context)
+            return await finalize_order_self(update, context)
         else:  # Если доставка курьером, запрашиваем адрес
-            update.message.reply_text(
+            await update.message.reply_text(
                 "📍 Укажите адрес, откуда нужно забрать вещи "
                 "(например: г. Москва, ул. Ленина, д. 10):"
             )
             return REQUEST_ADDRESS
     except ValueError:
-        update.message.reply_text(
+        await update.message.reply_text(
             "⚠️ Пожалуйста, введите корректный срок хранения в днях "
             "(число дней не может быть отрицательным)."
         )
         return REQUEST_DURATION
 
 
-def finalize_order_courier(update: Update, context: CallbackContext):
+def save_customer(user_id: int, name: str, phone: str, address: str = None) -> User:
+    """
+        Создает пользователя в базе данных или обновляет данные существующего.
+
+        Адрес обновляется только если он передан (курьерская доставка).
+    """
+    defaults = {'name': name, 'phone_number': phone}
+    if address is not None:
+        defaults['user_address'] = address
+    user, created = User.objects.get_or_create(user_id=user_id, defaults=defaults)
+    if not created:  # Если пользователь уже существует, обновляем данные
+        for field, value in defaults.items():
+            setattr(user, field, value)
+        user.save(update_fields=list(defaults))
+    return user
+
+
+def create_order_in_free_unit(user: User, start_date: datetime, storage_duration: int):
+    """
+        Бронирует ячейку, свободную на весь срок хранения, и создает в ней заказ.
+
+        Ячейка выбирается стратегией, заданной в TG_BOT_ALLOCATION_STRATEGY. Если ячейку
+        одновременно занял другой заказ, бронируется следующая подходящая.
+        Возвращает созданный заказ или None, если свободных ячеек нет.
+    """
+    return get_allocator().reserve(user, start_date, storage_duration)
+
+
+async def finalize_order_courier(update: Update, context: CallbackContext):
     """
        Завершает оформление заказа для курьерской доставки.
 
        Функция выполняет следующие шаги:
        1. Запрашивает у пользователя адрес для курьерской доставки и сохраняет его.
        2. Находит или создает пользователя в базе данных и сохраняет его данные.
-       3. Ищет свободную ячейку для хранения и выбирает одну случайным образом.
+       3. Подбирает ячейку, свободную на весь срок хранения.
        4. Создает заказ с информацией о пользователе, ячейке хранения и сроке хранения.
        5. Отправляет пользователю детали заказа с информацией о заказе, включая стоимость.
        6. В случае ошибки при создании заказа, сообщает об ошибке и завершает процесс.
@@ -431,69 +480,60 @@ def finalize_order_courier(update: Update, context: CallbackContext):
     context.user_data['address'] = user_address
 
     # Создаем или находим пользователя в базе данных
-    user, created = User.objects.get_or_create(
-        user_id=update.effective_user.id,
-        defaults={
-            'name': context.user_data['name'],
-            'phone_number': context.user_data['phone'],
-            'user_address': user_address,
-        }
-    )
-    if not created:  # Если пользователь уже существует, обновляем адрес
-        user.name = context.user_data['name']
-        user.phone_number = context.user_data['phone']
-        user.user_address = user_address
-        user.save()
-
-    # Ищем свободную ячейку
-    free_units = StorageUnit.objects.filter(is_occupied=False)
-    if not free_units.exists():
-        update.message.reply_text(
-            "⚠️ На данный момент все ячейки заняты. Попробуйте позже.")
-        return ConversationHandler.END
-
-    # Рандомно выбираем свободную ячейку
-    selected_unit = random.choice(free_units)
+    user = await run_orm(
+        save_customer,
+        update.effective_user.id,
+        context.user_data['name'],
+        context.user_data['phone'],
+        user_address,
+    )
 
-    # Создаем заказ
+    # Создаем заказ в свободной ячейке
     try:
-        order = Order.objects.create(
-            user=user,
-            start_date=context.user_data['start_date'],
-            storage_unit=selected_unit,
-            storage_duration=context.user_data['storage_duration']
-        )
-        formatted_date = context.user_data['start_date'].strftime("%d.%m.%Y")
-        update.message.reply_text(
-            "✅ Спасибо! Ваш заказ принят.\n\n"
-            f"📋 *Детали заказа:*\n"
-            f"👤 ФИО: {user.name}\n"
-            f"📞 Телефон: {user.phone_number}\n"
-            f"📅 Дата начала хранения: {formatted_date}\n"
-            f"📦 Срок хранения: {context.user_data['storage_duration']} дней\n"
-            # Адрес выводится только для курьера
-            f"📍 Адрес: {context.user_data['address']}\n"
-            f"🏷️ Ячейка хранения: {selected_unit.get_size_display()} "
-            f"(№ {selected_unit.unit_id})\n\n"
-            f"- Общая стоимость: {order.calculated_total_cost} руб.\n\n"
-            "Курьер свяжется с вами в ближайшее время. 😊",
-            parse_mode=telegram.ParseMode.MARKDOWN
+        order = await run_orm(
+            create_order_in_free_unit,
+            user,
+            context.user_data['start_date'],
+            context.user_data['storage_duration'],
         )
     except ValidationError as e:
-        update.message.reply_text(f"⚠️ Ошибка при создании заказа: {e}")
+        await update.message.reply_text(f"⚠️ Ошибка при создании заказа: {e}")
         return ConversationHandler.END
+
+    if order is None:
+        await update.message.reply_text(
+            "⚠️ На данный момент все ячейки заняты. Попробуйте позже.")
+        return ConversationHandler.END
+
+    selected_unit = order.storage_unit
+    formatted_date = context.user_data['start_date'].strftime("%d.%m.%Y")
+    await update.message.reply_text(
+        "✅ Спасибо! Ваш заказ принят.\n\n"
+        f"📋 *Детали заказа:*\n"
+        f"👤 ФИО: {user.name}\n"
+        f"📞 Телефон: {user.phone_number}\n"
+        f"📅 Дата начала хранения: {formatted_date}\n"
+        f"📦 Срок хранения: {context.user_data['storage_duration']} дней\n"
+        # Адрес выводится только для курьера
+        f"📍 Адрес: {context.user_data['address']}\n"
+        f"🏷️ Ячейка хранения: {selected_unit.get_size_display()} "
+        f"(№ {selected_unit.unit_id})\n\n"
+        f"- Общая стоимость: {order.calculated_total_cost} руб.\n\n"
+        "Курьер свяжется с вами в ближайшее время. 😊",
+        parse_mode=ParseMode.MARKDOWN
+    )
     reply_markup = ReplyKeyboardMarkup(
         [["Мои заказы", "Тарифы и условия хранения"], ["Заказать ячейку"]],
         resize_keyboard=True
     )
-    update.message.reply_text(
+    await update.message.reply_text(
         "Если вас интересует что-то еще, выберите действие из меню ниже:",
         reply_markup=reply_markup
     )
     return ConversationHandler.END
 
 
-def finalize_order_self(update: Update, context: CallbackContext):
+async def finalize_order_self(update: Update, context: CallbackContext):
     """
         Завершает оформление заказа для самостоятельной доставки.
 
@@ -504,143 +544,221 @@ def finalize_order_self(update: Update, context: CallbackContext):
         4. Отправляет пользователю подробности о заказе, включая стоимость.
         5. Если возникает ошибка при создании заказа, сообщает об ошибке.
     """
-    user, created = User.objects.get_or_create(
-        user_id=update.effective_user.id,
-        defaults={
-            'name': context.user_data['name'],
-            'phone_number': context.user_data['phone'],
-        }
-    )
-    if not created:  # Если пользователь уже существует, обновим данные
-        user.name = context.user_data['name']
-        user.phone_number = context.user_data['phone']
-        user.save()
-
-    # Ищем свободную ячейку
-    free_units = StorageUnit.objects.filter(is_occupied=False)
-    if not free_units:
-        update.message.reply_text(
-            "⚠️ На данный момент все ячейки заняты. Попробуйте позже.")
-        return ConversationHandler.END
-
-    # Рандомно выбираем свободную ячейку
-    selected_unit = random.choice(free_units)
-    formatted_start_date = context.user_data['start_date'].strftime("%d.%m.%Y")
+    user = await run_orm(
+        save_customer,
+        update.effective_user.id,
+        context.user_data['name'],
+        context.user_data['phone'],
+    )
 
-    # Создаем заказ
+    # Создаем заказ в свободной ячейке
     try:
-        order = Order.objects.create(
-            user=user,
-            start_date=context.user_data['start_date'],
-            storage_unit=selected_unit,
-            storage_duration=context.user_data['storage_duration']
-        )
-        update.message.reply_text(
-            "✅ Спасибо! Ваш заказ принят.\n\n"
-            f"📋 *Детали заказа:*\n"
-            f"👤 ФИО: {user.name}\n"
-            f"📞 Телефон: {user.phone_number}\n"
-            f"📅 Дата начала хранения: {formatted_start_date}\n"
-            f"📦 Срок хранения: {context.user_data['storage_duration']} дней\n"
-            f"📍 Самостоятельная доставка: {order.storage_unit.warehouse.warehouse_address}\n"
-            f"🏷️ Ячейка хранения: {selected_unit.get_size_display()} "
-            f"(№ {selected_unit.unit_id})\n\n"
-            f"- Общая стоимость: {order.calculated_total_cost} руб.\n\n",
-            parse_mode=telegram.ParseMode.MARKDOWN
+        order = await run_orm(
+            create_order_in_free_unit,
+            user,
+            context.user_data['start_date'],
+            context.user_data['storage_duration'],
         )
     except ValidationError as e:
-        update.message.reply_text(f"⚠️ Ошибка при создании заказа: {e}")
+        await update.message.reply_text(f"⚠️ Ошибка при создании заказа: {e}")
         return ConversationHandler.END
 
+    if order is None:
+        await update.message.reply_text(
+            "⚠️ На данный момент все ячейки заняты. Попробуйте позже.")
+        return ConversationHandler.END
+
+    selected_unit = order.storage_unit
+    formatted_start_date = context.user_data['start_date'].strftime("%d.%m.%Y")
+    await update.message.reply_text(
+        "✅ Спасибо! Ваш заказ принят.\n\n"
+        f"📋 *Детали заказа:*\n"
+        f"👤 ФИО: {user.name}\n"
+        f"📞 Телефон: {user.phone_number}\n"
+        f"📅 Дата начала хранения: {formatted_start_date}\n"
+        f"📦 Срок хранения: {context.user_data['storage_duration']} дней\n"
+        f"📍 Самостоятельная доставка: {selected_unit.warehouse.warehouse_address}\n"
+        f"🏷️ Ячейка хранения: {selected_unit.get_size_display()} "
+        f"(№ {selected_unit.unit_id})\n\n"
+        f"- Общая стоимость: {order.calculated_total_cost} руб.\n\n",
+        parse_mode=ParseMode.MARKDOWN
+    )
+
     reply_markup = ReplyKeyboardMarkup(
         [["Мои заказы", "Тарифы и условия хранения"], ["Заказать ячейку"]],
         resize_keyboard=True
     )
-    update.message.reply_text(
+    await update.message.reply_text(
         "Если вас интересует что-то еще, выберите действие из меню ниже:",
         reply_markup=reply_markup
     )
     return ConversationHandler.END
 
 
-def handle_my_order(update: Update, context: CallbackContext):
+def format_order_info(order: Order) -> str:
+    """
+        Формирует описание заказа для сообщения пользователю.
+
+        Ячейка и склад заказа должны быть загружены через select_related.
+    """
+    # Генерация статуса с эмодзи
+    status_emoji = {
+        'pending': "⏳",
+        'active': "✅",
+        'expired': "⚠️",
+        'completed': "✔️"
+    }.get(order.status, "❓")
+
+    # Рассчитываем оставшиеся дни хранения
+    days_left = (order.end_date - now()).days
+
+    return (
+        f"{status_emoji} *Заказ {order.order_id}:*\n"
+        f"- Ячейка {order.storage_unit.unit_id}: "
+        f"{order.storage_unit.get_size_display()}\n"
+        f"- {order.storage_unit.warehouse.name}\n"
+        f"- Адрес склада: {order.storage_unit.warehouse.warehouse_address or 'Адрес не указан'}\n"
+        f"- Срок хранения: {order.storage_duration} дней\n"
+        f"- Осталось дней: {days_left if days_left > 0 else 'Истёк'}\n"
+        f"- Статус: {order.get_status_display()}\n"
+        f"- Дата начала аренды: {order.start_date.strftime('%d.%m.%Y')}\n"
+        f"- Общая стоимость: {order.calculated_total_cost} руб.\n\n"
+    )
+
+
+def get_active_orders_page(
+    telegram_user_id: int,
+    after_id: Optional[int] = None,
+    before_id: Optional[int] = None,
+):
+    """
+        Возвращает страницу незавершенных заказов пользователя.
+
+        Заказы вместе с ячейками и складами загружаются одним запросом.
+        Страницы листаются по ID заказа (keyset-пагинация): after_id - следующая
+        страница после заказа, before_id - предыдущая страница перед заказом.
+
+        Возвращает кортеж (список пар (ID заказа, текст), есть ли предыдущая
+        страница, есть ли следующая страница). Если у пользователя нет заказов
+        и он не найден, пробрасывает User.DoesNotExist.
+    """
+    orders = (
+        Order.objects.select_related('storage_unit__warehouse')
+        .filter(user_id=telegram_user_id)
+        .exclude(status='completed')
+    )
+    # Берем на один заказ больше, чтобы узнать, есть ли еще страница
+    if before_id is not None:
+        page = list(orders.filter(order_id__lt=before_id).order_by('-order_id')[:ORDERS_PAGE_SIZE + 1])
+        has_prev, has_next = len(page) > ORDERS_PAGE_SIZE, True
+        page = page[:ORDERS_PAGE_SIZE][::-1]
+    else:
+        if after_id is not None:
+            orders = orders.filter(order_id__gt=after_id)
+        page = list(orders.order_by('order_id')[:ORDERS_PAGE_SIZE + 1])
+        has_prev, has_next = after_id is not None, len(page) > ORDERS_PAGE_SIZE
+        page = page[:ORDERS_PAGE_SIZE]
+
+    if not page and after_id is None and before_id is None:
+        if not User.objects.filter(user_id=telegram_user_id).exists():
+            raise User.DoesNotExist
+    return [(order.order_id, format_order_info(order)) for order in page], has_prev, has_next
+
+
+def build_orders_page_markup(orders_info, has_prev: bool, has_next: bool) -> InlineKeyboardMarkup:
+    """
+        Формирует клавиатуру страницы заказов: кнопки выдачи вещей и навигацию.
+    """
+    keyboard = [
+        [InlineKeyboardButton(
+            f"🔑 Забрать вещи по заказу {order_id}", callback_data=f"pickup_order_{order_id}")]
+        for order_id, _ in orders_info
+    ]
+    navigation = []
+    if has_prev:
+        navigation.append(InlineKeyboardButton(
+            "⬅️ Назад", callback_data=f"orders_before_{orders_info[0][0]}"))
+    if has_next:
+        navigation.append(InlineKeyboardButton(
+            "Далее ➡️", callback_data=f"orders_after_{orders_info[-1][0]}"))
+    if navigation:
+        keyboard.append(navigation)
+    return InlineKeyboardMarkup(keyboard)
+
+
+async def handle_my_order(update: Update, context: CallbackContext):
     """
        Обрабатывает запрос пользователя на просмотр активных заказов.
 
        Функция выполняет следующие шаги:
-       1. Получает пользователя по его telegram_user_id.
-       2. Если у пользователя есть активные заказы, выводит подробности каждого заказа.
-       3. Для каждого активного заказа:
-           - Выводит его статус с эмодзи.
-           - Рассчитывает оставшиеся дни аренды.
-           - Отправляет пользователю информацию о заказе.
-       4. Если активных заказов нет, сообщает об этом пользователю.
-       5. Если пользователь не найден в базе данных, выводит сообщение о невозможности найти учетную запись.
+       1. Загружает первую страницу незавершенных заказов пользователя одним запросом.
+       2. Если заказы есть, отправляет одно сообщение со страницей заказов:
+           - статус каждого заказа с эмодзи и оставшиеся дни аренды;
+           - кнопки выдачи вещей и перехода по страницам.
+       3. Если активных заказов нет, сообщает об этом пользователю.
+       4. Если пользователь не найден в базе данных, выводит сообщение о невозможности найти учетную запись.
     """
     telegram_user_id = update.message.chat_id
     try:
-        user = User.objects.get(user_id=telegram_user_id)
-        orders = user.get_orders()
-
-        if not orders.exists() or not any(order.status != 'completed' for order in orders):
-            update.message.reply_text(
-                "📦 У вас пока нет активных заказов.",
-                parse_mode=ParseMode.MARKDOWN
-            )
-            return
-
-        for order in orders:
-            if order.status != 'completed':
-                # Генерация статуса с эмодзи
-                status_emoji = {
-                    'pending': "⏳",
-                    'active': "✅",
-                    'expired': "⚠️",
-                    'completed': "✔️"
-                }.get(order.status, "❓")
-
-                # Рассчитываем дату окончания хранения и оставшиеся дни
-                end_date = order.start_date + \
-                    timedelta(days=order.storage_duration)
-                days_left = (end_date - now()).days
-
-                # Формируем информацию только для текущего заказа
-                orders_info = (
-                    f"{status_emoji} *Заказ {order.order_id}:*\n"
-                    f"- Ячейка {order.storage_unit.unit_id}: "
-                    f"{order.storage_unit.get_size_display()}\n"
-                    f"- {order.storage_unit.warehouse.name}\n"
-                    f"- Адрес склада: {order.storage_unit.warehouse.warehouse_address or 'Адрес не указан'}\n"
-                    f"- Срок хранения: {order.storage_duration} дней\n"
-                    f"- Осталось дней: {days_left if days_left > 0 else 'Истёк'}\n"
-                    f"- Статус: {order.get_status_display()}\n"
-                    f"- Дата начала аренды: {order.start_date.strftime('%d.%m.%Y')}\n"
-                    f"- Общая стоимость: {order.calculated_total_cost} руб.\n\n"
-                )
-
-                # Кнопка для текущего заказа
-                keyboard = [
-                    [InlineKeyboardButton(
-                        "🔑 Забрать вещи из ячейки", callback_data=f"pickup_order_{order.order_id}")],
-                ]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-
-                # Отправляем сообщение с информацией о текущем заказе
-                update.message.reply_text(
-                    orders_info,
-                    parse_mode=ParseMode.MARKDOWN,
-                    reply_markup=reply_markup
-                )
-
+        orders_info, has_prev, has_next = await run_orm(get_active_orders_page, telegram_user_id)
     except User.DoesNotExist:
-        update.message.reply_text(
+        await update.message.reply_text(
             "❌ Учетная запись не найдена. "
             "Возможно, вы ещё не делали заказы в нашем сервисе.",
             parse_mode=ParseMode.MARKDOWN
         )
+        return
+
+    if not orders_info:
+        await update.message.reply_text(
+            "📦 У вас пока нет активных заказов.",
+            parse_mode=ParseMode.MARKDOWN
+        )
+        return
+
+    await update.message.reply_text(
+        "".join(order_info for _, order_info in orders_info),
+        parse_mode=ParseMode.MARKDOWN,
+        reply_markup=build_orders_page_markup(orders_info, has_prev, has_next)
+    )
+
+
+async def handle_orders_page(update: Update, context: CallbackContext):
+    """
+       Переключает страницу в сообщении со списком заказов.
+
+       ID заказа, от которого листается страница, передается в callback_data.
+       Если на странице не осталось заказов (например, они завершены),
+       показывается первая страница.
+    """
+    query = update.callback_query
+    await query.answer()
+
+    _, direction, order_id = query.data.split('_')
+    page_args = {'after_id' if direction == 'after' else 'before_id': int(order_id)}
+    try:
+        orders_info, has_prev, has_next = await run_orm(
+            get_active_orders_page, query.from_user.id, **page_args
+        )
+        if not orders_info:
+            orders_info, has_prev, has_next = await run_orm(
+                get_active_orders_page, query.from_user.id
+            )
+    except User.DoesNotExist:
+        orders_info = []
+
+    if not orders_info:
+        await query.edit_message_text("📦 У вас пока нет активных заказов.")
+        return
+
+    await query.edit_message_text(
+        "".join(order_info for _, order_info in orders_info),
+        parse_mode=ParseMode.MARKDOWN,
+        reply_markup=build_orders_page_markup(orders_info, has_prev, has_next)
+    )
 
 
-def handle_pickup_order(update: Update, context: CallbackContext):
+async def handle_pickup_order(update: Update, context: CallbackContext):
     """
        Обрабатывает запрос на выдачу QR-кода для забора вещей из ячейки.
 
@@ -656,20 +774,23 @@ def handle_pickup_order(update: Update, context: CallbackContext):
        6. Если произошла ошибка валидации или любая другая ошибка, отправляем сообщение об ошибке.
     """
     query = update.callback_query
-    query.answer()
+    await query.answer()
 
     # Извлекаем ID заказа из callback_data
     order_id = query.data.split('_')[-1]
 
     try:
-        order = Order.objects.get(order_id=order_id)
+        order = await run_orm(
+            Order.objects.select_related('user', 'storage_unit').get,
+            order_id=order_id
+        )
 
         if order.status == 'completed':
-            query.message.reply_text("❌ Этот заказ уже завершен!")
+            await query.message.reply_text("❌ Этот заказ уже завершен!")
             return
 
         elif order.status == 'pending':
-            query.message.reply_text(
+            await query.message.reply_text(
                 f"Аренда ячейки {order.storage_unit.unit_id} еще не началась (заказ №{order_id})"
             )
             return
@@ -678,100 +799,145 @@ def handle_pickup_order(update: Update, context: CallbackContext):
             # Генерируем данные для QR-кода
             qr_data = (f"Order ID: {order_id}, User: {order.user.name}, "
                        f"Storage Unit: {order.storage_unit.unit_id}")
-            qr = qrcode.QRCode(
-                version=1,
-                error_correction=qrcode.constants.ERROR_CORRECT_L,
-                box_size=10,
-                border=4,
-            )
-            qr.add_data(qr_data)
-            qr.make(fit=True)
-
-            # Сохраняем QR-код в буфер
-            qr_image = qr.make_image(fill_color="black", back_color="white")
-            buffer = BytesIO()
-            qr_image.save(buffer, format="PNG")
-            buffer.seek(0)
+            # QR-код генерируется в пуле процессов и кэшируется по заказу
+            qr_code = await get_order_qr_code(order.order_id, qr_data)
+            if isinstance(qr_code, bytes):
+                qr_code = InputFile(qr_code, filename=f"order_{order_id}_qr.png")
 
             # Отправляем QR-код пользователю
-            query.message.reply_photo(photo=InputFile(buffer, filename=f"order_{order_id}_qr.png"),
-                                      caption=f"🔑 Ваш QR-код для открытия ячейки "
-                                              f"№ {order.storage_unit.unit_id}.\n\n"
-                                              f"Спасибо, что выбрали наш сервис❤️ "
-                                      )
+            message = await query.message.reply_photo(photo=qr_code,
+                                                      caption=f"🔑 Ваш QR-код для открытия ячейки "
+                                                              f"№ {order.storage_unit.unit_id}.\n\n"
+                                                              f"Спасибо, что выбрали наш сервис❤️ "
+                                                      )
+            # При повторной выдаче отправляем уже загруженное в Telegram фото
+            qr_cache.put(order.order_id, qr_data, message.photo[-1].file_id)
 
             # Меняем статус заказа на "completed"
             order.status = 'completed'
-            order.save()
+            await run_orm(order.save, update_fields=['status'])
 
     except Order.DoesNotExist:
-        query.message.reply_text(
+        await query.message.reply_text(
             "❌ Заказ не найден. Возможно, он уже был завершен.")
     except ValidationError as e:
-        query.message.reply_text(f"⚠️ Ошибка валидации: {e}")
-    except Exception as e:
-        query.message.reply_text("❌ Произошла ошибка при обработке заказа.")
+        await query.message.reply_text(f"⚠️ Ошибка валидации: {e}")
+    except Exception:
+        logger.exception("Ошибка при обработке заказа %s", order_id)
+        await query.message.reply_text("❌ Произошла ошибка при обработке заказа.")
 
 
-def send_reminder(bot, order_id):
+def claim_due_reminders(claimed_at: datetime):
     """
-       Отправляет пользователю напоминание о завершении срока хранения его заказа через 14 дней.
+        Находит следующую пачку заказов, по которым пора отправить напоминание,
+        и помечает их временем отправки.
 
-       Эта функция извлекает информацию о заказе по его ID, формирует текстовое сообщение с напоминанием
-       о предстоящем окончании срока хранения и отправляет его пользователю через Telegram-бота.
+        Заказы выбираются по индексу (reminder_sent_at, reminder_date). Заказы
+        помечаются условным UPDATE только если напоминание еще не отправлялось,
+        поэтому повторный запуск или перезапуск бота не отправит напоминание дважды,
+        а помеченные заказы не попадают в следующую пачку.
+
+        Возвращает список помеченных заказов (пустой, если заказы закончились).
     """
-    try:
-        order = Order.objects.get(order_id=order_id)
-        user_id = order.user.user_id
-        message = (
-            f"🔔 Напоминание!\n"
-            f"Ваш заказ №{order_id} заканчивает срок хранения через 14 дней.\n"
-            f"📍 Адрес: {order.storage_unit.warehouse.warehouse_address or 'Не указан'}\n"
-            f"Пожалуйста, освободите ячейку в указанный срок."
+    due_ids = list(
+        Order.objects.filter(
+            reminder_sent_at__isnull=True,
+            reminder_date__lte=claimed_at,
+            end_date__gt=claimed_at,
+            status__in=['active', 'pending'],
         )
-        bot.send_message(chat_id=user_id, text=message)
-    except Exception as e:
-        print(f"Ошибка при отправке уведомления: {e}")
+        .order_by('reminder_date')
+        .values_list('order_id', flat=True)[:REMINDER_BATCH_SIZE]
+    )
+    if not due_ids:
+        return []
 
+    Order.objects.filter(order_id__in=due_ids, reminder_sent_at__isnull=True).update(
+        reminder_sent_at=claimed_at
+    )
+    return list(
+        Order.objects.filter(order_id__in=due_ids, reminder_sent_at=claimed_at).values(
+            'order_id',
+            'user_id',
+            'end_date',
+            'storage_unit__warehouse__warehouse_address',
+        )
+    )
 
-def check_and_send_reminders(bot):
-    """
-        Проверяет все заказы и отправляет напоминания пользователям о завершении срока хранения через 14 дней.
 
-        Эта функция извлекает все заказы, у которых дата напоминания (reminder_date) уже наступила,
-        и вызывает функцию send_reminder для каждого из таких заказов.
+def release_reminders(order_ids):
+    """
+        Снимает отметку об отправке напоминания, чтобы повторить отправку при следующем запуске.
     """
-    now = timezone.now()
-    orders_to_remind = Order.objects.filter(reminder_date__lte=now)
+    Order.objects.filter(order_id__in=order_ids).update(reminder_sent_at=None)
 
-    for order in orders_to_remind:
-        send_reminder(bot, order.order_id)
 
+async def send_reminder(bot, reminder) -> bool:
+    """
+       Отправляет пользователю напоминание о завершении срока хранения его заказа.
 
-def schedule_reminders(bot):
+       Сообщение уходит с низким приоритетом (BULK), поэтому не задерживает ответы
+       пользователям. Возвращает False, если напоминание нужно повторить позже.
     """
-        Планирует выполнение напоминаний для пользователей каждый день в 09:00.
+    order_id = reminder['order_id']
+    days_left = max((reminder['end_date'] - timezone.now()).days, 0)
+    message = (
+        f"🔔 Напоминание!\n"
+        f"Ваш заказ №{order_id} заканчивает срок хранения через {days_left} дней.\n"
+        f"📍 Адрес: {reminder['storage_unit__warehouse__warehouse_address'] or 'Не указан'}\n"
+        f"Пожалуйста, освободите ячейку в указанный срок."
+    )
+    try:
+        await bot.send_message(chat_id=reminder['user_id'], text=message, rate_limit_args=BULK)
+    except Forbidden:
+        # Пользователь заблокировал бота - повторять бессмысленно
+        logger.warning("Напоминание по заказу %s не доставлено: бот заблокирован", order_id)
+    except TelegramError:
+        logger.exception("Ошибка при отправке напоминания по заказу %s", order_id)
+        return False
+    return True
 
-        Эта функция использует библиотеку `schedule` для выполнения функции `check_and_send_reminders`
-        каждый день в 09:00, проверяя заказы и отправляя напоминания пользователям.
+
+async def check_and_send_reminders(context: CallbackContext):
     """
-    schedule.every().day.at("09:00").do(check_and_send_reminders, bot=bot)
+        Отправляет напоминания пользователям о скором завершении срока хранения.
 
-    while True:
-        schedule.run_pending()  # Выполняем все задачи, когда приходит их время
-        time.sleep(5)
+        Задача JobQueue: выполняется каждый день в REMINDER_TIME и один раз при запуске
+        бота, чтобы наверстать пропущенный запуск. Заказы обрабатываются пачками,
+        напоминания пачки отправляются параллельно через общую очередь исходящих
+        сообщений. Неотправленные напоминания повторяются при следующем запуске.
+    """
+    started_at = time.monotonic()
+    claimed_at = timezone.now()
+    sent, failed_ids = 0, []
+    while reminders := await run_orm(claim_due_reminders, claimed_at):
+        results = await asyncio.gather(*(send_reminder(context.bot, reminder) for reminder in reminders))
+        for reminder, ok in zip(reminders, results):
+            if ok:
+                sent += 1
+            else:
+                failed_ids.append(reminder['order_id'])
+
+    # Отметки снимаются после обхода, чтобы не выбрать те же заказы повторно
+    if failed_ids:
+        await run_orm(release_reminders, failed_ids)
+
+    logger.info(
+        "Напоминания: отправлено %s, ошибок %s, за %.1f с",
+        sent, len(failed_ids), time.monotonic() - started_at
+    )
 
 
-def cancel(update: Update, context: CallbackContext):
+async def cancel(update: Update, context: CallbackContext):
     """
        Завершает взаимодействие с пользователем, отправляя прощальное сообщение.
     """
-    update.message.reply_text(
+    await update.message.reply_text(
         "Вы завершили взаимодействие с ботом. До свидания!")
     return ConversationHandler.END
 
 
-def main_menu(update, context):
+async def main_menu(update, context):
     """
         Отображает главное меню бота с доступными опциями для пользователя.
 
@@ -784,71 +950,168 @@ def main_menu(update, context):
         [["Мои заказы", "Тарифы и условия хранения"], ["Заказать ячейку"]],
         resize_keyboard=True
     )
-    update.message.reply_text(
+    await update.message.reply_text(
         "Добро пожаловать в меню! Выберите действие:",
         reply_markup=reply_markup
     )
     return MAIN_MENU
 
 
-def main():
+async def main_menu_hint(update: Update, context: CallbackContext):
     """
-       Основная функция для инициализации и запуска Telegram-бота.
+        Подсказывает выбрать пункт меню в ответ на произвольный текст.
 
-       Эта функция выполняет следующие действия:
-       1. Загружает переменные окружения, включая токен для бота.
-       2. Создаёт экземпляр бота и диспетчера для обработки обновлений.
-       3. Регистрирует обработчики для различных состояний и команд:
+        Возвращает MAIN_MENU, чтобы состоянием диалога не стал объект отправленного сообщения.
+    """
+    await update.message.reply_text("Выберите пункт из меню!")
+    return MAIN_MENU
+
+
+async def sweep_statuses(context: CallbackContext):
+    """
+        Обновляет статусы заказов (ожидает -> активен -> просрочен) и занятость ячеек.
+
+        Задача JobQueue: статусы меняются несколькими массовыми UPDATE в пуле потоков ORM.
+    """
+    result = await run_orm(sweep_order_statuses)
+    logger.info(
+        "Статусы заказов: активировано %(activated)s, просрочено %(expired)s, "
+        "обновлено ячеек %(units_updated)s за %(duration).3f с",
+        result
+    )
+
+
+async def refresh_links(context: CallbackContext):
+    """
+        Сокращает новые ссылки и обновляет количество кликов через API VK.
+
+        Задача JobQueue: ссылки обрабатываются пачками с ограничением частоты
+        запросов к VK, поэтому сохранение ссылки в админке не ждет сети.
+    """
+    result = await refresh_link_stats()
+    logger.info(
+        "Статистика ссылок: обновлено %(refreshed)s, с ошибками %(failed)s за %(duration).1f с",
+        result
+    )
+
+
+async def log_update_stats(context: CallbackContext):
+    """
+        Записывает в лог статистику очереди обновлений (глубину очередей чатов и время ожидания),
+        метрики доставки исходящих сообщений и конкуренции за ячейки при бронировании.
+    """
+    stats = context.application.update_processor.stats()
+    logger.info(
+        "Очередь обновлений: ожидают %(pending)s, выполняются %(running)s из %(workers)s, "
+        "чатов в очереди %(queued_chats)s (макс. глубина %(max_chat_queue_depth)s), "
+        "обработано %(processed)s, ожидание ср. %(avg_wait).3f с, макс. %(max_wait).3f с",
+        stats
+    )
+    send_stats = context.bot.rate_limiter.stats()
+    logger.info(
+        "Исходящие сообщения: отправлено %(sent)s (ответов %(sent_interactive)s, "
+        "рассылок %(sent_bulk)s), ошибок %(failed)s, повторов после 429 %(retried)s, "
+        "в очереди %(queued)s, ожидание ср. %(avg_wait).3f с, макс. %(max_wait).3f с",
+        send_stats
+    )
+    logger.info(
+        "Бронирование ячеек: успешно %(reserved)s, конфликтов %(conflicts)s, "
+        "ожиданий блокировки базы %(lock_timeouts)s, без свободной ячейки после попыток %(exhausted)s",
+        get_allocator().stats()
+    )
+
+
+async def post_init(application: Application):
+    """
+        Проверяет наличие статических файлов бота и загружает их сохраненные file_id.
+    """
+    await run_orm(asset_cache.load)
+
+
+async def post_shutdown(application: Application):
+    """
+        Останавливает пулы для обращений к ORM и генерации QR-кодов после остановки бота.
+    """
+    shutdown_orm_pool()
+    shutdown_qr_pool()
+
+
+def build_application(
+    token: str,
+    concurrent_updates: int = 256,
+    webhook: bool = False,
+    persistence: Optional[BasePersistence] = None,
+    base_url: Optional[str] = None,
+    link_refresh: bool = False,
+) -> Application:
+    """
+       Создаёт асинхронное приложение Telegram-бота и регистрирует обработчики.
+
+       Регистрируются обработчики для различных состояний и команд:
            - Обработчик начала диалога с пользователем.
            - Обработчики для работы с меню, заказами и взаимодействием с пользователем.
            - Обработчики для обработки callback-запросов и переходов между состояниями.
-       4. Запускает цикл обработки обновлений и ожидание событий от пользователей.
-       5. Запускает функцию для отправки напоминаний о сроках хранения.
+       Обновления одного чата обрабатываются строго по порядку, а обновления
+       разных чатов - параллельно, не более `concurrent_updates` одновременно.
+       В режиме вебхука (`webhook=True`) приложение создаётся без long polling:
+       обновления в очередь приложения передаёт ASGI-приложение Django.
+       Если передано хранилище `persistence`, состояния диалогов и данные
+       пользователей переживают перезапуск бота.
+       Все исходящие запросы проходят через общую очередь с ограничением частоты
+       (PriorityRateLimiter). `base_url` позволяет направить запросы на другой
+       сервер Bot API, например локальный.
     """
-    env = Env()
-    env.read_env()
-
-    token = env.str('TG_BOT_TOKEN')
-    bot = telegram.Bot(token=token)
-
-    updater = Updater(token)
-    dispatcher = updater.dispatcher
+    builder = (
+        Application.builder()
+        .token(token)
+        .concurrent_updates(ChatOrderedUpdateProcessor(concurrent_updates))
+        .rate_limiter(PriorityRateLimiter())
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+    )
+    if base_url:
+        builder = builder.base_url(f'{base_url}/bot').base_file_url(f'{base_url}/file/bot')
+    if webhook:
+        builder = builder.updater(None)
+    if persistence is not None:
+        builder = builder.persistence(persistence)
+    application = builder.build()
 
     start_conv_handler = ConversationHandler(
         entry_points=[CommandHandler("start", start)],
         states={
             CONSENT: [
-                MessageHandler(Filters.regex(
+                MessageHandler(filters.Regex(
                     "^(Принять|Отказаться)$"), handle_consent),
             ],
         },
         fallbacks=[CommandHandler("cancel", cancel)],
+        name="start_conversation",
+        persistent=persistence is not None,
     )
 
     main_menu_handler = ConversationHandler(
         entry_points=[
             # Вход в главное меню через эту команду
             CommandHandler("main_menu", main_menu),
-            MessageHandler(Filters.regex("^Меню$"), main_menu),
-            MessageHandler(Filters.regex("^Мои заказы$"), handle_my_order),
-            MessageHandler(Filters.regex(
+            MessageHandler(filters.Regex("^Меню$"), main_menu),
+            MessageHandler(filters.Regex("^Мои заказы$"), handle_my_order),
+            MessageHandler(filters.Regex(
                 "^Тарифы и условия хранения$"), tariffs),
-            MessageHandler(Filters.regex("^Заказать ячейку$"), order_box),
+            MessageHandler(filters.Regex("^Заказать ячейку$"), order_box),
         ],
         states={
             MAIN_MENU: [
-                MessageHandler(Filters.regex("^Мои заказы$"), handle_my_order),
-                MessageHandler(Filters.regex(
+                MessageHandler(filters.Regex("^Мои заказы$"), handle_my_order),
+                MessageHandler(filters.Regex(
                     "^Тарифы и условия хранения$"), tariffs),
-                MessageHandler(Filters.regex("^Заказать ячейку$"), order_box),
-                MessageHandler(
-                    Filters.text & ~Filters.command,
-                    lambda update, context: update.message.reply_text(
-                        "Выберите пункт из меню!")
-                ),
+                MessageHandler(filters.Regex("^Заказать ячейку$"), order_box),
+                MessageHandler(filters.TEXT & ~filters.COMMAND, main_menu_hint),
             ],
         },
         fallbacks=[CommandHandler("cancel", cancel)],
+        name="main_menu",
+        persistent=persistence is not None,
     )
 
     order_conv_handler = ConversationHandler(
@@ -857,51 +1120,111 @@ def main():
         ],
         states={
             REQUEST_NAME: [
-                MessageHandler(Filters.text & ~Filters.command,
+                MessageHandler(filters.TEXT & ~filters.COMMAND,
                                check_name_and_request_phone),
             ],
             REQUEST_PHONE: [
-                MessageHandler(Filters.text & ~Filters.command,
+                MessageHandler(filters.TEXT & ~filters.COMMAND,
                                check_phone_and_request_start_date),
             ],
             REQUEST_START_DATE: [
-                MessageHandler(Filters.text & ~Filters.command,
+                MessageHandler(filters.TEXT & ~filters.COMMAND,
                                check_start_date_and_request_duration),
             ],
             REQUEST_DURATION: [
-                MessageHandler(Filters.text & ~Filters.command,
+                MessageHandler(filters.TEXT & ~filters.COMMAND,
                                check_duration_and_request_address),
             ],
             REQUEST_ADDRESS: [
-                MessageHandler(Filters.text & ~Filters.command,
+                MessageHandler(filters.TEXT & ~filters.COMMAND,
                                finalize_order_courier),
             ],
         },
         fallbacks=[CommandHandler("cancel", cancel)],
+        name="order_form",
+        persistent=persistence is not None,
     )
 
-    dispatcher.add_handler(start_conv_handler)
-    dispatcher.add_handler(order_conv_handler)
-    dispatcher.add_handler(main_menu_handler)
+    application.add_handler(start_conv_handler)
+    application.add_handler(order_conv_handler)
+    application.add_handler(main_menu_handler)
 
-    dispatcher.add_handler(
+    application.add_handler(
         CallbackQueryHandler(handle_courier_delivery, pattern="^deliver_courier$")
     )
-    dispatcher.add_handler(
+    application.add_handler(
         CallbackQueryHandler(handle_self_delivery, pattern="^self_delivery$")
     )
-    dispatcher.add_handler(
+    application.add_handler(
         CallbackQueryHandler(start_order_form, pattern="^continue_order$")
     )
-    dispatcher.add_handler(CallbackQueryHandler(
+    application.add_handler(CallbackQueryHandler(
         handle_pickup_order, pattern=r'^pickup_order_\d+$')
     )
+    application.add_handler(CallbackQueryHandler(
+        handle_orders_page, pattern=r'^orders_(after|before)_\d+$')
+    )
 
-    # Запуск бота
-    updater.start_polling()
-    updater.idle()
+    application.job_queue.run_repeating(log_update_stats, interval=UPDATE_STATS_INTERVAL)
+    application.job_queue.run_repeating(sweep_statuses, interval=STATUS_SWEEP_INTERVAL, first=0)
+    reminder_time = REMINDER_TIME.replace(tzinfo=ZoneInfo(settings.TIME_ZONE))
+    application.job_queue.run_daily(check_and_send_reminders, time=reminder_time)
+    application.job_queue.run_once(check_and_send_reminders, when=REMINDER_STARTUP_DELAY)
+    if link_refresh:
+        application.job_queue.run_repeating(
+            refresh_links, interval=LINK_REFRESH_INTERVAL, first=LINK_REFRESH_STARTUP_DELAY
+        )
+
+    return application
 
-    schedule_reminders(bot)
+
+def create_application(env: Env, webhook: bool = False) -> Application:
+    """
+       Создаёт пулы для обращений к ORM и генерации QR-кодов, настраивает выбор
+       ячеек и создаёт приложение бота по настройкам окружения.
+    """
+    configure_orm_pool(env.int('TG_BOT_ORM_POOL_SIZE', 8))
+    configure_qr_pool(env.int('TG_BOT_QR_POOL_SIZE', 2))
+    configure_allocator(env.str('TG_BOT_ALLOCATION_STRATEGY', 'random'))
+    return build_application(
+        env.str('TG_BOT_TOKEN'),
+        concurrent_updates=env.int('TG_BOT_CONCURRENT_UPDATES', 256),
+        webhook=webhook,
+        persistence=make_persistence(
+            env.str('TG_BOT_PERSISTENCE', 'database'),
+            flush_interval=env.float('TG_BOT_PERSISTENCE_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL),
+        ),
+        base_url=env.str('TG_API_BASE_URL', None),
+        link_refresh=bool(env.str('VK_TOKEN', '')),
+    )
+
+
+def main():
+    """
+       Основная функция для инициализации и запуска Telegram-бота.
+
+       Эта функция выполняет следующие действия:
+       1. Загружает переменные окружения, включая токен для бота.
+       2. Создаёт пул потоков для обращений к ORM и асинхронное приложение бота.
+       3. Запускает цикл обработки обновлений (long polling) и ожидание событий от пользователей.
+          Напоминания о сроках хранения отправляются задачей JobQueue вместе с обработкой обновлений.
+          Если задан TG_WEBHOOK_URL, бот запускается ASGI-сервером вместе с Django.
+    """
+    env = Env()
+    env.read_env()
+
+    # В режиме вебхука бот работает внутри ASGI-приложения Django
+    if is_webhook_mode(env):
+        logger.error(
+            "Задан TG_WEBHOOK_URL: запустите бота через ASGI-сервер "
+            "(uvicorn storage_bot.asgi:application)"
+        )
+        return
+
+    application = create_application(env)
+
+    # Запуск бота
+    application.run_polling()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from django.core.cache import cache
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from reservations.models import DASHBOARD_CACHE_KEY, Order, StorageUnit
+
+# Сколько секунд хранить сводку в кэше
+DASHBOARD_CACHE_TIMEOUT = 60
+
+# За сколько дней показывать ближайшие окончания аренды
+EXPIRING_SOON_DAYS = 7
+
+# Сколько ближайших окончаний аренды показывать списком
+EXPIRING_SOON_LIMIT = 10
+
+
+def collect_dashboard_stats(now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Собирает сводку по складам и заказам несколькими агрегирующими запросами.
+
+    Стоимость заказов считается в базе по тарифам StorageUnit.DAILY_RATES,
+    поэтому заказы в память не загружаются.
+
+    Args:
+        now (datetime, optional): Момент, на который собирается сводка.
+            По умолчанию - текущее время.
+
+    Returns:
+        Dict[str, Any]: Занятость по складам и размерам, заказы по статусам,
+        ожидаемая выручка и ближайшие окончания аренды.
+    """
+    now = now or timezone.now()
+    sizes = dict(StorageUnit.SIZE_CHOICES)
+
+    occupancy: List[Dict[str, Any]] = []
+    units = (
+        StorageUnit.objects.values('warehouse_id', 'warehouse__name', 'size')
+        .annotate(total=Count('pk'), occupied=Count('pk', filter=Q(is_occupied=True)))
+        .order_by('warehouse__name', 'warehouse_id', 'size')
+    )
+    for row in units:
+        occupancy.append({
+            'warehouse': row['warehouse__name'],
+            'size': sizes.get(row['size'], row['size']),
+            'total': row['total'],
+            'occupied': row['occupied'],
+            'free': row['total'] - row['occupied'],
+            'percent': round(100 * row['occupied'] / row['total']) if row['total'] else 0,
+        })
+
+    statuses = dict(Order.STATUS_CHOICES)
+    status_counts = dict(Order.objects.values_list('status').annotate(count=Count('pk')).order_by())
+    orders_by_status = [
+        {'status': label, 'count': status_counts.get(status, 0)}
+        for status, label in Order.STATUS_CHOICES
+    ]
+
+    # Ожидаемая выручка - стоимость еще не закончившихся ожидающих и активных заказов
+    order_cost = F('storage_duration') * StorageUnit.daily_rate_expression('storage_unit__size')
+    revenue_rows = (
+        Order.objects.blocking()
+        .values('status')
+        .annotate(count=Count('pk'), revenue=Sum(order_cost))
+        .order_by()
+    )
+    revenue = [
+        {'status': statuses[row['status']], 'count': row['count'], 'revenue': row['revenue'] or 0}
+        for row in revenue_rows
+    ]
+
+    expiring = Order.objects.blocking().filter(
+        end_date__gte=now, end_date__lt=now + timedelta(days=EXPIRING_SOON_DAYS)
+    )
+    expiring_soon = list(
+        expiring.select_related('user', 'storage_unit__warehouse')
+        .order_by('end_date')[:EXPIRING_SOON_LIMIT]
+    )
+
+    return {
+        'occupancy': occupancy,
+        'units_total': sum(row['total'] for row in occupancy),
+        'units_occupied': sum(row['occupied'] for row in occupancy),
+        'orders_by_status': orders_by_status,
+        'revenue': revenue,
+        'revenue_total': sum(row['revenue'] for row in revenue),
+        'expiring_soon': expiring_soon,
+        'expiring_soon_count': expiring.count(),
+        'expiring_soon_days': EXPIRING_SOON_DAYS,
+        'collected_at': now,
+    }
+
+
+def get_dashboard_stats() -> Dict[str, Any]:
+    """Возвращает сводку из кэша, собирая ее заново не чаще раза в DASHBOARD_CACHE_TIMEOUT секунд.
+
+    Кэш сбрасывается сигналами при сохранении заказов, ячеек и складов
+    (см. dashboard_cache_handler) и после обновления статусов заказов.
+
+    Returns:
+        Dict[str, Any]: Сводка по складам и заказам.
+    """
+    stats = cache.get(DASHBOARD_CACHE_KEY)
+    if stats is None:
+        stats = collect_dashboard_stats()
+        cache.set(DASHBOARD_CACHE_KEY, stats, DASHBOARD_CACHE_TIMEOUT)
+    return stats
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from django.db.models import Q
+from django.utils import timezone
+
+from reservations.link_statistics import VK_EXECUTE_LIMIT, get_vk_client
+from reservations.models import Link
+from reservations.runtime import run_orm
+
+logger = logging.getLogger(__name__)
+
+# Сколько ссылок читать из базы и обновлять за один шаг
+LINK_REFRESH_BATCH_SIZE = 100
+
+# Сколько запросов к API VK выполнять одновременно
+LINK_REFRESH_CONCURRENCY = 3
+
+# Через сколько статистика ссылки считается устаревшей
+LINK_STATS_MAX_AGE = timedelta(hours=1)
+
+
+def get_stale_links(after_id: int, stale_before: datetime, limit: int) -> List[Dict[str, Any]]:
+    """Возвращает следующую пачку ссылок, статистику которых пора обновить.
+
+    Ссылки перебираются по первичному ключу, поэтому за один проход каждая
+    ссылка обновляется не более одного раза, даже если API VK для нее
+    отвечает ошибкой.
+
+    Args:
+        after_id (int): ID последней обработанной ссылки.
+        stale_before (datetime): Статистика, обновленная раньше, считается устаревшей.
+        limit (int): Размер пачки.
+
+    Returns:
+        List[Dict[str, Any]]: ID, ссылки и текущее количество кликов.
+    """
+    stale = Q(stats_updated_at__isnull=True) | Q(stats_updated_at__lt=stale_before)
+    return list(
+        Link.objects.filter(stale, pk__gt=after_id)
+        .order_by('pk')
+        .values('pk', 'original_url', 'short_url', 'click_count')[:limit]
+    )
+
+
+async def refresh_link_stats(
+    batch_size: int = LINK_REFRESH_BATCH_SIZE,
+    concurrency: int = LINK_REFRESH_CONCURRENCY,
+    max_age: timedelta = LINK_STATS_MAX_AGE,
+) -> Dict[str, Any]:
+    """Обновляет сокращенные ссылки и количество кликов пачками.
+
+    Ссылки без сокращенной версии сокращаются, для остальных запрашивается
+    количество кликов. Обращения к API объединяются методом execute по
+    VK_EXECUTE_LIMIT ссылок в одном запросе. Одновременно выполняется не больше
+    `concurrency` запросов, а частоту всех запросов, включая повторы, ограничивает
+    token bucket клиента API VK. Результаты пачки записываются одним bulk_update.
+
+    Args:
+        batch_size (int): Сколько ссылок обрабатывать за один шаг.
+        concurrency (int): Сколько запросов к API VK выполнять одновременно.
+        max_age (timedelta): Через сколько статистика ссылки считается устаревшей.
+
+    Returns:
+        Dict[str, Any]: Количество обновленных ссылок, ошибок и длительность в секундах.
+    """
+    started_at = time.monotonic()
+    stale_before = timezone.now() - max_age
+    client = get_vk_client()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def shorten(links: List[Dict[str, Any]]) -> List[Link]:
+        """Сокращает ссылки одним запросом и возвращает успешно сокращенные."""
+        async with semaphore:
+            try:
+                short_urls = await asyncio.to_thread(client.shorten_links, [link['original_url'] for link in links])
+            except Exception as error:
+                logger.warning("Не удалось сократить ссылки %s: %s", [link['pk'] for link in links], error)
+                return []
+        # По только что сокращенной ссылке еще не было кликов
+        return [
+            Link(pk=link['pk'], short_url=short_url, click_count=link['click_count'], stats_updated_at=timezone.now())
+            for link, short_url in zip(links, short_urls) if short_url
+        ]
+
+    async def count(links: List[Dict[str, Any]]) -> List[Link]:
+        """Запрашивает клики по ссылкам одним запросом и возвращает обновленные."""
+        async with semaphore:
+            try:
+                click_counts = await asyncio.to_thread(client.count_clicks_many, [link['short_url'] for link in links])
+            except Exception as error:
+                logger.warning("Не удалось обновить статистику ссылок %s: %s", [link['pk'] for link in links], error)
+                return []
+        return [
+            Link(pk=link['pk'], short_url=link['short_url'], click_count=click_count, stats_updated_at=timezone.now())
+            for link, click_count in zip(links, click_counts) if click_count is not None
+        ]
+
+    refreshed, failed, after_id = 0, 0, 0
+    while True:
+        links = await run_orm(get_stale_links, after_id, stale_before, batch_size)
+        if not links:
+            break
+        after_id = links[-1]['pk']
+
+        new = [link for link in links if not link['short_url']]
+        shortened = [link for link in links if link['short_url']]
+        tasks = [
+            shorten(new[start:start + VK_EXECUTE_LIMIT]) for start in range(0, len(new), VK_EXECUTE_LIMIT)
+        ] + [
+            count(shortened[start:start + VK_EXECUTE_LIMIT]) for start in range(0, len(shortened), VK_EXECUTE_LIMIT)
+        ]
+        updated = [link for chunk in await asyncio.gather(*tasks) for link in chunk]
+        if updated:
+            await run_orm(Link.objects.bulk_update, updated, ['short_url', 'click_count', 'stats_updated_at'])
+        refreshed += len(updated)
+        failed += len(links) - len(updated)
+
+    return {
+        'refreshed': refreshed,
+        'failed': failed,
+        'duration': time.monotonic() - started_at,
+    }
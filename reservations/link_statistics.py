@@ -1,8 +1,245 @@
+import json
+import logging
 import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 from urllib.parse import urlparse
 
 import requests
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+from reservations.rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+VK_API_URL = 'https://api.vk.com/method/'
+VK_API_VERSION = '5.199'
+
+# Таймауты запроса к API VK: на установку соединения и на чтение ответа (секунды)
+VK_TIMEOUT = (3.05, 10)
+
+# Сколько раз повторять запрос при временной ошибке и базовая пауза между попытками (секунды)
+VK_MAX_RETRIES = 3
+VK_BACKOFF = 0.5
+
+# Сколько соединений с API VK держать открытыми
+VK_POOL_SIZE = 10
+
+# Ограничение API VK: не больше 3 запросов в секунду с одним токеном
+VK_REQUESTS_PER_SECOND = 3
+
+# Метод execute выполняет не больше 25 обращений к API за запрос
+VK_EXECUTE_LIMIT = 25
+
+# Временные ошибки API VK: неизвестная ошибка, слишком много запросов в секунду,
+# flood control, внутренняя ошибка сервера
+VK_RETRY_ERROR_CODES = {1, 6, 9, 10}
+
+_vk_client: Optional['VKClient'] = None
+_vk_client_lock = threading.Lock()
+
+
+class VKAPIError(Exception):
+    """Ошибка, которую вернуло API VK.
+
+    Атрибуты:
+        code (int): Код ошибки VK.
+        message (str): Описание ошибки.
+    """
+
+    def __init__(self, code: int, message: str) -> None:
+        super().__init__(f"Ошибка API VK {code}: {message}")
+        self.code = code
+        self.message = message
+
+
+class VKClient:
+    """Клиент API VK для сокращения ссылок и получения статистики кликов.
+
+    Держит одну сессию requests с пулом keep-alive соединений, поэтому запросы
+    не устанавливают заново TLS-соединение. Каждая попытка запроса, включая
+    повторы, забирает токен из общего token bucket клиента, поэтому все
+    обращения с одним токеном VK укладываются в ограничение частоты. Временные
+    ошибки (сеть, 5xx, 429 и ограничения частоты VK) повторяются
+    с экспоненциальной паузой. Статистику многих ссылок можно получить одним
+    запросом через метод execute.
+
+    Атрибуты:
+        token (str): Токен доступа VK.
+        base_url (str): Адрес API VK (для локальной заглушки - ее адрес).
+        timeout (Tuple[float, float]): Таймауты соединения и чтения.
+        max_retries (int): Сколько раз повторять запрос при временной ошибке.
+        backoff (float): Базовая пауза между попытками, удваивается с каждой попыткой.
+        bucket (TokenBucket, optional): Ограничение частоты запросов; None - без ограничения.
+        session (requests.Session): Сессия с пулом соединений.
+    """
+
+    def __init__(
+        self,
+        token: str,
+        base_url: str = VK_API_URL,
+        timeout: Tuple[float, float] = VK_TIMEOUT,
+        max_retries: int = VK_MAX_RETRIES,
+        backoff: float = VK_BACKOFF,
+        pool_size: int = VK_POOL_SIZE,
+        requests_per_second: Optional[float] = VK_REQUESTS_PER_SECOND,
+    ) -> None:
+        self.token = token
+        self.base_url = base_url.rstrip('/') + '/'
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.bucket = TokenBucket(requests_per_second, requests_per_second) if requests_per_second else None
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def close(self) -> None:
+        """Закрывает соединения сессии."""
+        self.session.close()
+
+    def call(self, method: str, **params: Any) -> Any:
+        """Вызывает метод API VK, повторяя запрос при временных ошибках.
+
+        Args:
+            method (str): Название метода, например 'utils.getShortLink'.
+            **params: Параметры метода.
+
+        Returns:
+            Any: Поле response ответа VK.
+
+        Raises:
+            VKAPIError: Если VK вернул ошибку.
+            requests.RequestException: Если запрос не удался после всех попыток.
+        """
+        data = {'access_token': self.token, 'v': VK_API_VERSION, **params}
+        attempt = 0
+        while True:
+            if self.bucket is not None:
+                self.bucket.acquire()
+            try:
+                response = self.session.post(self.base_url + method, data=data, timeout=self.timeout)
+                response.raise_for_status()
+                payload = response.json()
+                if 'error' in payload:
+                    error = payload['error']
+                    raise VKAPIError(error.get('error_code', 0), error.get('error_msg', ''))
+                return payload['response']
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError, VKAPIError) as error:
+                if not self._is_transient(error) or attempt >= self.max_retries:
+                    raise
+                delay = self.backoff * 2 ** attempt
+                attempt += 1
+                logger.info("Повтор запроса %s к API VK через %.1f с: %s", method, delay, error)
+                time.sleep(delay)
+
+    @staticmethod
+    def _is_transient(error: Exception) -> bool:
+        """Проверяет, имеет ли смысл повторить запрос после ошибки."""
+        if isinstance(error, VKAPIError):
+            return error.code in VK_RETRY_ERROR_CODES
+        if isinstance(error, requests.HTTPError):
+            status = error.response.status_code if error.response is not None else 0
+            return status == 429 or status >= 500
+        return True
+
+    def execute(self, calls: Sequence[Tuple[str, Dict[str, Any]]]) -> List[Any]:
+        """Выполняет несколько методов API одним запросом через метод execute.
+
+        Args:
+            calls (Sequence[Tuple[str, Dict[str, Any]]]): Пары (метод, параметры),
+                не больше VK_EXECUTE_LIMIT.
+
+        Returns:
+            List[Any]: Результаты методов в том же порядке. Для метода,
+            завершившегося ошибкой, VK возвращает False.
+        """
+        if len(calls) > VK_EXECUTE_LIMIT:
+            raise ValueError(f"execute выполняет не больше {VK_EXECUTE_LIMIT} методов за запрос")
+        code = 'return [{}];'.format(', '.join(
+            f'API.{method}({json.dumps(params, ensure_ascii=False)})' for method, params in calls
+        ))
+        return self.call('execute', code=code)
+
+    def shorten_link(self, url: str) -> str:
+        """Сокращает URL-адрес.
+
+        Args:
+            url (str): URL-адрес для сокращения.
+
+        Returns:
+            str: Сокращенный URL-адрес.
+        """
+        return self.call('utils.getShortLink', url=url)['short_url']
+
+    def count_clicks(self, short_url: str) -> int:
+        """Получает количество кликов по сокращенной ссылке.
+
+        Args:
+            short_url (str): Сокращенная ссылка.
+
+        Returns:
+            int: Количество кликов за все время.
+        """
+        return _views(self.call('utils.getLinkStats', key=_link_key(short_url), interval='forever'))
+
+    def shorten_links(self, urls: Sequence[str]) -> List[Optional[str]]:
+        """Сокращает несколько URL-адресов, по VK_EXECUTE_LIMIT за запрос.
+
+        Args:
+            urls (Sequence[str]): URL-адреса для сокращения.
+
+        Returns:
+            List[Optional[str]]: Сокращенные адреса в том же порядке,
+            None - если адрес сократить не удалось.
+        """
+        results: List[Optional[str]] = []
+        for start in range(0, len(urls), VK_EXECUTE_LIMIT):
+            chunk = urls[start:start + VK_EXECUTE_LIMIT]
+            responses = self.execute([('utils.getShortLink', {'url': url}) for url in chunk])
+            results.extend(response['short_url'] if response else None for response in responses)
+        return results
+
+    def count_clicks_many(self, short_urls: Sequence[str]) -> List[Optional[int]]:
+        """Получает количество кликов по нескольким ссылкам, по VK_EXECUTE_LIMIT за запрос.
+
+        Args:
+            short_urls (Sequence[str]): Сокращенные ссылки.
+
+        Returns:
+            List[Optional[int]]: Количество кликов в том же порядке,
+            None - если статистику получить не удалось.
+        """
+        results: List[Optional[int]] = []
+        for start in range(0, len(short_urls), VK_EXECUTE_LIMIT):
+            chunk = short_urls[start:start + VK_EXECUTE_LIMIT]
+            responses = self.execute([
+                ('utils.getLinkStats', {'key': _link_key(short_url), 'interval': 'forever'})
+                for short_url in chunk
+            ])
+            for short_url, response in zip(chunk, responses):
+                try:
+                    results.append(_views(response) if response else None)
+                except VKAPIError as error:
+                    # Неожиданный ответ по одной ссылке не отменяет статистику остальных
+                    logger.warning("Не удалось получить клики по ссылке %s: %s", short_url, error)
+                    results.append(None)
+        return results
+
+
+def _link_key(short_url: str) -> str:
+    """Возвращает ключ сокращенной ссылки (путь без начального слэша)."""
+    return urlparse(short_url).path[1:]
+
+
+def _views(stats: Any) -> int:
+    """Достает количество кликов из ответа utils.getLinkStats."""
+    if not isinstance(stats, dict) or 'stats' not in stats:
+        raise VKAPIError(0, "Ошибка при получении статистики кликов.")
+    return stats['stats'][0]['views'] if stats['stats'] else 0
 
 
 def get_token() -> str:
@@ -15,6 +252,24 @@ def get_token() -> str:
     return os.getenv('VK_TOKEN')
 
 
+def get_vk_client() -> VKClient:
+    """Возвращает общий клиент API VK, создавая его при первом обращении.
+
+    Токен и адрес API (VK_API_BASE_URL, например адрес локальной заглушки)
+    читаются из окружения один раз.
+
+    Returns:
+        VKClient: Клиент API VK.
+    """
+    global _vk_client
+    if _vk_client is None:
+        with _vk_client_lock:
+            if _vk_client is None:
+                token = get_token()
+                _vk_client = VKClient(token, base_url=os.getenv('VK_API_BASE_URL') or VK_API_URL)
+    return _vk_client
+
+
 def shorten_link(url: str) -> str:
     """Сокращает указанную URL-адрес с помощью API VK.
 
@@ -27,18 +282,7 @@ def shorten_link(url: str) -> str:
     Raises:
         requests.RequestException: При выполнении запроса к API VK.
     """
-    token = get_token()
-    url_template = 'https://api.vk.com/method/utils.getShortLink'
-    version = '5.199'
-    params = {
-        'access_token': token,
-        'v': version,
-        'url': url,
-    }
-    response = requests.get(url_template, params=params)
-    response.raise_for_status()
-    short_url_data = response.json()
-    return short_url_data['response']['short_url']
+    return get_vk_client().shorten_link(url)
 
 
 def count_clikcs(short_url) -> int:
@@ -53,30 +297,4 @@ def count_clikcs(short_url) -> int:
     Raises:
         Exception: При получении статистики или ошибка API VK.
     """
-    token = get_token()
-    parsed = urlparse(short_url)
-    version = '5.199'
-    url_template = 'https://api.vk.com/method/utils.getLinkStats'
-
-    params = {
-        'access_token': token,
-        'v': version,
-        'key': parsed.path[1:],
-        'interval': 'forever',
-    }
-
-    response = requests.get(url_template, params=params)
-    response.raise_for_status()
-    response_data = response.json()
-
-    if 'error' in response_data:
-        raise Exception(f"Ошибка API: {response_data['error']['error_msg']}")
-
-    if 'response' in response_data and 'stats' in response_data['response']:
-        stats = response_data['response']['stats']
-        if isinstance(stats, list) and len(stats) > 0:
-            return stats[0]['views']
-        else:
-            return 0
-    else:
-        raise Exception("Ошибка при получении статистики кликов.")
+    return get_vk_client().count_clicks(short_url)
@@ -0,0 +1,133 @@
+import csv
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from reservations.models import StorageUnit, Warehouse
+
+DEFAULT_BATCH_SIZE = 100
+
+
+class Command(BaseCommand):
+    """Создает склады с ячейками хранения из файла CSV или JSON.
+
+    CSV: колонки name, warehouse_address и количество ячеек по размерам
+    (small, medium, large). JSON: список объектов с полями name,
+    warehouse_address и layout, например:
+        [{"name": "Склад 1", "warehouse_address": "...", "layout": {"small": 1200, "large": 800}}]
+
+    Пример:
+        python manage.py import_warehouses warehouses.csv --batch-size 50
+    """
+    help = 'Создает склады с ячейками хранения из файла CSV или JSON пачками'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('path', type=Path, help='Путь к файлу .csv или .json')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'Сколько складов создавать в одной транзакции (по умолчанию {DEFAULT_BATCH_SIZE})',
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        path: Path = options['path']
+        batch_size: int = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('Размер пачки должен быть положительным.')
+
+        started_at = time.monotonic()
+        warehouses_count, units_count = 0, 0
+        batch: List[Warehouse] = []
+        for number, row in enumerate(self.read_rows(path), start=1):
+            warehouse = self.build_warehouse(row, number)
+            batch.append(warehouse)
+            if len(batch) == batch_size:
+                units_count += self.save_batch(batch)
+                warehouses_count += len(batch)
+                batch = []
+        if batch:
+            units_count += self.save_batch(batch)
+            warehouses_count += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано складов: {warehouses_count}, ячеек: {units_count} '
+            f'за {time.monotonic() - started_at:.1f} с'
+        ))
+
+    def read_rows(self, path: Path) -> Iterator[Dict[str, Any]]:
+        """Читает описания складов из файла CSV или JSON.
+
+        Args:
+            path (Path): Путь к файлу.
+
+        Yields:
+            Dict[str, Any]: Поля склада и раскладка ячеек.
+        """
+        if not path.exists():
+            raise CommandError(f'Файл {path} не найден.')
+        suffix = path.suffix.lower()
+        if suffix == '.json':
+            with path.open(encoding='utf-8') as file:
+                rows = json.load(file)
+            if not isinstance(rows, list):
+                raise CommandError('JSON должен содержать список складов.')
+            yield from rows
+        elif suffix == '.csv':
+            sizes = [size for size, _ in StorageUnit.SIZE_CHOICES]
+            with path.open(encoding='utf-8', newline='') as file:
+                for number, row in enumerate(csv.DictReader(file), start=1):
+                    try:
+                        layout = {size: int(row[size]) for size in sizes if row.get(size)}
+                    except ValueError:
+                        raise CommandError(f'Склад №{number}: количество ячеек должно быть числом.')
+                    yield {
+                        'name': row.get('name'),
+                        'warehouse_address': row.get('warehouse_address') or None,
+                        'layout': layout,
+                    }
+        else:
+            raise CommandError('Поддерживаются только файлы .csv и .json.')
+
+    def build_warehouse(self, row: Dict[str, Any], number: int) -> Warehouse:
+        """Создает несохраненный склад и проверяет его раскладку.
+
+        Args:
+            row (Dict[str, Any]): Поля склада и раскладка ячеек.
+            number (int): Номер склада в файле (для сообщений об ошибках).
+
+        Returns:
+            Warehouse: Несохраненный склад.
+        """
+        if not row.get('name'):
+            raise CommandError(f'Склад №{number}: не указано название.')
+        warehouse = Warehouse(
+            name=row['name'],
+            warehouse_address=row.get('warehouse_address'),
+            layout=row.get('layout') or {},
+        )
+        try:
+            warehouse.clean()
+        except ValidationError as error:
+            raise CommandError(f'Склад №{number} ({warehouse.name}): {"; ".join(error.messages)}')
+        return warehouse
+
+    def save_batch(self, batch: List[Warehouse]) -> int:
+        """Создает пачку складов с ячейками в одной транзакции.
+
+        Args:
+            batch (List[Warehouse]): Несохраненные склады.
+
+        Returns:
+            int: Количество созданных ячеек.
+        """
+        Warehouse.provision_many(batch)
+        units_count = sum(
+            warehouse.layout.get(size, 0) for warehouse in batch for size, _ in StorageUnit.SIZE_CHOICES
+        )
+        self.stdout.write(f'Создано складов: {len(batch)}, ячеек: {units_count}')
+        return units_count
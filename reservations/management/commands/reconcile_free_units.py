@@ -0,0 +1,27 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from reservations.models import FreeUnitCounter
+
+
+class Command(BaseCommand):
+    """Пересобирает счетчики свободных ячеек по таблице ячеек.
+
+    Пример:
+        python manage.py reconcile_free_units --warehouse 1 --warehouse 2
+    """
+    help = 'Пересчитывает счетчики свободных ячеек по таблице ячеек хранения'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--warehouse',
+            type=int,
+            action='append',
+            dest='warehouse_ids',
+            help='ID склада (можно указать несколько раз). По умолчанию - все склады.',
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        count = FreeUnitCounter.rebuild(options['warehouse_ids'])
+        self.stdout.write(self.style.SUCCESS(f'Пересчитано счетчиков: {count}'))
@@ -0,0 +1,41 @@
+import asyncio
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from reservations.link_refresher import LINK_REFRESH_BATCH_SIZE, LINK_REFRESH_CONCURRENCY, refresh_link_stats
+
+
+class Command(BaseCommand):
+    """Сокращает новые ссылки и обновляет количество кликов через API VK.
+
+    Пример:
+        python manage.py refresh_link_stats --batch-size 100 --concurrency 3
+    """
+    help = 'Обновляет сокращенные ссылки и количество кликов пачками с ограничением частоты запросов к VK'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=LINK_REFRESH_BATCH_SIZE,
+            help=f'Сколько ссылок обрабатывать за один шаг (по умолчанию {LINK_REFRESH_BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=LINK_REFRESH_CONCURRENCY,
+            help=f'Сколько запросов к VK выполнять одновременно (по умолчанию {LINK_REFRESH_CONCURRENCY})',
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if options['batch_size'] < 1 or options['concurrency'] < 1:
+            raise CommandError('Размер пачки и количество одновременных запросов должны быть положительными.')
+        result = asyncio.run(refresh_link_stats(
+            batch_size=options['batch_size'],
+            concurrency=options['concurrency'],
+        ))
+        self.stdout.write(self.style.SUCCESS(
+            f"Обновлено ссылок: {result['refreshed']}, с ошибками: {result['failed']} "
+            f"за {result['duration']:.1f} с"
+        ))
@@ -0,0 +1,31 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from reservations.telegram_stub import TelegramStubServer
+
+
+class Command(BaseCommand):
+    """Запускает локальную заглушку Bot API для запуска бота без сети.
+
+    Пример:
+        python manage.py run_telegram_stub --port 8765
+        TG_API_BASE_URL=http://127.0.0.1:8765 python bot.py
+    """
+    help = 'Запускает локальную заглушку Bot API (отправка сообщений и ответы 429)'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--host', default='127.0.0.1', help='Адрес, на котором слушать запросы')
+        parser.add_argument('--port', type=int, default=8765, help='Порт, на котором слушать запросы')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        server = TelegramStubServer((options['host'], options['port']))
+        self.stdout.write(self.style.SUCCESS(
+            f"Заглушка Bot API: http://{options['host']}:{options['port']}"
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
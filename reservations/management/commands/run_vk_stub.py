@@ -0,0 +1,31 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from reservations.vk_stub import VKStubServer
+
+
+class Command(BaseCommand):
+    """Запускает локальную заглушку API VK для работы со ссылками без сети.
+
+    Пример:
+        python manage.py run_vk_stub --port 8766
+        VK_API_BASE_URL=http://127.0.0.1:8766/method/ python manage.py refresh_link_stats
+    """
+    help = 'Запускает локальную заглушку API VK (сокращение ссылок и статистика кликов)'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--host', default='127.0.0.1', help='Адрес, на котором слушать запросы')
+        parser.add_argument('--port', type=int, default=8766, help='Порт, на котором слушать запросы')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        server = VKStubServer((options['host'], options['port']))
+        self.stdout.write(self.style.SUCCESS(
+            f"Заглушка API VK: http://{options['host']}:{options['port']}/method/"
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,21 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand
+
+from reservations.sweeper import sweep_order_statuses
+
+
+class Command(BaseCommand):
+    """Переводит заказы в актуальные статусы (ожидает -> активен -> просрочен).
+
+    Пример:
+        python manage.py sweep_order_statuses
+    """
+    help = 'Обновляет статусы заказов и занятость ячеек по датам аренды'
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        result = sweep_order_statuses()
+        self.stdout.write(self.style.SUCCESS(
+            f"Активировано заказов: {result['activated']}, просрочено: {result['expired']}, "
+            f"обновлено ячеек: {result['units_updated']} за {result['duration']:.3f} с"
+        ))
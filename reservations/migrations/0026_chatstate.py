@@ -0,0 +1,26 @@
+# Generated by Django 5.1.5 on 2026-10-16 22:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0025_alter_link_short_url'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatState',
+            fields=[
+                ('chat_id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='ID чата')),
+                ('user_data', models.TextField(default='{}', verbose_name='Данные пользователя')),
+                ('conversations', models.TextField(default='{}', verbose_name='Состояния диалогов')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': 'Состояние диалога',
+                'verbose_name_plural': 'Состояния диалогов',
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.5 on 2026-10-16 22:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0026_chatstate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TelegramAsset',
+            fields=[
+                ('file_hash', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='Хэш файла')),
+                ('name', models.CharField(max_length=255, verbose_name='Имя файла')),
+                ('file_id', models.CharField(max_length=255, verbose_name='ID файла в Telegram')),
+                ('uploaded_at', models.DateTimeField(auto_now=True, verbose_name='Дата загрузки')),
+            ],
+            options={
+                'verbose_name': 'Файл в Telegram',
+                'verbose_name_plural': 'Файлы в Telegram',
+            },
+        ),
+    ]
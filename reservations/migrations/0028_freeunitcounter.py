@@ -0,0 +1,42 @@
+# Generated by Django 5.1.5 on 2026-10-16 22:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def fill_free_unit_counters(apps, schema_editor):
+    """Заполняет счетчики свободных ячеек по существующим ячейкам."""
+    StorageUnit = apps.get_model('reservations', 'StorageUnit')
+    FreeUnitCounter = apps.get_model('reservations', 'FreeUnitCounter')
+    rows = (
+        StorageUnit.objects.values('warehouse_id', 'size')
+        .annotate(free_count=Count('unit_id', filter=Q(is_occupied=False)))
+        .order_by()
+    )
+    FreeUnitCounter.objects.bulk_create(FreeUnitCounter(**row) for row in rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0027_telegramasset'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FreeUnitCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('size', models.CharField(choices=[('small', 'Маленькая (до 1 м³)'), ('medium', 'Средняя (1-5 м³)'), ('large', 'Большая (более 5 м³)')], max_length=10, verbose_name='Размер ячейки')),
+                ('free_count', models.PositiveIntegerField(default=0, verbose_name='Свободных ячеек')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='reservations.warehouse', verbose_name='Склад')),
+            ],
+            options={
+                'verbose_name': 'Счетчик свободных ячеек',
+                'verbose_name_plural': 'Счетчики свободных ячеек',
+                'constraints': [models.UniqueConstraint(fields=('warehouse', 'size'), name='unique_free_unit_counter')],
+            },
+        ),
+        migrations.RunPython(fill_free_unit_counters, migrations.RunPython.noop),
+    ]
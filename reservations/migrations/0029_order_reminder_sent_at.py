@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-16 22:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0028_freeunitcounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='reminder_sent_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Дата отправки напоминания'),
+        ),
+    ]
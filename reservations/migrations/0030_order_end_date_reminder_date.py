@@ -0,0 +1,62 @@
+from datetime import timedelta
+
+from django.db import migrations, models
+
+REMINDER_DAYS_BEFORE_END = 14
+BATCH_SIZE = 1000
+
+
+def fill_order_dates(apps, schema_editor):
+    """Заполняет даты окончания аренды и напоминания у существующих заказов."""
+    Order = apps.get_model('reservations', 'Order')
+    batch = []
+    for order in Order.objects.only('order_id', 'start_date', 'storage_duration').iterator(chunk_size=BATCH_SIZE):
+        order.end_date = order.start_date + timedelta(days=order.storage_duration)
+        order.reminder_date = max(
+            order.start_date, order.end_date - timedelta(days=REMINDER_DAYS_BEFORE_END)
+        )
+        batch.append(order)
+        if len(batch) == BATCH_SIZE:
+            Order.objects.bulk_update(batch, ['end_date', 'reminder_date'])
+            batch = []
+    if batch:
+        Order.objects.bulk_update(batch, ['end_date', 'reminder_date'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0029_order_reminder_sent_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='end_date',
+            field=models.DateTimeField(editable=False, null=True, verbose_name='Дата окончания аренды'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='reminder_date',
+            field=models.DateTimeField(editable=False, null=True, verbose_name='Дата напоминалки'),
+        ),
+        migrations.RunPython(fill_order_dates, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='order',
+            name='end_date',
+            field=models.DateTimeField(editable=False, verbose_name='Дата окончания аренды'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='reminder_date',
+            field=models.DateTimeField(editable=False, verbose_name='Дата напоминалки'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'end_date'], name='order_status_end_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['reminder_sent_at', 'reminder_date'], name='order_reminder_due_idx'),
+        ),
+    ]
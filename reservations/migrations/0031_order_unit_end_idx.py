@@ -0,0 +1,17 @@
+# Generated by Django 5.1.5 on 2026-10-16 22:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0030_order_end_date_reminder_date'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['storage_unit', 'end_date'], name='order_unit_end_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.5 on 2026-10-16 22:50
+
+import reservations.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0031_order_unit_end_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='warehouse',
+            name='layout',
+            field=models.JSONField(blank=True, default=reservations.models.default_warehouse_layout, help_text='Количество ячеек каждого размера, например {"small": 100, "medium": 50, "large": 10}', verbose_name='Раскладка ячеек'),
+        ),
+    ]
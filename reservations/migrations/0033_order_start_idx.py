@@ -0,0 +1,21 @@
+# Generated by Django 5.1.5 on 2026-10-16 23:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0032_warehouse_layout'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['start_date'], name='order_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'start_date'], name='order_status_start_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.5 on 2026-10-16 23:07
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0033_order_start_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Statistics',
+            fields=[
+            ],
+            options={
+                'verbose_name': 'Статистика',
+                'verbose_name_plural': 'Статистика',
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('reservations.order',),
+        ),
+    ]
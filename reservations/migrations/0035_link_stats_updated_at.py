@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-16 23:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0034_statistics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='link',
+            name='stats_updated_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Статистика обновлена'),
+        ),
+    ]
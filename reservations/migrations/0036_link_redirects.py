@@ -0,0 +1,65 @@
+# Generated by Django 5.1.5 on 2026-10-16 23:14
+
+import secrets
+import string
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+LINK_CODE_LENGTH = 7
+LINK_CODE_ALPHABET = string.ascii_letters + string.digits
+BATCH_SIZE = 1000
+
+
+def fill_link_codes(apps, schema_editor):
+    """Выдает короткие коды существующим ссылкам."""
+    Link = apps.get_model('reservations', 'Link')
+    used = set(Link.objects.exclude(code=None).values_list('code', flat=True))
+    batch = []
+    for link in Link.objects.filter(code=None).only('pk').iterator(chunk_size=BATCH_SIZE):
+        code = None
+        while code is None or code in used:
+            code = ''.join(secrets.choice(LINK_CODE_ALPHABET) for _ in range(LINK_CODE_LENGTH))
+        used.add(code)
+        link.code = code
+        batch.append(link)
+        if len(batch) == BATCH_SIZE:
+            Link.objects.bulk_update(batch, ['code'])
+            batch = []
+    if batch:
+        Link.objects.bulk_update(batch, ['code'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0035_link_stats_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='link',
+            name='code',
+            field=models.CharField(blank=True, editable=False, max_length=16, null=True, unique=True, verbose_name='Короткий код'),
+        ),
+        migrations.AddField(
+            model_name='link',
+            name='redirect_clicks',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Переходов'),
+        ),
+        migrations.RunPython(fill_link_codes, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='LinkClickDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('clicks', models.PositiveIntegerField(default=0, verbose_name='Переходов')),
+                ('link', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='click_days', to='reservations.link', verbose_name='Ссылка')),
+            ],
+            options={
+                'verbose_name': 'Переходы за день',
+                'verbose_name_plural': 'Переходы по дням',
+                'constraints': [models.UniqueConstraint(fields=('link', 'day'), name='link_click_day_unique')],
+            },
+        ),
+    ]
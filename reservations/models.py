@@ -1,11 +1,71 @@
-from django.db import models
+import logging
+import secrets
+import string
+
+from django.db import connection, models, transaction
+from django.db.models import Case, Count, Exists, F, IntegerField, OuterRef, Q, Subquery, Value, When
 from django.utils import timezone
 from datetime import timedelta, datetime
-from django.db.models.signals import post_delete
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
-from reservations.link_statistics import shorten_link, count_clikcs
-from typing import List, Optional, Any
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# За сколько дней до окончания срока хранения отправляется напоминание
+REMINDER_DAYS_BEFORE_END = 14
+
+# Статусы заказов, при которых ячейка занята
+BLOCKING_STATUSES = ('pending', 'active')
+
+# Сколько строк записывать в базу одним запросом при массовом создании
+BULK_BATCH_SIZE = 1000
+
+# Ключ кэша сводки по складам и заказам в админке
+DASHBOARD_CACHE_KEY = 'reservations:dashboard'
+
+# Длина и алфавит коротких кодов ссылок для собственных переходов
+LINK_CODE_LENGTH = 7
+LINK_CODE_ALPHABET = string.ascii_letters + string.digits
+
+
+def generate_link_code() -> str:
+    """Генерирует случайный короткий код ссылки, которого еще нет в базе."""
+    while True:
+        code = ''.join(secrets.choice(LINK_CODE_ALPHABET) for _ in range(LINK_CODE_LENGTH))
+        if not Link.objects.filter(code=code).exists():
+            return code
+
+
+def default_warehouse_layout() -> dict:
+    """Возвращает раскладку ячеек склада по умолчанию: по две ячейки каждого размера."""
+    return {'small': 2, 'medium': 2, 'large': 2}
+
+
+class UserQuerySet(models.QuerySet):
+    """Набор пользователей с массовым удалением вместе с заказами.
+
+    Методы:
+        delete(): Удаляет пользователей, их заказы и освобождает ячейки.
+    """
+
+    def delete(self) -> Tuple[int, Dict[str, int]]:
+        """Удаляет пользователей вместе с заказами и освобождает их ячейки.
+
+        Заказы удаляются до пользователей через OrderQuerySet.delete, поэтому
+        ячейки освобождаются несколькими запросами на всех пользователей сразу.
+
+        Returns:
+            Tuple[int, Dict[str, int]]: Количество удаленных объектов, всего и по моделям.
+        """
+        with transaction.atomic():
+            orders_deleted, orders_by_model = Order.objects.filter(user__in=self.values('pk')).delete()
+            deleted, by_model = super().delete()
+        for label, count in orders_by_model.items():
+            by_model[label] = by_model.get(label, 0) + count
+        return deleted + orders_deleted, by_model
 
 
 class User(models.Model):
@@ -20,12 +80,15 @@ class User(models.Model):
     Методы:
         __str__(): Возвращает строковое представление имени пользователя.
         get_orders(): Возвращает все заказы пользователя.
+        delete(): Удаляет пользователя, его заказы и освобождает ячейки.
     """
     user_id = models.AutoField('id пользователя', primary_key=True)
     name = models.CharField(verbose_name='Имя пользователя', max_length=200)
     phone_number = models.CharField(verbose_name='Телефон', max_length=20)
     user_address = models.CharField(verbose_name='Адрес клиента', max_length=200, null=True, blank=True)
 
+    objects = UserQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
@@ -42,6 +105,20 @@ class User(models.Model):
         """
         return Order.objects.filter(user=self)
 
+    def delete(self, using: Optional[str] = None, keep_parents: bool = False) -> Tuple[int, Dict[str, int]]:
+        """Удаляет пользователя вместе с заказами и освобождает их ячейки.
+
+        Args:
+            using (str, optional): Псевдоним базы данных.
+            keep_parents (bool): Не используется, оставлен для совместимости с Model.delete.
+
+        Returns:
+            Tuple[int, Dict[str, int]]: Количество удаленных объектов, всего и по моделям.
+        """
+        deleted = User.objects.using(using or self._state.db).filter(pk=self.pk).delete()
+        self.user_id = None
+        return deleted
+
 
 class Warehouse(models.Model):
     """Модель склада.
@@ -50,15 +127,25 @@ class Warehouse(models.Model):
         warehouse_id (int): Уникальный идентификатор склада.
         name (str): Название склада.
         warehouse_address (str, optional): Адрес склада.
+        layout (dict): Количество ячеек каждого размера, создаваемых вместе со складом.
 
     Методы:
         __str__(): Возвращает строковое представление названия склада.
+        clean(): Проверяет раскладку ячеек.
         save(): Сохраняет склад и создает ячейки хранения.
+        build_units(): Возвращает несохраненные ячейки по раскладке склада.
+        provision_many(warehouses): Создает склады с ячейками пачкой.
         get_free_storage_units_count(): Возвращает количество свободных ячеек на складе.
     """
     warehouse_id = models.AutoField(verbose_name='ID склада', primary_key=True)
     name = models.CharField(verbose_name='Название склада', max_length=255)
     warehouse_address = models.CharField(verbose_name='Адрес склада', max_length=255, null=True, blank=True)
+    layout = models.JSONField(
+        verbose_name='Раскладка ячеек',
+        default=default_warehouse_layout,
+        blank=True,
+        help_text='Количество ячеек каждого размера, например {"small": 100, "medium": 50, "large": 10}',
+    )
 
     class Meta:
         verbose_name = 'Склад'
@@ -68,17 +155,80 @@ class Warehouse(models.Model):
         """Возвращает строковое представление названия склада."""
         return self.name
 
+    def clean(self) -> None:
+        """Проверяет, что раскладка содержит известные размеры и неотрицательные количества.
+
+        Raises:
+            ValidationError: Если раскладка некорректна.
+        """
+        sizes = dict(StorageUnit.SIZE_CHOICES)
+        if not isinstance(self.layout, dict):
+            raise ValidationError({'layout': 'Раскладка должна быть словарем "размер: количество".'})
+        for size, count in self.layout.items():
+            if size not in sizes:
+                raise ValidationError({'layout': f'Неизвестный размер ячеек: {size}.'})
+            if not isinstance(count, int) or count < 0:
+                raise ValidationError({'layout': f'Количество ячеек размера {size} должно быть целым неотрицательным числом.'})
+
     def save(self, *args: Any, **kwargs: Any) -> None:
-        """Сохраняет склад и создает ячейки хранения.
+        """Сохраняет склад и создает ячейки хранения по раскладке.
 
-        Метод создает ячейки хранения только если они еще не созданы.
+        Метод создает ячейки хранения только если они еще не созданы. Ячейки
+        и счетчики свободных ячеек записываются пачками в одной транзакции.
         """
-        super().save(*args, **kwargs)
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+            if adding or not StorageUnit.objects.filter(warehouse=self).exists():
+                StorageUnit.objects.bulk_create(self.build_units(), batch_size=BULK_BATCH_SIZE)
+                FreeUnitCounter.rebuild([self.pk])
+
+    def build_units(self) -> List['StorageUnit']:
+        """Возвращает несохраненные свободные ячейки по раскладке склада.
+
+        Returns:
+            List[StorageUnit]: Ячейки хранения.
+        """
+        return [
+            StorageUnit(warehouse=self, size=size, is_occupied=False)
+            for size, _ in StorageUnit.SIZE_CHOICES
+            for _ in range(self.layout.get(size, 0))
+        ]
+
+    @classmethod
+    def provision_many(cls, warehouses: List['Warehouse']) -> List['Warehouse']:
+        """Создает склады вместе с ячейками и счетчиками свободных ячеек.
+
+        Все склады пачки, их ячейки и счетчики записываются несколькими
+        массовыми запросами в одной транзакции.
 
-        if not StorageUnit.objects.filter(warehouse=self).exists():
-            sizes = ['small', 'small', 'medium', 'medium', 'large', 'large']
-            for size in sizes:
-                StorageUnit.objects.create(warehouse=self, size=size, is_occupied=False)
+        Args:
+            warehouses (List[Warehouse]): Несохраненные склады с раскладкой.
+
+        Returns:
+            List[Warehouse]: Созданные склады.
+        """
+        with transaction.atomic():
+            if connection.features.can_return_rows_from_bulk_insert:
+                warehouses = cls.objects.bulk_create(warehouses, batch_size=BULK_BATCH_SIZE)
+            else:
+                # Без RETURNING ID складов не узнать после массовой вставки
+                for warehouse in warehouses:
+                    models.Model.save(warehouse)
+
+            units = [unit for warehouse in warehouses for unit in warehouse.build_units()]
+            StorageUnit.objects.bulk_create(units, batch_size=BULK_BATCH_SIZE)
+            FreeUnitCounter.objects.bulk_create(
+                [
+                    FreeUnitCounter(warehouse=warehouse, size=size, free_count=warehouse.layout.get(size, 0))
+                    for warehouse in warehouses
+                    for size, _ in StorageUnit.SIZE_CHOICES
+                    if warehouse.layout.get(size, 0)
+                ],
+                batch_size=BULK_BATCH_SIZE,
+            )
+        return warehouses
 
     def get_free_storage_units_count(self) -> int:
         """Возвращает количество свободных ячеек на складе.
@@ -86,7 +236,9 @@ class Warehouse(models.Model):
         Returns:
             int: Количество свободных ячеек на складе.
         """
-        return StorageUnit.objects.filter(warehouse=self, is_occupied=False).count()
+        return sum(
+            FreeUnitCounter.objects.filter(warehouse=self).values_list('free_count', flat=True)
+        )
 
 
 class StorageUnit(models.Model):
@@ -100,6 +252,10 @@ class StorageUnit(models.Model):
 
     Методы:
         __str__(): Возвращает строковое представление размера ячейки.
+        save(): Сохраняет ячейку и обновляет счетчик свободных ячеек.
+        set_occupied(unit_id, occupied): Меняет занятость ячейки без лишних записей.
+        refresh_occupancy(unit_ids): Пересчитывает занятость ячеек по их заказам.
+        daily_rate_expression(size_field): Выражение базы с дневным тарифом ячейки.
         has_active_orders(): Проверяет, есть ли активные заказы для данной ячейки.
         is_available(start_date, duration): Проверяет доступность ячейки на заданный период.
     """
@@ -108,6 +264,12 @@ class StorageUnit(models.Model):
         ('medium', 'Средняя (1-5 м³)'),
         ('large', 'Большая (более 5 м³)'),
     ]
+    # Стоимость хранения в день по размеру ячейки (руб.)
+    DAILY_RATES = {
+        'small': 100,
+        'medium': 300,
+        'large': 500,
+    }
 
     unit_id = models.AutoField(primary_key=True, verbose_name='ID ячейки')
     warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE, verbose_name='Склад')
@@ -122,6 +284,91 @@ class StorageUnit(models.Model):
         """Возвращает представление ячейки."""
         return f"{self.get_size_display()}"
 
+    def save(self, *args: Any, **kwargs: Any) -> None:
+        """Сохраняет ячейку и в той же транзакции обновляет счетчик свободных ячеек.
+
+        Прежнее состояние ячейки читается из базы, поэтому счетчик остается
+        верным, даже если объект ячейки загружен давно.
+        """
+        with transaction.atomic():
+            previous = None
+            if self.pk is not None:
+                previous = (
+                    StorageUnit.objects.select_for_update()
+                    .filter(pk=self.pk)
+                    .values_list('warehouse_id', 'size', 'is_occupied')
+                    .first()
+                )
+            super().save(*args, **kwargs)
+
+            current = (self.warehouse_id, self.size, self.is_occupied)
+            if previous == current:
+                return
+            if previous is not None and not previous[2]:
+                FreeUnitCounter.adjust(previous[0], previous[1], -1)
+            if not self.is_occupied:
+                FreeUnitCounter.adjust(self.warehouse_id, self.size, 1)
+
+    @classmethod
+    def set_occupied(cls, unit_id: int, occupied: bool) -> bool:
+        """Меняет занятость ячейки, только если она действительно меняется.
+
+        Занятость меняется одним условным UPDATE без чтения и перезаписи всей
+        строки, счетчик свободных ячеек обновляется в той же транзакции.
+
+        Args:
+            unit_id (int): ID ячейки.
+            occupied (bool): Новая занятость ячейки.
+
+        Returns:
+            bool: True, если занятость изменилась.
+        """
+        with transaction.atomic(savepoint=False):
+            changed = cls.objects.filter(pk=unit_id, is_occupied=not occupied).update(is_occupied=occupied)
+            if changed:
+                warehouse_id, size = cls.objects.filter(pk=unit_id).values_list('warehouse_id', 'size').get()
+                FreeUnitCounter.adjust(warehouse_id, size, -1 if occupied else 1)
+        return bool(changed)
+
+    @classmethod
+    def refresh_occupancy(cls, unit_ids: Iterable[int]) -> Dict[int, bool]:
+        """Пересчитывает занятость ячеек: ячейка занята, пока ее занимает хотя бы один заказ.
+
+        Занятость читается одним запросом с EXISTS по заказам, а записывается
+        только у ячеек, где она изменилась.
+
+        Args:
+            unit_ids (Iterable[int]): ID ячеек.
+
+        Returns:
+            Dict[int, bool]: Новая занятость ячеек по их ID.
+        """
+        blocked = Exists(Order.objects.blocking().filter(storage_unit=OuterRef('pk')))
+        occupancy = {}
+        with transaction.atomic(savepoint=False):
+            rows = cls.objects.filter(pk__in=unit_ids).annotate(blocked=blocked)
+            for unit_id, is_occupied, is_blocked in rows.values_list('pk', 'is_occupied', 'blocked'):
+                if is_occupied != is_blocked:
+                    cls.set_occupied(unit_id, is_blocked)
+                occupancy[unit_id] = is_blocked
+        return occupancy
+
+    @classmethod
+    def daily_rate_expression(cls, size_field: str = 'size') -> Case:
+        """Возвращает выражение базы с дневным тарифом по размеру ячейки из DAILY_RATES.
+
+        Args:
+            size_field (str): Путь к полю размера, например 'storage_unit__size' для заказов.
+
+        Returns:
+            Case: Дневной тариф (руб.).
+        """
+        return Case(
+            *(When(**{size_field: size}, then=Value(rate)) for size, rate in cls.DAILY_RATES.items()),
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+
     def has_active_orders(self) -> bool:
         """Проверяет, есть ли активные заказы для данной ячейки.
 
@@ -141,12 +388,81 @@ class StorageUnit(models.Model):
             bool: True, если ячейка доступна, иначе False.
         """
         end_date = start_date + timedelta(days=duration)
-        overlapping_orders = Order.objects.filter(
-            storage_unit=self,
-            start_date__lt=end_date,
-            created_at__gt=start_date
+        return not Order.objects.filter(storage_unit=self).overlapping(start_date, end_date).exists()
+
+
+class OrderQuerySet(models.QuerySet):
+    """Набор заказов с фильтрами занятости ячеек.
+
+    Методы:
+        blocking(): Заказы, которые занимают ячейку (ожидающие и активные).
+        overlapping(start_date, end_date): Занимающие ячейку заказы, пересекающиеся с периодом.
+        with_total_cost(): Добавляет стоимость хранения, посчитанную в базе.
+        delete(): Удаляет заказы и освобождает их ячейки несколькими запросами.
+    """
+
+    def blocking(self) -> 'OrderQuerySet':
+        """Возвращает заказы, которые занимают ячейку.
+
+        Returns:
+            OrderQuerySet: Ожидающие и активные заказы.
+        """
+        return self.filter(status__in=BLOCKING_STATUSES)
+
+    def overlapping(self, start_date: datetime, end_date: datetime) -> 'OrderQuerySet':
+        """Возвращает занимающие ячейку заказы, пересекающиеся с периодом [start_date, end_date).
+
+        Периоды полуоткрытые: заказ, который заканчивается в момент начала
+        нового, с ним не пересекается.
+
+        Args:
+            start_date (datetime): Начало периода.
+            end_date (datetime): Конец периода (не включается).
+
+        Returns:
+            OrderQuerySet: Пересекающиеся заказы.
+        """
+        return self.blocking().filter(start_date__lt=end_date, end_date__gt=start_date)
+
+    def with_total_cost(self) -> 'OrderQuerySet':
+        """Добавляет поле total_cost_value - стоимость хранения по тарифу размера ячейки.
+
+        Стоимость считается в базе, поэтому по ней можно сортировать. Тариф
+        берется подзапросом, а не соединением с ячейками, чтобы подсчет и
+        агрегаты по заказам не присоединяли таблицу ячеек.
+
+        Returns:
+            OrderQuerySet: Заказы со стоимостью хранения.
+        """
+        unit_rate = StorageUnit.objects.filter(pk=OuterRef('storage_unit_id')).values(
+            rate=StorageUnit.daily_rate_expression()
         )
-        return not overlapping_orders.exists()
+        return self.annotate(total_cost_value=F('storage_duration') * Subquery(unit_rate))
+
+    def delete(self) -> Tuple[int, Dict[str, int]]:
+        """Удаляет заказы и освобождает их ячейки несколькими запросами.
+
+        В одной транзакции занятость ячеек удаляемых заказов пересчитывается
+        одним UPDATE по оставшимся ожидающим и активным заказам, заказы
+        удаляются одним DELETE, а счетчики свободных ячеек пересобираются
+        для затронутых складов.
+
+        Returns:
+            Tuple[int, Dict[str, int]]: Количество удаленных заказов, всего и по моделям.
+        """
+        with transaction.atomic():
+            deleted_ids = self.values('pk')
+            units = StorageUnit.objects.filter(pk__in=self.values('storage_unit_id'))
+            warehouse_ids = list(units.values_list('warehouse_id', flat=True).distinct())
+            remaining = Order.objects.blocking().filter(storage_unit=OuterRef('pk')).exclude(pk__in=deleted_ids)
+            units.update(is_occupied=Exists(remaining))
+
+            deleted = super().delete()
+
+            if warehouse_ids:
+                FreeUnitCounter.rebuild(warehouse_ids)
+        cache.delete(DASHBOARD_CACHE_KEY)
+        return deleted
 
 
 class Order(models.Model):
@@ -160,14 +476,19 @@ class Order(models.Model):
         storage_duration (int): Срок хранения в днях.
         status (str): Статус заказа.
         start_date (datetime): Дата начала аренды.
+        end_date (datetime): Дата окончания аренды, пересчитывается при сохранении.
+        reminder_date (datetime): Дата напоминания об окончании срока хранения,
+            пересчитывается при сохранении.
+        reminder_sent_at (datetime, optional): Когда отправлено напоминание об окончании хранения.
 
     Методы:
         __str__(): Возвращает строковое представление заказа.
+        calculate_dates(start_date, duration): Расчитывает даты окончания аренды и напоминания.
         is_expired(): Проверяет, просрочен ли заказ.
-        save(): Сохраняет заказ и проверяет доступность ячейки.
+        save(): Сохраняет заказ, проверяет доступность ячейки и обновляет ее занятость.
+        delete(): Удаляет заказ и пересчитывает занятость его ячейки.
         release_storage_unit(): Освобождает ячейку хранения.
         calculated_total_cost: Возвращает общую стоимость хранения.
-        reminder_date(): Расчитывает дату напоминания о окончании срока хранения.
     """
     STATUS_CHOICES = [
         ('pending', 'Ожидает'),
@@ -182,58 +503,162 @@ class Order(models.Model):
     storage_duration = models.PositiveIntegerField(verbose_name='Срок хранения (дни)')
     status = models.CharField(max_length=15, choices=STATUS_CHOICES, default='active', verbose_name='Статус заказа', db_index=True)
     start_date = models.DateTimeField(verbose_name='Дата начала аренды', default=timezone.now)
+    end_date = models.DateTimeField(verbose_name='Дата окончания аренды', editable=False)
+    reminder_date = models.DateTimeField(verbose_name='Дата напоминалки', editable=False)
+    reminder_sent_at = models.DateTimeField(
+        verbose_name='Дата отправки напоминания', null=True, blank=True
+    )
+
+    objects = OrderQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Заказ'
         verbose_name_plural = 'Заказы'
+        indexes = [
+            models.Index(fields=['status', 'end_date'], name='order_status_end_idx'),
+            models.Index(fields=['reminder_sent_at', 'reminder_date'], name='order_reminder_due_idx'),
+            models.Index(fields=['storage_unit', 'end_date'], name='order_unit_end_idx'),
+            models.Index(fields=['start_date'], name='order_start_idx'),
+            models.Index(fields=['status', 'start_date'], name='order_status_start_idx'),
+        ]
 
     def __str__(self) -> str:
         """Возвращает представление заказа (ID и имя пользователя)."""
         return f"Заказ {self.order_id} от {self.user.name}"
 
+    @staticmethod
+    def calculate_dates(start_date: datetime, duration: int) -> Tuple[datetime, datetime]:
+        """Расчитывает даты окончания аренды и напоминания об окончании срока хранения.
+
+        Напоминание отправляется за REMINDER_DAYS_BEFORE_END дней до окончания
+        аренды, но не раньше ее начала.
+
+        Args:
+            start_date (datetime): Дата начала аренды.
+            duration (int): Длительность хранения в днях.
+
+        Returns:
+            Tuple[datetime, datetime]: Дата окончания аренды и дата напоминания.
+        """
+        end_date = start_date + timedelta(days=duration)
+        reminder_date = max(start_date, end_date - timedelta(days=REMINDER_DAYS_BEFORE_END))
+        return end_date, reminder_date
+
+    @classmethod
+    def from_db(cls, db: Optional[str], field_names: List[str], values: List[Any]) -> 'Order':
+        """Создает заказ из строки базы и запоминает его ячейку, период и занятость."""
+        instance = super().from_db(db, field_names, values)
+        status = instance.__dict__.get('status')
+        instance._loaded_occupancy = (
+            instance.__dict__.get('storage_unit_id'),
+            status in BLOCKING_STATUSES if status is not None else None,
+        )
+        instance._loaded_period = (instance.__dict__.get('start_date'), instance.__dict__.get('end_date'))
+        return instance
+
     def is_expired(self) -> bool:
         """Проверяет, просрочен ли заказ.
 
         Returns:
             bool: True, если заказ просрочен, иначе False.
         """
-        return timezone.now() > self.start_date + timedelta(days=self.storage_duration)
+        end_date = self.end_date
+        if end_date is None:
+            # Дата окончания вычисляется при сохранении, у нового заказа ее еще нет
+            end_date, _ = self.calculate_dates(self.start_date, self.storage_duration)
+        return timezone.now() > end_date
 
     def save(self, *args: Any, **kwargs: Any) -> None:
-        print(f"[DEBUG] Сохранение заказа {self.order_id}: статус = {self.status}")
         """Сохраняет заказ и проверяет доступность ячейки.
 
         Если ячейка уже занята на указанный период, вызывает ValidationError.
+        Пересечения проверяются для нового заказа и при смене ячейки, периода
+        или возврате заказа в занимающий статус. Занятость ячейки записывается,
+        только если она меняется. Поддерживает update_fields: пересчитанные
+        даты и статус добавляются к ним сами.
         """
+        # availability импортирует модели, поэтому импорт внутри метода
+        from reservations.availability import is_unit_available
+
+        logger.debug("Сохранение заказа %s: статус = %s", self.order_id, self.status)
         now = timezone.now()
 
-        if not self.pk:
-            overlapping_orders = Order.objects.filter(
-                storage_unit=self.storage_unit,
-                start_date__lt=self.start_date + timedelta(days=self.storage_duration),
-                status__in=['active', 'pending']
-            )
-            if overlapping_orders.exists():
-                raise ValidationError("Ячейка уже забронирована на этот период.")
+        self.end_date, self.reminder_date = self.calculate_dates(self.start_date, self.storage_duration)
+        # Если срок продлен, напоминание нужно отправить заново
+        if self.reminder_sent_at is not None and self.reminder_sent_at < self.reminder_date:
+            self.reminder_sent_at = None
 
+        previous_status = self.status
         if self.status not in ['completed', 'expired']:
             if self.start_date > now:
                 self.status = 'pending'
-            elif self.start_date <= now < self.start_date + timedelta(days=self.storage_duration):
+            elif self.start_date <= now < self.end_date:
                 self.status = 'active'
             else:
                 self.status = 'expired'
 
-        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if {'start_date', 'storage_duration'} & update_fields:
+                update_fields |= {'end_date', 'reminder_date', 'reminder_sent_at'}
+            if self.status != previous_status:
+                update_fields.add('status')
+            kwargs['update_fields'] = update_fields
+
+        adding = not self.pk
+        occupancy = (self.storage_unit_id, self.status in BLOCKING_STATUSES)
+        loaded = getattr(self, '_loaded_occupancy', None)
+        booking_changed = (
+            loaded != occupancy or getattr(self, '_loaded_period', None) != (self.start_date, self.end_date)
+        )
+
+        # Заказ, занятость ячейки и счетчик свободных ячеек сохраняются вместе
+        with transaction.atomic():
+            if adding or (occupancy[1] and booking_changed):
+                # Блокируем ячейку до конца транзакции, чтобы параллельное бронирование
+                # не прошло проверку пересечений одновременно с этим
+                list(StorageUnit.objects.select_for_update().filter(pk=self.storage_unit_id).values_list('pk'))
+                if not is_unit_available(self.storage_unit_id, self.start_date, self.end_date, exclude_order_id=self.pk):
+                    raise ValidationError("Ячейка уже забронирована на этот период.")
+
+            super().save(*args, **kwargs)
+
+            # Ячейки обновляются, только если сменилась ячейка заказа или его занятость
+            if adding or loaded != occupancy:
+                released = set()
+                if loaded is not None and loaded[0] not in (None, self.storage_unit_id):
+                    released.add(loaded[0])
+                if occupancy[1]:
+                    StorageUnit.set_occupied(self.storage_unit_id, True)
+                else:
+                    # Ячейку могут занимать и другие заказы этого периода
+                    released.add(self.storage_unit_id)
+                occupied = StorageUnit.refresh_occupancy(released) if released else {}
+                if Order.storage_unit.is_cached(self):
+                    self.storage_unit.is_occupied = occupied.get(self.storage_unit_id, occupancy[1])
+            self._loaded_occupancy = occupancy
+            self._loaded_period = (self.start_date, self.end_date)
+
+    def delete(self, using: Optional[str] = None, keep_parents: bool = False) -> Tuple[int, Dict[str, int]]:
+        """Удаляет заказ и пересчитывает занятость его ячейки.
 
-        self.storage_unit.is_occupied = self.status in ['active', 'pending']
-        self.storage_unit.save()
+        Args:
+            using (str, optional): Псевдоним базы данных.
+            keep_parents (bool): Не используется, оставлен для совместимости с Model.delete.
+
+        Returns:
+            Tuple[int, Dict[str, int]]: Количество удаленных заказов, всего и по моделям.
+        """
+        deleted = Order.objects.using(using or self._state.db).filter(pk=self.pk).delete()
+        self.order_id = None
+        return deleted
 
     def release_storage_unit(self) -> None:
-        """Освобождает ячейку хранения, устанавливая флаг is_occupied в False."""
-        if self.storage_unit.is_occupied:
-            self.storage_unit.is_occupied = False
-            self.storage_unit.save()
+        """Освобождает ячейку хранения, если ее больше не занимают заказы."""
+        occupied = StorageUnit.refresh_occupancy([self.storage_unit_id]).get(self.storage_unit_id, False)
+        if Order.storage_unit.is_cached(self):
+            self.storage_unit.is_occupied = occupied
 
     @property
     def calculated_total_cost(self) -> float:
@@ -242,78 +667,272 @@ class Order(models.Model):
         Returns:
             float: Общая стоимость хранения.
         """
-        costs = {'small': 100, 'medium': 300, 'large': 500}
-        return self.storage_duration * costs.get(self.storage_unit.size, 0)
+        return self.storage_duration * StorageUnit.DAILY_RATES.get(self.storage_unit.size, 0)
 
-    def reminder_date(self) -> Optional[timezone.datetime]:
-        """Расчет даты напоминания о окончания срока хранения.
 
-        Returns:
-            Optional[timezone.datetime]: Дата напоминания или None.
-        """
-        if self.storage_duration <= 14:
-            return self.start_date
-        return self.start_date + timedelta(days=self.storage_duration-14) if self.start_date else None
+@receiver(post_delete, sender=StorageUnit)
+def storage_unit_post_delete_handler(sender: type, instance: StorageUnit, **kwargs: Any) -> None:
+    """Обработчик сигнала, который уменьшает счетчик свободных ячеек при удалении ячейки.
 
+    Срабатывает в транзакции удаления, в том числе при каскадном удалении
+    ячеек вместе со складом.
 
-@receiver(post_delete, sender=User)
-def user_post_delete_handler(sender: type, instance: User, **kwargs: Any) -> None:
-    """Обработчик сигнала, который освобождает ячейки и удаляет заказы при удалении пользователя.
-    Отображение происходит в админ панели.
+    Args:
+        sender (type): Тип сигнала.
+        instance (StorageUnit): Удаляемая ячейка.
+    """
+    if not instance.is_occupied:
+        FreeUnitCounter.objects.filter(
+            warehouse_id=instance.warehouse_id, size=instance.size
+        ).update(free_count=F('free_count') - 1)
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_save, sender=StorageUnit)
+@receiver(post_delete, sender=StorageUnit)
+@receiver(post_save, sender=Warehouse)
+@receiver(post_delete, sender=Warehouse)
+def dashboard_cache_handler(sender: type, **kwargs: Any) -> None:
+    """Обработчик сигналов, который сбрасывает кэш сводки в админке при изменении данных.
+
+    Удаление заказов не отслеживается, чтобы не отключать быстрое массовое
+    удаление: кэш сбрасывает OrderQuerySet.delete.
 
     Args:
         sender (type): Тип сигнала.
-        instance (User): Удаляемый пользователь.
     """
-    orders = Order.objects.filter(user=instance)
-    for order in orders:
-        order.release_storage_unit()
-        order.delete()  # Удаляем заказ
+    cache.delete(DASHBOARD_CACHE_KEY)
 
 
 class Link(models.Model):
     """Модель сокращенной ссылки.
 
+    Сохранение ссылки не обращается к API VK: сокращенную ссылку и количество
+    кликов заполняет фоновое обновление (см. reservations.link_refresher).
+    Кроме того, у каждой ссылки есть собственный короткий код: переход по
+    /l/<код>/ перенаправляет на оригинальную ссылку и учитывается в
+    redirect_clicks (см. reservations.redirects).
+
     Атрибуты:
         original_url (str): Оригинальная ссылка.
         short_url (str): Сокращенная ссылка.
         click_count (int): Количество кликов по сокращенной ссылке.
+        stats_updated_at (datetime, optional): Когда последний раз обновлено количество кликов.
+        code (str): Короткий код для собственных переходов.
+        redirect_clicks (int): Количество переходов по собственной короткой ссылке.
 
     Методы:
-        save(): Сохраняет ссылку и обновляет количество кликов.
-        update_click_count(): Обновляет количество кликов по ссылке.
+        save(*args, **kwargs): Выдает короткий код новой ссылке и сохраняет ее.
         __str__(): Возвращает строковое представление ссылки.
     """
     original_url = models.URLField(verbose_name='Оригинальная ссылка')
     short_url = models.CharField(verbose_name='Сокращенная ссылка', max_length=100, blank=True)
     click_count = models.IntegerField(verbose_name='Кол-во кликов', default=0, null=True, blank=True)
+    stats_updated_at = models.DateTimeField(
+        verbose_name='Статистика обновлена', null=True, blank=True, editable=False
+    )
+    code = models.CharField(
+        verbose_name='Короткий код', max_length=16, unique=True, null=True, blank=True, editable=False
+    )
+    redirect_clicks = models.PositiveIntegerField(verbose_name='Переходов', default=0, editable=False)
 
     class Meta:
         verbose_name = 'Ссылка'
         verbose_name_plural = 'Ссылки'
 
     def save(self, *args: Any, **kwargs: Any) -> None:
-        """Сохраняет ссылку и генерирует ее сокращенную версию.
+        """Выдает ссылке короткий код, если его еще нет, и сохраняет ее.
 
-        Также обновляет количество кликов по ссылке.
+        Счетчик переходов увеличивает только буфер кликов через F(), поэтому
+        при изменении существующей ссылки он не перезаписывается.
         """
-        if not self.short_url:
-            self.short_url = shorten_link(self.original_url)
+        update_fields = kwargs.get('update_fields')
+        if not self.code:
+            self.code = generate_link_code()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'code'}
+        elif not self._state.adding and update_fields is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'redirect_clicks'
+            ]
         super().save(*args, **kwargs)
-        self.update_click_count()
-
-    def update_click_count(self) -> None:
-        """Обновляет количество кликов по сокращенной ссылке."""
-        if self.short_url:
-            try:
-                new_click_count = count_clikcs(self.short_url)
-                self.click_count = new_click_count
-                self.save()
-            except Exception as e:
-                print(f"Ошибка при обновлении количества кликов: {e}")
 
     def __str__(self) -> str:
         """Возвращает представление сокращенной и оригинальной ссылок
         с количеством кликов.
         """
         return f'{self.short_url} -> {self.original_url}, кол-во кликов {self.click_count}'
+
+
+class LinkClickDay(models.Model):
+    """Количество переходов по собственной короткой ссылке за день.
+
+    Записи ведутся, только если включен учет по дням (LINK_DAILY_CLICKS).
+
+    Атрибуты:
+        link (Link): Ссылка.
+        day (date): День (по местному времени).
+        clicks (int): Количество переходов за день.
+    """
+    link = models.ForeignKey(Link, on_delete=models.CASCADE, related_name='click_days', verbose_name='Ссылка')
+    day = models.DateField(verbose_name='День')
+    clicks = models.PositiveIntegerField(verbose_name='Переходов', default=0)
+
+    class Meta:
+        verbose_name = 'Переходы за день'
+        verbose_name_plural = 'Переходы по дням'
+        constraints = [
+            models.UniqueConstraint(fields=['link', 'day'], name='link_click_day_unique'),
+        ]
+
+    def __str__(self) -> str:
+        """Возвращает день и количество переходов."""
+        return f'{self.day}: {self.clicks}'
+
+
+class ChatState(models.Model):
+    """Модель сохраненного состояния диалога с ботом.
+
+    Компактная запись на каждый чат: данные пользователя (`context.user_data`)
+    и состояния диалогов ConversationHandler в виде JSON.
+
+    Атрибуты:
+        chat_id (int): ID чата (совпадает с ID пользователя в личных чатах).
+        user_data (str): Данные пользователя в формате JSON.
+        conversations (str): Состояния диалогов в формате JSON.
+        updated_at (datetime): Дата последнего обновления.
+    """
+    chat_id = models.BigIntegerField(verbose_name='ID чата', primary_key=True)
+    user_data = models.TextField(verbose_name='Данные пользователя', default='{}')
+    conversations = models.TextField(verbose_name='Состояния диалогов', default='{}')
+    updated_at = models.DateTimeField(verbose_name='Дата обновления', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Состояние диалога'
+        verbose_name_plural = 'Состояния диалогов'
+
+    def __str__(self) -> str:
+        """Возвращает представление состояния диалога (ID чата)."""
+        return f"Чат {self.chat_id}"
+
+
+class TelegramAsset(models.Model):
+    """Модель загруженного в Telegram статического файла.
+
+    Хранит file_id, выданный Telegram при первой загрузке файла, чтобы не
+    загружать файл повторно. Ключ - хэш содержимого, поэтому измененный файл
+    загружается заново.
+
+    Атрибуты:
+        file_hash (str): SHA-256 содержимого файла.
+        name (str): Имя файла.
+        file_id (str): Идентификатор файла в Telegram.
+        uploaded_at (datetime): Дата загрузки файла.
+    """
+    file_hash = models.CharField(verbose_name='Хэш файла', max_length=64, primary_key=True)
+    name = models.CharField(verbose_name='Имя файла', max_length=255)
+    file_id = models.CharField(verbose_name='ID файла в Telegram', max_length=255)
+    uploaded_at = models.DateTimeField(verbose_name='Дата загрузки', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Файл в Telegram'
+        verbose_name_plural = 'Файлы в Telegram'
+
+    def __str__(self) -> str:
+        """Возвращает представление файла (имя и file_id)."""
+        return f'{self.name} -> {self.file_id}'
+
+
+class FreeUnitCounter(models.Model):
+    """Модель счетчика свободных ячеек склада по размеру.
+
+    Счетчики обновляются при сохранении и удалении ячеек в той же транзакции,
+    поэтому экрану тарифов не нужно пересчитывать ячейки. Команда
+    `reconcile_free_units` пересобирает счетчики по таблице ячеек.
+
+    Атрибуты:
+        warehouse (Warehouse): Склад.
+        size (str): Размер ячеек.
+        free_count (int): Количество свободных ячеек.
+
+    Методы:
+        adjust(warehouse_id, size, delta): Изменяет счетчик на delta.
+        rebuild(warehouse_ids): Пересчитывает счетчики по таблице ячеек.
+    """
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE, verbose_name='Склад')
+    size = models.CharField(max_length=10, choices=StorageUnit.SIZE_CHOICES, verbose_name='Размер ячейки')
+    free_count = models.PositiveIntegerField(verbose_name='Свободных ячеек', default=0)
+
+    class Meta:
+        verbose_name = 'Счетчик свободных ячеек'
+        verbose_name_plural = 'Счетчики свободных ячеек'
+        constraints = [
+            models.UniqueConstraint(fields=['warehouse', 'size'], name='unique_free_unit_counter'),
+        ]
+
+    def __str__(self) -> str:
+        """Возвращает представление счетчика (склад, размер и количество)."""
+        return f'{self.warehouse_id}: {self.size} - {self.free_count}'
+
+    @classmethod
+    def adjust(cls, warehouse_id: int, size: str, delta: int) -> None:
+        """Изменяет счетчик свободных ячеек склада на delta.
+
+        Если счетчика еще нет, он пересчитывается по таблице ячеек.
+
+        Args:
+            warehouse_id (int): ID склада.
+            size (str): Размер ячеек.
+            delta (int): На сколько изменить количество свободных ячеек.
+        """
+        updated = cls.objects.filter(warehouse_id=warehouse_id, size=size).update(
+            free_count=F('free_count') + delta
+        )
+        if not updated:
+            free_count = StorageUnit.objects.filter(
+                warehouse_id=warehouse_id, size=size, is_occupied=False
+            ).count()
+            cls.objects.update_or_create(
+                warehouse_id=warehouse_id, size=size, defaults={'free_count': free_count}
+            )
+
+    @classmethod
+    def rebuild(cls, warehouse_ids: Optional[Iterable[int]] = None) -> int:
+        """Пересчитывает счетчики свободных ячеек по таблице ячеек.
+
+        Args:
+            warehouse_ids (Iterable[int], optional): ID складов. По умолчанию - все склады.
+
+        Returns:
+            int: Количество записанных счетчиков.
+        """
+        units = StorageUnit.objects.all()
+        counters = cls.objects.all()
+        if warehouse_ids is not None:
+            warehouse_ids = list(warehouse_ids)
+            units = units.filter(warehouse_id__in=warehouse_ids)
+            counters = counters.filter(warehouse_id__in=warehouse_ids)
+
+        rows = (
+            units.values('warehouse_id', 'size')
+            .annotate(free_count=Count('unit_id', filter=Q(is_occupied=False)))
+            .order_by()
+        )
+        with transaction.atomic():
+            counters.delete()
+            created = cls.objects.bulk_create(cls(**row) for row in rows)
+        return len(created)
+
+
+class Statistics(Order):
+    """Прокси-модель заказов для страницы сводки в админке.
+
+    Отдельной таблицы нет: страница показывает занятость складов, заказы по
+    статусам, ожидаемую выручку и ближайшие окончания аренды.
+    """
+
+    class Meta:
+        proxy = True
+        verbose_name = 'Статистика'
+        verbose_name_plural = 'Статистика'
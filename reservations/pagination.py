@@ -0,0 +1,163 @@
+import hashlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from django.contrib.admin.views.main import ChangeList
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import Min, Model, QuerySet
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+# Сколько секунд хранить посчитанное количество строк списка в админке
+COUNT_CACHE_TIMEOUT = 60
+
+# С какого размера таблицы без фильтров использовать оценку вместо COUNT(*)
+ESTIMATE_THRESHOLD = 100_000
+
+
+def estimate_table_rows(model: type[Model]) -> Optional[int]:
+    """Возвращает оценку количества строк таблицы из статистики базы.
+
+    Оценка есть только в PostgreSQL (pg_class.reltuples), для остальных баз
+    возвращается None.
+
+    Args:
+        model (type[Model]): Модель таблицы.
+
+    Returns:
+        Optional[int]: Оценка количества строк или None, если ее нет.
+    """
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    return row[0] if row and row[0] > 0 else None
+
+
+class LargeTablePaginator(Paginator):
+    """Пагинатор списков админки для больших таблиц.
+
+    Для списка без фильтров в большой таблице берет оценку количества строк
+    из статистики базы, иначе считает COUNT(*) один раз и кэширует его на
+    COUNT_CACHE_TIMEOUT секунд по тексту запроса. Поэтому переход между
+    страницами и сортировка не пересчитывают всю таблицу.
+    """
+
+    @cached_property
+    def count(self) -> int:
+        """Возвращает количество строк списка, по возможности без COUNT(*)."""
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return super().count
+
+        if not queryset.query.where:
+            estimate = estimate_table_rows(queryset.model)
+            if estimate is not None and estimate >= ESTIMATE_THRESHOLD:
+                return estimate
+
+        # Сортировка не влияет на количество, поэтому в ключ не входит
+        try:
+            query = str(queryset.order_by().query)
+        except EmptyResultSet:
+            return 0
+        key = 'admin-count:' + hashlib.md5(query.encode()).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = super().count
+            cache.set(key, count, COUNT_CACHE_TIMEOUT)
+        return count
+
+
+class IndexedDateQueries:
+    """Запросы навигации по датам в админке через индекс поля даты.
+
+    Навигация по датам запрашивает у списка MIN и MAX даты одним запросом,
+    а затем годы, месяцы или дни через datetimes(), и Django для этого
+    обходит все строки списка. Здесь границы и периоды ищутся сортировкой
+    по индексу с LIMIT 1. Используется только тегом навигации списка заказов, сам
+    QuerySet остается обычным.
+
+    Атрибуты:
+        queryset (QuerySet): Список админки с примененными фильтрами.
+    """
+
+    def __init__(self, queryset: QuerySet) -> None:
+        self.queryset = queryset
+
+    def aggregate(self, **aggregates: Any) -> Dict[str, Optional[datetime]]:
+        """Возвращает границы дат для агрегатов Min и Max по одному полю.
+
+        Returns:
+            Dict[str, Optional[datetime]]: Значения агрегатов по их именам.
+        """
+        result = {}
+        for alias, aggregate in aggregates.items():
+            field_name = aggregate.source_expressions[0].name
+            ordering = field_name if isinstance(aggregate, Min) else f'-{field_name}'
+            result[alias] = (
+                self.queryset.filter(**{f'{field_name}__isnull': False})
+                .order_by(ordering)
+                .values_list(field_name, flat=True)
+                .first()
+            )
+        return result
+
+    def datetimes(self, field_name: str, kind: str) -> List[datetime]:
+        """Возвращает начала периодов, в которых есть строки списка.
+
+        Первая дата каждого следующего периода ищется по индексу с LIMIT 1
+        начиная с конца предыдущего, поэтому запросов столько, сколько
+        периодов со строками, и еще один.
+
+        Args:
+            field_name (str): Поле даты.
+            kind (str): 'year', 'month' или 'day'.
+
+        Returns:
+            List[datetime]: Начала периодов по возрастанию в текущем часовом поясе.
+        """
+        tzinfo = timezone.get_current_timezone()
+        periods = []
+        value = self.aggregate(first=Min(field_name))['first']
+        while value is not None:
+            value = value.astimezone(tzinfo)
+            if kind == 'year':
+                period_start = datetime(value.year, 1, 1, tzinfo=tzinfo)
+                period_end = datetime(value.year + 1, 1, 1, tzinfo=tzinfo)
+            elif kind == 'month':
+                period_start = datetime(value.year, value.month, 1, tzinfo=tzinfo)
+                period_end = datetime(value.year + value.month // 12, value.month % 12 + 1, 1, tzinfo=tzinfo)
+            else:
+                period_start = datetime(value.year, value.month, value.day, tzinfo=tzinfo)
+                period_end = datetime.combine(value.date() + timedelta(days=1), datetime.min.time(), tzinfo)
+            periods.append(period_start)
+            # SQLite ищет по индексу от первого условия на поле, поэтому
+            # граница следующего периода должна стоять раньше фильтров списка
+            seek = self.queryset.model._default_manager.filter(**{f'{field_name}__gte': period_end})
+            value = (seek & self.queryset).order_by(field_name).values_list(field_name, flat=True).first()
+        return periods
+
+
+class IndexedDateHierarchy:
+    """Список админки, который отдает навигации по датам IndexedDateQueries.
+
+    Остальные атрибуты берутся у исходного ChangeList без изменений.
+
+    Атрибуты:
+        changelist (ChangeList): Список админки.
+        queryset (IndexedDateQueries): Запросы навигации по датам списка.
+    """
+
+    def __init__(self, changelist: ChangeList) -> None:
+        self.changelist = changelist
+        self.queryset = IndexedDateQueries(changelist.queryset)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.changelist, name)
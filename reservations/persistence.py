@@ -0,0 +1,306 @@
+import asyncio
+import json
+import logging
+from datetime import date, datetime
+from typing import Any, Dict, Optional, Set, Tuple
+
+from django.db import transaction
+from telegram.ext import BasePersistence, PersistenceInput, PicklePersistence
+
+from reservations.models import ChatState
+from reservations.runtime import run_orm
+
+logger = logging.getLogger(__name__)
+
+# Как часто изменения состояний диалогов записываются в базу (секунды)
+DEFAULT_FLUSH_INTERVAL = 2.0
+
+
+def _encode_value(value: Any) -> Any:
+    """Сериализует даты, которые не поддерживает JSON."""
+    if isinstance(value, datetime):
+        return {'$dt': value.isoformat()}
+    if isinstance(value, date):
+        return {'$d': value.isoformat()}
+    raise TypeError(f"Тип {type(value).__name__} не сериализуется в JSON")
+
+
+def _decode_value(value: Dict[str, Any]) -> Any:
+    """Восстанавливает даты, сохраненные функцией `_encode_value`."""
+    if '$dt' in value:
+        return datetime.fromisoformat(value['$dt'])
+    if '$d' in value:
+        return date.fromisoformat(value['$d'])
+    return value
+
+
+def dumps(data: Any) -> str:
+    """Сериализует данные в компактный JSON."""
+    return json.dumps(data, default=_encode_value, ensure_ascii=False, separators=(',', ':'))
+
+
+def loads(data: str) -> Any:
+    """Десериализует данные из JSON, сохраненного функцией `dumps`."""
+    return json.loads(data, object_hook=_decode_value)
+
+
+class DatabasePersistence(BasePersistence):
+    """Хранение состояний диалогов и `context.user_data` в таблице ChatState.
+
+    Данные пользователя загружаются лениво - при первом обращении к чату,
+    состояния диалогов - при запуске бота. Изменения копятся в памяти и
+    записываются в базу пачкой, одной транзакцией, раз в `flush_interval` секунд.
+
+    Хранилище рассчитано на один процесс бота: после загрузки процесс работает
+    со своей копией состояний и записывает чаты целиком, поэтому несколько
+    одновременно запущенных процессов с одной таблицей перезаписывали бы
+    изменения друг друга. Следующий процесс (например, после перезапуска)
+    продолжает диалоги с места, записанного предыдущим.
+
+    Методы:
+        get_user_data(): Возвращает пустой словарь - данные загружаются лениво.
+        refresh_user_data(): Загружает данные пользователя при первом обращении.
+        get_conversations(): Загружает состояния диалога при запуске бота.
+        update_user_data(), update_conversation(), drop_user_data(): Накапливают изменения.
+        flush(): Записывает накопленные изменения в базу.
+    """
+
+    def __init__(self, flush_interval: float = DEFAULT_FLUSH_INTERVAL) -> None:
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=flush_interval,
+        )
+        self._user_data: Dict[int, Dict[str, Any]] = {}
+        self._conversations: Dict[int, Dict[str, Dict[Tuple, Any]]] = {}
+        self._dirty: Set[int] = set()
+        self._flush_task: Optional[asyncio.Task] = None
+
+    # Загрузка
+
+    async def get_user_data(self) -> Dict[int, Dict[str, Any]]:
+        """Данные пользователей загружаются лениво в `refresh_user_data`."""
+        return {}
+
+    async def refresh_user_data(self, user_id: int, user_data: Dict[str, Any]) -> None:
+        """Загружает данные пользователя из базы при первом обращении к чату.
+
+        Args:
+            user_id (int): ID пользователя.
+            user_data (dict): Данные пользователя в приложении, дополняются сохраненными.
+        """
+        if user_id in self._user_data:
+            return
+        record = await run_orm(
+            ChatState.objects.filter(chat_id=user_id).values_list('user_data', flat=True).first
+        )
+        if user_id in self._user_data:
+            return
+        stored = loads(record) if record else {}
+        for key, value in stored.items():
+            user_data.setdefault(key, value)
+        self._user_data[user_id] = user_data
+
+    async def get_conversations(self, name: str) -> Dict[Tuple, Any]:
+        """Загружает незавершенные состояния диалога `name` из базы.
+
+        Args:
+            name (str): Имя ConversationHandler.
+
+        Returns:
+            dict: Состояния диалога по ключам (ID чата, ID пользователя).
+        """
+        records = await run_orm(
+            list,
+            ChatState.objects.exclude(conversations='{}').values_list('chat_id', 'conversations')
+        )
+        states = {}
+        for chat_id, conversations in records:
+            handler_states = loads(conversations).get(name, [])
+            chat_states = self._conversations.setdefault(chat_id, {}).setdefault(name, {})
+            for key, state in handler_states:
+                chat_states[tuple(key)] = state
+                states[tuple(key)] = state
+        return states
+
+    async def get_chat_data(self) -> Dict[int, Any]:
+        """Данные чатов не сохраняются."""
+        return {}
+
+    async def get_bot_data(self) -> Dict[Any, Any]:
+        """Данные бота не сохраняются."""
+        return {}
+
+    async def get_callback_data(self) -> None:
+        """Данные callback-кнопок не сохраняются."""
+        return None
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: Any) -> None:
+        """Данные чатов не сохраняются."""
+
+    async def refresh_bot_data(self, bot_data: Any) -> None:
+        """Данные бота не сохраняются."""
+
+    # Накопление изменений
+
+    async def update_user_data(self, user_id: int, data: Dict[str, Any]) -> None:
+        """Запоминает новые данные пользователя для записи в базу.
+
+        Args:
+            user_id (int): ID пользователя.
+            data (dict): Данные пользователя.
+        """
+        self._user_data[user_id] = data
+        self._mark_dirty(user_id)
+
+    async def drop_user_data(self, user_id: int) -> None:
+        """Помечает данные пользователя для удаления.
+
+        Args:
+            user_id (int): ID пользователя.
+        """
+        self._user_data[user_id] = {}
+        self._mark_dirty(user_id)
+
+    async def update_conversation(self, name: str, key: Tuple, new_state: Optional[object]) -> None:
+        """Запоминает новое состояние диалога для записи в базу.
+
+        Args:
+            name (str): Имя ConversationHandler.
+            key (tuple): Ключ диалога (ID чата, ID пользователя).
+            new_state (object, optional): Новое состояние или None, если диалог завершен.
+        """
+        chat_id = key[0]
+        chat_states = self._conversations.setdefault(chat_id, {}).setdefault(name, {})
+        if new_state is None:
+            chat_states.pop(key, None)
+        else:
+            chat_states[key] = new_state
+        self._mark_dirty(chat_id)
+
+    async def update_chat_data(self, chat_id: int, data: Any) -> None:
+        """Данные чатов не сохраняются."""
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        """Данные чатов не сохраняются."""
+
+    async def update_bot_data(self, data: Any) -> None:
+        """Данные бота не сохраняются."""
+
+    async def update_callback_data(self, data: Any) -> None:
+        """Данные callback-кнопок не сохраняются."""
+
+    # Запись в базу
+
+    def _mark_dirty(self, chat_id: int) -> None:
+        """Помечает чат для записи и планирует запись накопленных изменений.
+
+        Все изменения одного цикла обновления сохраняются одной транзакцией.
+        """
+        self._dirty.add(chat_id)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._write_dirty())
+
+    async def _write_dirty(self) -> None:
+        """Записывает в базу все накопленные изменения."""
+        await asyncio.sleep(0)
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, set()
+        records = {}
+        for chat_id in dirty:
+            # Состояние одного чата, которое не сериализуется, не должно мешать записи остальных
+            try:
+                records[chat_id] = self._serialize(chat_id)
+            except Exception:
+                logger.exception("Не удалось сериализовать состояние чата %s", chat_id)
+                self._dirty.add(chat_id)
+        if not records:
+            return
+        try:
+            await run_orm(self._save_records, records)
+        except Exception:
+            logger.exception("Не удалось сохранить состояния диалогов")
+            self._dirty |= records.keys()
+
+    def _serialize(self, chat_id: int) -> Tuple[Optional[str], str]:
+        """Сериализует данные пользователя и состояния диалогов чата.
+
+        Args:
+            chat_id (int): ID чата.
+
+        Returns:
+            tuple: Данные пользователя (None, если не загружались) и состояния диалогов в JSON.
+        """
+        conversations = {
+            name: [[list(key), state] for key, state in states.items()]
+            for name, states in self._conversations.get(chat_id, {}).items()
+            if states
+        }
+        user_data = self._user_data.get(chat_id)
+        return (
+            dumps(user_data) if user_data is not None else None,
+            dumps(conversations),
+        )
+
+    @staticmethod
+    def _save_records(records: Dict[int, Tuple[Optional[str], str]]) -> None:
+        """Сохраняет записи чатов одной транзакцией.
+
+        Пустые записи удаляются, остальные создаются или обновляются одним запросом.
+
+        Args:
+            records (dict): Данные пользователя (None, если не загружались)
+                и состояния диалогов по ID чата.
+        """
+        with transaction.atomic():
+            missing = [chat_id for chat_id, (user_data, _) in records.items() if user_data is None]
+            stored = dict(
+                ChatState.objects.filter(chat_id__in=missing).values_list('chat_id', 'user_data')
+            )
+            to_save, to_delete = [], []
+            for chat_id, (user_data, conversations) in records.items():
+                user_data = user_data if user_data is not None else stored.get(chat_id, '{}')
+                if user_data == '{}' and conversations == '{}':
+                    to_delete.append(chat_id)
+                else:
+                    to_save.append(ChatState(
+                        chat_id=chat_id, user_data=user_data, conversations=conversations
+                    ))
+            if to_delete:
+                ChatState.objects.filter(chat_id__in=to_delete).delete()
+            if to_save:
+                ChatState.objects.bulk_create(
+                    to_save,
+                    update_conflicts=True,
+                    unique_fields=['chat_id'],
+                    update_fields=['user_data', 'conversations', 'updated_at'],
+                )
+
+    async def flush(self) -> None:
+        """Записывает в базу все накопленные изменения перед остановкой бота."""
+        if self._flush_task is not None:
+            await self._flush_task
+        await self._write_dirty()
+
+
+def make_persistence(backend: str, flush_interval: float = DEFAULT_FLUSH_INTERVAL) -> Optional[BasePersistence]:
+    """Создает хранилище состояний диалогов по названию.
+
+    Args:
+        backend (str): 'database' - таблица в базе данных Django,
+            'file:<путь>' - файл pickle, 'memory' - без сохранения.
+        flush_interval (float): Интервал записи изменений в секундах.
+
+    Returns:
+        Optional[BasePersistence]: Хранилище или None, если состояния не сохраняются.
+
+    Raises:
+        ValueError: Если хранилище с таким названием не поддерживается.
+    """
+    if backend == 'database':
+        return DatabasePersistence(flush_interval=flush_interval)
+    if backend.startswith('file:'):
+        return PicklePersistence(filepath=backend[len('file:'):], update_interval=flush_interval)
+    if backend == 'memory':
+        return None
+    raise ValueError(f"Неизвестное хранилище состояний: {backend}")
@@ -0,0 +1,149 @@
+import asyncio
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from typing import Dict, Optional, Tuple, Union
+
+import qrcode
+
+# Размер модуля QR-кода в пикселях. Отступ оставлен стандартным (4 модуля),
+# чтобы код уверенно считывался сканерами
+QR_BOX_SIZE = 6
+QR_BORDER = 4
+
+QR_CACHE_SIZE = 1024
+DEFAULT_QR_POOL_SIZE = 2
+
+_qr_executor: Optional[ProcessPoolExecutor] = None
+
+
+def render_qr_png(data: str) -> bytes:
+    """Генерирует QR-код и кодирует его в PNG.
+
+    Args:
+        data (str): Данные для QR-кода.
+
+    Returns:
+        bytes: Изображение QR-кода в формате PNG.
+    """
+    qr = qrcode.QRCode(
+        version=None,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=QR_BOX_SIZE,
+        border=QR_BORDER,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+
+    qr_image = qr.make_image(fill_color="black", back_color="white")
+    buffer = BytesIO()
+    qr_image.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def configure_qr_pool(max_workers: int = DEFAULT_QR_POOL_SIZE) -> ProcessPoolExecutor:
+    """Создает пул процессов для генерации QR-кодов.
+
+    Args:
+        max_workers (int): Максимальное количество процессов в пуле.
+
+    Returns:
+        ProcessPoolExecutor: Созданный пул процессов.
+    """
+    global _qr_executor
+    if _qr_executor is not None:
+        _qr_executor.shutdown(wait=False)
+    _qr_executor = ProcessPoolExecutor(
+        max_workers=max_workers, mp_context=multiprocessing.get_context('spawn')
+    )
+    return _qr_executor
+
+
+def get_qr_executor() -> ProcessPoolExecutor:
+    """Возвращает пул процессов для QR-кодов, создавая его при первом обращении.
+
+    Returns:
+        ProcessPoolExecutor: Пул процессов для генерации QR-кодов.
+    """
+    if _qr_executor is None:
+        return configure_qr_pool()
+    return _qr_executor
+
+
+def shutdown_qr_pool() -> None:
+    """Останавливает пул процессов для генерации QR-кодов."""
+    global _qr_executor
+    if _qr_executor is not None:
+        _qr_executor.shutdown(wait=True)
+        _qr_executor = None
+
+
+class QRCodeCache:
+    """LRU-кэш QR-кодов заказов.
+
+    Хранит PNG-изображение QR-кода, а после успешной отправки - file_id
+    фотографии в Telegram, чтобы повторная выдача QR-кода не требовала
+    ни генерации, ни загрузки.
+
+    Атрибуты:
+        max_size (int): Максимальное количество заказов в кэше.
+    """
+
+    def __init__(self, max_size: int = QR_CACHE_SIZE) -> None:
+        self.max_size = max_size
+        self._items: 'OrderedDict[int, Tuple[str, Union[bytes, str]]]' = OrderedDict()
+
+    def get(self, order_id: int, data: str) -> Optional[Union[bytes, str]]:
+        """Возвращает PNG или file_id QR-кода заказа, если данные не изменились.
+
+        Args:
+            order_id (int): ID заказа.
+            data (str): Данные QR-кода.
+
+        Returns:
+            Optional[Union[bytes, str]]: PNG-изображение, file_id или None.
+        """
+        item = self._items.get(order_id)
+        if item is None or item[0] != data:
+            return None
+        self._items.move_to_end(order_id)
+        return item[1]
+
+    def put(self, order_id: int, data: str, qr_code: Union[bytes, str]) -> None:
+        """Сохраняет PNG или file_id QR-кода заказа, вытесняя давно не использованные.
+
+        Args:
+            order_id (int): ID заказа.
+            data (str): Данные QR-кода.
+            qr_code (Union[bytes, str]): PNG-изображение или file_id.
+        """
+        self._items[order_id] = (data, qr_code)
+        self._items.move_to_end(order_id)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        """Возвращает количество закэшированных QR-кодов."""
+        return {'size': len(self._items), 'max_size': self.max_size}
+
+
+qr_cache = QRCodeCache()
+
+
+async def get_order_qr_code(order_id: int, data: str) -> Union[bytes, str]:
+    """Возвращает QR-код заказа из кэша или генерирует его в пуле процессов.
+
+    Args:
+        order_id (int): ID заказа.
+        data (str): Данные QR-кода.
+
+    Returns:
+        Union[bytes, str]: PNG-изображение или file_id ранее отправленного QR-кода.
+    """
+    qr_code = qr_cache.get(order_id, data)
+    if qr_code is None:
+        loop = asyncio.get_running_loop()
+        qr_code = await loop.run_in_executor(get_qr_executor(), render_qr_png, data)
+        qr_cache.put(order_id, data, qr_code)
+    return qr_code
@@ -0,0 +1,255 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Tuple, Union
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Приоритеты отправки: меньше - важнее
+INTERACTIVE = 0
+BULK = 10
+
+# Ограничения Telegram: около 30 сообщений в секунду на бота
+# и около 1 сообщения в секунду в один чат (20 в минуту для групп)
+GLOBAL_RATE = 30
+CHAT_RATE = 1
+GROUP_RATE = 20 / 60
+CHAT_BURST = 3
+
+MAX_CHAT_BUCKETS = 1024
+
+
+class TokenBucket:
+    """Ограничитель частоты запросов по алгоритму token bucket.
+
+    В asyncio-коде токены берутся через delay() и consume(), а потоки,
+    выполняющие синхронные запросы, ждут токен через acquire().
+
+    Атрибуты:
+        rate (float): Скорость пополнения, токенов в секунду.
+        capacity (float): Максимальное количество накопленных токенов.
+    """
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def delay(self) -> float:
+        """Возвращает, сколько секунд ждать до появления токена (0, если токен есть)."""
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def consume(self) -> None:
+        """Забирает один токен."""
+        self._refill()
+        self.tokens -= 1
+
+    def acquire(self) -> None:
+        """Дожидается токена и забирает его, блокируя поток.
+
+        Потоки ждут токены по очереди, поэтому общий bucket можно
+        использовать из нескольких потоков.
+        """
+        with self._lock:
+            while (delay := self.delay()) > 0:
+                time.sleep(delay)
+            self.consume()
+
+    def is_full(self) -> bool:
+        """Проверяет, накоплен ли полный запас токенов."""
+        self._refill()
+        return self.tokens >= self.capacity
+
+
+class PriorityRateLimiter(BaseRateLimiter):
+    """Центральная очередь исходящих запросов к Telegram с ограничением частоты.
+
+    Все запросы бота, адресованные чату, проходят через общий token bucket
+    (около 30 сообщений в секунду) и token bucket своего чата. Ожидающие
+    запросы отправляются по приоритету: ответы пользователям (INTERACTIVE)
+    раньше массовых рассылок (BULK). Приоритет передается через `rate_limit_args`.
+    При ответе 429 отправка приостанавливается на `retry_after` секунд,
+    после чего запрос повторяется, но не более `max_retries` раз.
+
+    Методы:
+        process_request(): Ставит запрос в очередь и выполняет его.
+        stats(): Возвращает метрики доставки.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = GLOBAL_RATE,
+        chat_rate: float = CHAT_RATE,
+        group_rate: float = GROUP_RATE,
+        chat_burst: float = CHAT_BURST,
+        max_retries: int = 3,
+    ) -> None:
+        self.max_retries = max_retries
+        self._global_bucket = TokenBucket(global_rate, global_rate)
+        self._chat_rate = chat_rate
+        self._group_rate = group_rate
+        self._chat_burst = chat_burst
+        self._chat_buckets: 'OrderedDict[Union[int, str], TokenBucket]' = OrderedDict()
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._paused_until = 0.0
+        self._sent: Dict[int, int] = {}
+        self._failed = 0
+        self._retried = 0
+        self._waited = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    async def initialize(self) -> None:
+        """Ничего не делает: очередь запускается при первом запросе."""
+
+    async def shutdown(self) -> None:
+        """Останавливает обработку очереди."""
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            self._dispatcher = None
+
+    def _chat_bucket(self, chat_id: Union[int, str]) -> TokenBucket:
+        """Возвращает token bucket чата, удаляя давно не использованные.
+
+        Чаты хранятся в порядке последнего обращения, поэтому вытесняются
+        самые старые, и только если их запас токенов уже восстановился.
+        Старый чат, который еще не восстановился, переносится в конец.
+        """
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is not None:
+            self._chat_buckets.move_to_end(chat_id)
+            return bucket
+        # Отрицательные ID и username - группы и каналы
+        is_group = isinstance(chat_id, str) or chat_id < 0
+        rate = self._group_rate if is_group else self._chat_rate
+        bucket = self._chat_buckets[chat_id] = TokenBucket(rate, self._chat_burst)
+        while len(self._chat_buckets) > MAX_CHAT_BUCKETS:
+            oldest_id, oldest = next(iter(self._chat_buckets.items()))
+            if not oldest.is_full():
+                self._chat_buckets.move_to_end(oldest_id)
+                break
+            self._chat_buckets.popitem(last=False)
+        return bucket
+
+    async def _acquire_chat(self, chat_id: Union[int, str]) -> None:
+        """Дожидается свободного токена в token bucket чата."""
+        bucket = self._chat_bucket(chat_id)
+        while (delay := bucket.delay()) > 0:
+            await asyncio.sleep(delay)
+        bucket.consume()
+
+    async def _acquire_global(self, priority: int) -> None:
+        """Встает в общую очередь и дожидается своей очереди по приоритету."""
+        turn = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), turn))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        await turn
+
+    async def _dispatch(self) -> None:
+        """Выдает общие токены ожидающим запросам в порядке приоритета."""
+        while self._waiters:
+            delay = max(self._paused_until - time.monotonic(), self._global_bucket.delay())
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            _, _, turn = heapq.heappop(self._waiters)
+            if turn.done():
+                continue
+            self._global_bucket.consume()
+            turn.set_result(None)
+
+    def _record_wait(self, enqueued_at: float) -> None:
+        wait = time.monotonic() - enqueued_at
+        self._waited += 1
+        self._total_wait += wait
+        self._max_wait = max(self._max_wait, wait)
+
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Any]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        data: Dict[str, Any],
+        rate_limit_args: Optional[int],
+    ) -> Any:
+        """Выполняет запрос к Bot API с учетом ограничений частоты и приоритета.
+
+        Args:
+            callback (Callable): Функция, выполняющая запрос.
+            args (Any): Позиционные аргументы функции.
+            kwargs (dict): Именованные аргументы функции.
+            endpoint (str): Метод Bot API.
+            data (dict): Параметры запроса.
+            rate_limit_args (int, optional): Приоритет запроса, по умолчанию INTERACTIVE.
+
+        Returns:
+            Any: Ответ Bot API.
+
+        Raises:
+            RetryAfter: Если лимит Telegram превышен и попытки закончились.
+        """
+        priority = INTERACTIVE if rate_limit_args is None else rate_limit_args
+        chat_id = data.get('chat_id')
+        if isinstance(chat_id, str) and chat_id.lstrip('-').isdigit():
+            chat_id = int(chat_id)
+
+        for attempt in range(self.max_retries + 1):
+            if chat_id is not None:
+                enqueued_at = time.monotonic()
+                await self._acquire_chat(chat_id)
+                await self._acquire_global(priority)
+                self._record_wait(enqueued_at)
+            try:
+                result = await callback(*args, **kwargs)
+            except RetryAfter as exc:
+                self._retried += 1
+                if attempt == self.max_retries:
+                    self._failed += 1
+                    logger.error("Лимит Telegram превышен, попытки %s исчерпаны: %s", endpoint, exc)
+                    raise
+                logger.warning("Лимит Telegram превышен, повтор %s через %s с", endpoint, exc.retry_after)
+                self._paused_until = max(self._paused_until, time.monotonic() + exc.retry_after)
+                continue
+            except Exception:
+                self._failed += 1
+                raise
+            self._sent[priority] = self._sent.get(priority, 0) + 1
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Возвращает метрики доставки.
+
+        Returns:
+            Dict[str, Any]: Количество отправленных запросов по приоритетам, ошибок,
+            повторов после 429, длину очереди, среднее и максимальное ожидание в секундах.
+        """
+        sent = sum(self._sent.values())
+        return {
+            'sent': sent,
+            'sent_interactive': self._sent.get(INTERACTIVE, 0),
+            'sent_bulk': self._sent.get(BULK, 0),
+            'failed': self._failed,
+            'retried': self._retried,
+            'queued': len(self._waiters),
+            'avg_wait': self._total_wait / self._waited if self._waited else 0.0,
+            'max_wait': self._max_wait,
+        }
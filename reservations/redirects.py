@@ -0,0 +1,282 @@
+import atexit
+import logging
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.http import Http404, HttpRequest, HttpResponseRedirect
+from django.utils import timezone
+from environs import Env
+
+from reservations.models import BULK_BATCH_SIZE, Link, LinkClickDay
+from reservations.runtime import run_orm
+
+logger = logging.getLogger(__name__)
+
+# Сколько ссылок держать в памяти и сколько секунд считать запись актуальной
+LINK_CACHE_SIZE = 10_000
+LINK_CACHE_TIMEOUT = 300
+
+# Как часто записывать накопленные переходы в базу (секунды)
+CLICK_FLUSH_INTERVAL = 5
+
+# Сколько накопленных ссылок записывать в базу, не дожидаясь интервала
+CLICK_FLUSH_THRESHOLD = 5_000
+
+_click_buffer: Optional['ClickBuffer'] = None
+_click_buffer_lock = threading.Lock()
+
+
+class LinkCache:
+    """LRU-кэш соответствия короткого кода ссылке.
+
+    Хранит в памяти процесса ID и оригинальный адрес последних
+    использованных ссылок, поэтому повторный переход не обращается к базе.
+    Запись устаревает через `timeout` секунд, чтобы изменения ссылок,
+    сделанные в других процессах, со временем подхватывались.
+
+    Атрибуты:
+        maxsize (int): Сколько ссылок хранить.
+        timeout (float): Сколько секунд запись считается актуальной.
+    """
+
+    def __init__(self, maxsize: int = LINK_CACHE_SIZE, timeout: float = LINK_CACHE_TIMEOUT) -> None:
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._entries: 'OrderedDict[str, Tuple[int, str, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, code: str) -> Optional[Tuple[int, str]]:
+        """Возвращает ID и адрес ссылки по коду или None, если ее нет в кэше."""
+        with self._lock:
+            entry = self._entries.get(code)
+            if entry is None:
+                return None
+            if entry[2] < time.monotonic():
+                del self._entries[code]
+                return None
+            self._entries.move_to_end(code)
+            return entry[0], entry[1]
+
+    def set(self, code: str, link_id: int, url: str) -> None:
+        """Запоминает ссылку, вытесняя давно не использованные."""
+        with self._lock:
+            self._entries[code] = (link_id, url, time.monotonic() + self.timeout)
+            self._entries.move_to_end(code)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, code: str) -> None:
+        """Удаляет ссылку из кэша."""
+        with self._lock:
+            self._entries.pop(code, None)
+
+    def clear(self) -> None:
+        """Очищает кэш."""
+        with self._lock:
+            self._entries.clear()
+
+
+link_cache = LinkCache()
+
+
+class ClickBuffer:
+    """Буфер переходов по коротким ссылкам.
+
+    Переход только увеличивает счетчик в памяти. Фоновый поток раз в
+    `flush_interval` секунд (или раньше, если накопилось `flush_threshold`
+    ссылок) записывает накопленное в базу: ссылки с одинаковым числом переходов
+    увеличиваются одним UPDATE с F(), а если включен учет по дням, так же
+    увеличиваются счетчики LinkClickDay. Увеличение через F()
+    не теряет переходы, даже если буферы пишут несколько процессов.
+
+    Атрибуты:
+        daily (bool): Вести ли счетчики переходов по дням.
+        flush_interval (float): Как часто записывать переходы в базу (секунды).
+        flush_threshold (int): Сколько накопленных ссылок записывать без ожидания.
+    """
+
+    def __init__(
+        self,
+        daily: bool = False,
+        flush_interval: float = CLICK_FLUSH_INTERVAL,
+        flush_threshold: int = CLICK_FLUSH_THRESHOLD,
+    ) -> None:
+        self.daily = daily
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self._clicks: Dict[int, int] = defaultdict(int)
+        self._daily_clicks: Dict[Tuple[int, date], int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, link_id: int) -> None:
+        """Учитывает переход по ссылке."""
+        with self._lock:
+            self._clicks[link_id] += 1
+            if self.daily:
+                self._daily_clicks[link_id, timezone.localdate()] += 1
+            full = len(self._clicks) >= self.flush_threshold
+        if full:
+            self._wakeup.set()
+
+    def start(self) -> None:
+        """Запускает фоновую запись переходов и запись остатка при остановке процесса."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='click-flush', daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            close_old_connections()
+            self.flush()
+
+    def flush(self) -> int:
+        """Записывает накопленные переходы в базу.
+
+        Если запись не удалась, переходы возвращаются в буфер и будут
+        записаны при следующей попытке.
+
+        Returns:
+            int: Сколько переходов записано.
+        """
+        with self._flush_lock:
+            with self._lock:
+                clicks, self._clicks = self._clicks, defaultdict(int)
+                daily_clicks, self._daily_clicks = self._daily_clicks, defaultdict(int)
+            if not clicks:
+                return 0
+            try:
+                self._write(clicks, daily_clicks)
+            except Exception:
+                logger.exception("Не удалось записать переходы по ссылкам, повтор при следующей записи")
+                with self._lock:
+                    for link_id, count in clicks.items():
+                        self._clicks[link_id] += count
+                    for key, count in daily_clicks.items():
+                        self._daily_clicks[key] += count
+                return 0
+            return sum(clicks.values())
+
+    @staticmethod
+    def _write(clicks: Dict[int, int], daily_clicks: Dict[Tuple[int, date], int]) -> None:
+        with transaction.atomic():
+            for count, link_ids in _group_by_count(clicks).items():
+                for start in range(0, len(link_ids), BULK_BATCH_SIZE):
+                    Link.objects.filter(pk__in=link_ids[start:start + BULK_BATCH_SIZE]).update(
+                        redirect_clicks=F('redirect_clicks') + count
+                    )
+
+            if not daily_clicks:
+                return
+            # Ссылку могли удалить, пока переходы копились в буфере
+            link_ids = list(clicks)
+            existing = set()
+            for start in range(0, len(link_ids), BULK_BATCH_SIZE):
+                existing.update(
+                    Link.objects.filter(pk__in=link_ids[start:start + BULK_BATCH_SIZE]).values_list('pk', flat=True)
+                )
+            daily_clicks = {key: count for key, count in daily_clicks.items() if key[0] in existing}
+            # Сначала создаем недостающие строки, затем увеличиваем счетчики,
+            # чтобы одновременная запись из другого процесса не потеряла переходы
+            LinkClickDay.objects.bulk_create(
+                [LinkClickDay(link_id=link_id, day=day) for link_id, day in daily_clicks],
+                batch_size=BULK_BATCH_SIZE,
+                ignore_conflicts=True,
+            )
+            by_day: Dict[date, Dict[int, int]] = defaultdict(dict)
+            for (link_id, day), count in daily_clicks.items():
+                by_day[day][link_id] = count
+            for day, day_clicks in by_day.items():
+                for count, link_ids in _group_by_count(day_clicks).items():
+                    for start in range(0, len(link_ids), BULK_BATCH_SIZE):
+                        LinkClickDay.objects.filter(
+                            day=day, link_id__in=link_ids[start:start + BULK_BATCH_SIZE]
+                        ).update(clicks=F('clicks') + count)
+
+
+def _group_by_count(clicks: Dict[int, int]) -> Dict[int, List[int]]:
+    """Группирует ID ссылок по количеству переходов, чтобы увеличить каждую группу одним UPDATE."""
+    groups: Dict[int, List[int]] = defaultdict(list)
+    for link_id, count in clicks.items():
+        groups[count].append(link_id)
+    return groups
+
+
+def get_click_buffer() -> ClickBuffer:
+    """Возвращает буфер переходов процесса, создавая и запуская его при первом обращении.
+
+    Учет переходов по дням включается переменной окружения LINK_DAILY_CLICKS.
+
+    Returns:
+        ClickBuffer: Буфер переходов.
+    """
+    global _click_buffer
+    if _click_buffer is None:
+        with _click_buffer_lock:
+            if _click_buffer is None:
+                env = Env()
+                env.read_env()
+                buffer = ClickBuffer(daily=env.bool('LINK_DAILY_CLICKS', False))
+                buffer.start()
+                _click_buffer = buffer
+    return _click_buffer
+
+
+def get_link_target(code: str) -> Optional[Tuple[int, str]]:
+    """Возвращает ID и оригинальный адрес ссылки по короткому коду.
+
+    Args:
+        code (str): Короткий код ссылки.
+
+    Returns:
+        Optional[Tuple[int, str]]: ID и адрес ссылки или None, если ссылки нет.
+    """
+    return Link.objects.filter(code=code).values_list('pk', 'original_url').first()
+
+
+async def link_redirect(request: HttpRequest, code: str) -> HttpResponseRedirect:
+    """Перенаправляет переход по короткой ссылке на оригинальный адрес.
+
+    Ссылка ищется в LRU-кэше процесса и только при промахе - в базе.
+    Переход учитывается в буфере в памяти, база при этом не блокируется.
+
+    Args:
+        request (HttpRequest): Запрос.
+        code (str): Короткий код ссылки.
+
+    Returns:
+        HttpResponseRedirect: Перенаправление (302) на оригинальный адрес.
+
+    Raises:
+        Http404: Если ссылки с таким кодом нет.
+    """
+    target = link_cache.get(code)
+    if target is None:
+        target = await run_orm(get_link_target, code)
+        if target is None:
+            raise Http404('Ссылка не найдена')
+        link_cache.set(code, *target)
+    link_id, url = target
+    get_click_buffer().add(link_id)
+    return HttpResponseRedirect(url)
+
+
+@receiver(post_save, sender=Link)
+@receiver(post_delete, sender=Link)
+def link_cache_handler(sender: type, instance: Link, **kwargs: Any) -> None:
+    """Удаляет измененную или удаленную ссылку из кэша коротких кодов."""
+    if instance.code:
+        link_cache.invalidate(instance.code)
@@ -0,0 +1,64 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from asgiref.sync import sync_to_async
+
+T = TypeVar('T')
+
+DEFAULT_ORM_POOL_SIZE = 8
+
+_orm_executor: Optional[ThreadPoolExecutor] = None
+
+
+def configure_orm_pool(max_workers: int = DEFAULT_ORM_POOL_SIZE) -> ThreadPoolExecutor:
+    """Создает ограниченный пул потоков для обращений к ORM.
+
+    Django ORM синхронный, поэтому обработчики бота выполняют запросы к базе
+    в отдельных потоках, не блокируя цикл событий asyncio.
+
+    Args:
+        max_workers (int): Максимальное количество потоков в пуле.
+
+    Returns:
+        ThreadPoolExecutor: Созданный пул потоков.
+    """
+    global _orm_executor
+    if _orm_executor is not None:
+        _orm_executor.shutdown(wait=False)
+    _orm_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='orm')
+    return _orm_executor
+
+
+def get_orm_executor() -> ThreadPoolExecutor:
+    """Возвращает пул потоков для ORM, создавая его при первом обращении.
+
+    Returns:
+        ThreadPoolExecutor: Пул потоков для обращений к ORM.
+    """
+    if _orm_executor is None:
+        return configure_orm_pool()
+    return _orm_executor
+
+
+def shutdown_orm_pool() -> None:
+    """Дожидается завершения запросов к ORM и останавливает пул потоков."""
+    global _orm_executor
+    if _orm_executor is not None:
+        _orm_executor.shutdown(wait=True)
+        _orm_executor = None
+
+
+async def run_orm(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Выполняет синхронную функцию, работающую с ORM, в пуле потоков.
+
+    Args:
+        func (Callable): Синхронная функция, обращающаяся к базе данных.
+        *args: Позиционные аргументы функции.
+        **kwargs: Именованные аргументы функции.
+
+    Returns:
+        Результат выполнения функции.
+    """
+    return await sync_to_async(
+        func, thread_sensitive=False, executor=get_orm_executor()
+    )(*args, **kwargs)
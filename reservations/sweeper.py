@@ -0,0 +1,63 @@
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from reservations.models import BLOCKING_STATUSES, DASHBOARD_CACHE_KEY, FreeUnitCounter, Order, StorageUnit
+
+
+def sweep_order_statuses(now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Переводит заказы в актуальные статусы несколькими UPDATE по индексированным датам.
+
+    Ожидающие заказы, срок которых начался, становятся активными, а ожидающие
+    и активные заказы с истекшим сроком - просроченными. В той же транзакции
+    у затронутых ячеек пересчитывается занятость и счетчики свободных ячеек
+    их складов. Заказы и ячейки в память не загружаются.
+
+    Args:
+        now (datetime, optional): Момент, на который пересчитываются статусы.
+            По умолчанию - текущее время.
+
+    Returns:
+        Dict[str, Any]: Количество активированных и просроченных заказов,
+        обновленных ячеек и длительность в секундах.
+    """
+    started_at = time.monotonic()
+    now = now or timezone.now()
+
+    to_activate = Order.objects.filter(status='pending', start_date__lte=now, end_date__gt=now)
+    to_expire = Order.objects.filter(status__in=BLOCKING_STATUSES, end_date__lte=now)
+    # Ячейка занята, пока в ней есть заказ, который еще не закончился
+    still_blocked = Order.objects.filter(
+        storage_unit=OuterRef('pk'), status__in=BLOCKING_STATUSES, end_date__gt=now
+    )
+
+    with transaction.atomic():
+        affected_units = StorageUnit.objects.filter(
+            Q(pk__in=to_expire.values('storage_unit_id')) | Q(pk__in=to_activate.values('storage_unit_id'))
+        )
+        warehouse_ids = list(affected_units.values_list('warehouse_id', flat=True).distinct())
+        units_updated = 0
+        if warehouse_ids:
+            # Занятость пересчитывается до смены статусов, пока затронутые заказы еще можно выбрать
+            units_updated = affected_units.update(is_occupied=Exists(still_blocked))
+
+        activated = to_activate.update(status='active')
+        expired = to_expire.update(status='expired')
+
+        if warehouse_ids:
+            FreeUnitCounter.rebuild(warehouse_ids)
+
+    if activated or expired:
+        cache.delete(DASHBOARD_CACHE_KEY)
+
+    return {
+        'activated': activated,
+        'expired': expired,
+        'units_updated': units_updated,
+        'duration': time.monotonic() - started_at,
+    }
@@ -0,0 +1,139 @@
+import itertools
+import json
+import threading
+import time
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Tuple
+from urllib.parse import parse_qsl, urlparse
+
+# Данные бота, которые заглушка возвращает на getMe
+STUB_BOT = {
+    'id': 1,
+    'is_bot': True,
+    'first_name': 'Stub',
+    'username': 'stub_bot',
+    'can_join_groups': True,
+    'can_read_all_group_messages': False,
+    'supports_inline_queries': False,
+}
+
+
+class TelegramStubServer(ThreadingHTTPServer):
+    """Локальная заглушка Bot API для разработки и проверок без сети.
+
+    Принимает запросы вида /bot<токен>/<метод>, запоминает их и отвечает
+    в формате Bot API: getMe возвращает данные бота, методы send* - сообщение
+    в указанный чат, остальные методы - True. Чтобы проверить поведение бота
+    при превышении лимитов, заглушка может ответить 429 с retry_after.
+    Бот направляется на заглушку переменной окружения TG_API_BASE_URL,
+    например http://127.0.0.1:8765.
+
+    Атрибуты:
+        requests (List[Tuple[float, str, Dict[str, Any]]]): Время получения
+            (time.monotonic()), метод и параметры принятых запросов.
+        retry_after_requests (int): Сколько следующих запросов send* завершить ответом 429.
+        retry_after (int): Сколько секунд ждать после ответа 429.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int] = ('127.0.0.1', 8765)) -> None:
+        super().__init__(address, TelegramStubHandler)
+        self.requests: List[Tuple[float, str, Dict[str, Any]]] = []
+        self.retry_after_requests = 0
+        self.retry_after = 1
+        self._message_ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def start(self) -> threading.Thread:
+        """Запускает заглушку в фоновом потоке.
+
+        Returns:
+            threading.Thread: Поток, обслуживающий запросы.
+        """
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+    def sent(self, method: str = 'sendMessage') -> List[Tuple[float, Dict[str, Any]]]:
+        """Возвращает время и параметры принятых запросов метода.
+
+        Args:
+            method (str): Название метода Bot API.
+
+        Returns:
+            List[Tuple[float, Dict[str, Any]]]: Запросы в порядке получения.
+        """
+        with self._lock:
+            return [(received_at, params) for received_at, name, params in self.requests if name == method]
+
+    def call_method(self, method: str, params: Dict[str, Any]) -> Any:
+        """Выполняет метод Bot API и возвращает его результат."""
+        if method == 'getMe':
+            return STUB_BOT
+        if method.startswith('send'):
+            chat_id = int(params.get('chat_id', 0))
+            return {
+                'message_id': next(self._message_ids),
+                'date': int(time.time()),
+                'chat': {'id': chat_id, 'type': 'private' if chat_id > 0 else 'group'},
+                'text': params.get('text', ''),
+            }
+        return True
+
+
+class TelegramStubHandler(BaseHTTPRequestHandler):
+    """Обработчик запросов к заглушке Bot API (GET и POST /bot<токен>/<метод>)."""
+
+    server: TelegramStubServer
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self) -> None:
+        self._handle(dict(parse_qsl(urlparse(self.path).query)))
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length)
+        content_type = self.headers.get('Content-Type', '')
+        params = dict(parse_qsl(urlparse(self.path).query))
+        if content_type.startswith('application/json'):
+            params.update(json.loads(body or b'{}'))
+        elif content_type.startswith('multipart/form-data'):
+            # Файлы не сохраняются, запоминаются только обычные поля формы
+            message = BytesParser().parsebytes(f'Content-Type: {content_type}\r\n\r\n'.encode() + body)
+            for part in message.get_payload():
+                if part.get_filename() is None:
+                    params[part.get_param('name', header='content-disposition')] = part.get_payload(decode=True).decode()
+        else:
+            params.update(parse_qsl(body.decode()))
+        self._handle(params)
+
+    def _handle(self, params: Dict[str, Any]) -> None:
+        server = self.server
+        method = urlparse(self.path).path.rsplit('/', 1)[-1]
+        with server._lock:
+            server.requests.append((time.monotonic(), method, params))
+            limited = method.startswith('send') and server.retry_after_requests > 0
+            if limited:
+                server.retry_after_requests -= 1
+        if limited:
+            self._send(429, {
+                'ok': False,
+                'error_code': 429,
+                'description': f'Too Many Requests: retry after {server.retry_after}',
+                'parameters': {'retry_after': server.retry_after},
+            })
+            return
+        self._send(200, {'ok': True, 'result': server.call_method(method, params)})
+
+    def _send(self, status: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
@@ -0,0 +1,25 @@
+from django import template
+from django.contrib.admin.templatetags.admin_list import date_hierarchy
+from django.contrib.admin.templatetags.base import InclusionAdminNode
+from django.contrib.admin.views.main import ChangeList
+
+from reservations.pagination import IndexedDateHierarchy
+
+register = template.Library()
+
+
+def order_date_hierarchy(cl: ChangeList) -> dict:
+    """Строит навигацию по датам списка заказов поиском по индексу даты."""
+    return date_hierarchy(IndexedDateHierarchy(cl))
+
+
+@register.tag(name='order_date_hierarchy')
+def order_date_hierarchy_tag(parser: template.base.Parser, token: template.base.Token) -> InclusionAdminNode:
+    """Тег навигации по датам, как date_hierarchy админки, но без обхода всех заказов."""
+    return InclusionAdminNode(
+        parser,
+        token,
+        func=order_date_hierarchy,
+        template_name='date_hierarchy.html',
+        takes_context=False,
+    )
@@ -1,3 +1,1046 @@
-from django.test import TestCase
+import asyncio
+import json
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.admin.sites import site
+from django.contrib.admin.templatetags.admin_list import date_hierarchy
+from django.contrib.auth.models import User as AdminUser
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import Count, Exists, Max, OuterRef, QuerySet
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+import requests
+from telegram import Update
+from telegram.error import TelegramError
+from telegram.ext import Application, ExtBot
+
+from reservations import link_statistics, redirects, webhook
+from reservations.bot import check_and_send_reminders, claim_due_reminders, release_reminders
+from reservations.allocation import configure_allocator, get_allocator
+from reservations.dashboard import collect_dashboard_stats, get_dashboard_stats
+from reservations.link_refresher import refresh_link_stats
+from reservations.link_statistics import VK_EXECUTE_LIMIT, VKClient
+from reservations.models import (
+    DASHBOARD_CACHE_KEY, ChatState, FreeUnitCounter, Link, LinkClickDay, Order, StorageUnit, User, Warehouse
+)
+from reservations.persistence import DatabasePersistence, loads
+from reservations.rate_limiter import BULK, MAX_CHAT_BUCKETS, PriorityRateLimiter
+from reservations.redirects import ClickBuffer, LinkCache, link_cache
+from reservations.sweeper import sweep_order_statuses
+from reservations.telegram_stub import TelegramStubServer
+from reservations.templatetags.order_admin import order_date_hierarchy
+from reservations.update_processor import ChatOrderedUpdateProcessor
+from reservations.vk_stub import VKStubServer
+
+
+class DatabasePersistenceTests(TransactionTestCase):
+    """Запись состояний диалогов в таблицу ChatState."""
+
+    def test_flush_skips_unserializable_chat(self):
+        persistence = DatabasePersistence()
+
+        async def scenario():
+            await persistence.update_conversation('main_menu', (1, 1), 1)
+            await persistence.update_conversation('main_menu', (2, 2), object())
+            await persistence.update_conversation('main_menu', (3, 3), 1)
+            await persistence.flush()
+
+        with self.assertLogs('reservations.persistence', 'ERROR'):
+            asyncio.run(scenario())
+
+        states = dict(ChatState.objects.values_list('chat_id', 'conversations'))
+        self.assertEqual(set(states), {1, 3})
+        self.assertEqual(loads(states[1]), {'main_menu': [[[1, 1], 1]]})
+        self.assertEqual(persistence._dirty, {2})
+
+    def test_flush_writes_chat_once_state_is_fixed(self):
+        persistence = DatabasePersistence()
+
+        async def scenario():
+            await persistence.update_conversation('main_menu', (2, 2), object())
+            await persistence.flush()
+            await persistence.update_conversation('main_menu', (2, 2), 1)
+            await persistence.flush()
+
+        with self.assertLogs('reservations.persistence', 'ERROR'):
+            asyncio.run(scenario())
+
+        self.assertTrue(ChatState.objects.filter(chat_id=2).exists())
+        self.assertEqual(persistence._dirty, set())
+
+    def test_next_process_continues_from_saved_state(self):
+        first, second = DatabasePersistence(), DatabasePersistence()
+        user_data = {}
+
+        async def scenario():
+            await first.update_user_data(1, {'name': 'Иван', 'start_date': timezone.localdate()})
+            await first.update_conversation('main_menu', (1, 1), 3)
+            await first.update_conversation('main_menu', (2, 2), 5)
+            await first.flush()
+
+            # Второй процесс запускается после первого и работает с той же таблицей
+            conversations = await second.get_conversations('main_menu')
+            await second.refresh_user_data(1, user_data)
+            await second.update_conversation('main_menu', (2, 2), None)
+            await second.flush()
+            return conversations
+
+        conversations = asyncio.run(scenario())
+        self.assertEqual(conversations, {(1, 1): 3, (2, 2): 5})
+        self.assertEqual(user_data, {'name': 'Иван', 'start_date': timezone.localdate()})
+        # Завершенный диалог без данных пользователя удаляется, запись другого чата не меняется
+        self.assertEqual(list(ChatState.objects.values_list('chat_id', flat=True)), [1])
+        self.assertEqual(loads(ChatState.objects.get(chat_id=1).conversations), {'main_menu': [[[1, 1], 3]]})
+
+
+class ConcurrentReservationTests(TransactionTestCase):
+    """Параллельные бронирования в SQLite не занимают одну ячейку дважды."""
+
+    THREADS = 16
+
+    def setUp(self):
+        self.warehouse = Warehouse.objects.create(name='Склад', layout={'small': 3, 'medium': 1, 'large': 0})
+        self.users = [User.objects.create(name=f'Клиент {i}', phone_number='+79990000000') for i in range(self.THREADS)]
+        self.start_date = timezone.now() + timedelta(days=1)
+
+    def tearDown(self):
+        configure_allocator()
+
+    def reserve_concurrently(self, start_dates):
+        barrier = threading.Barrier(len(start_dates))
+        orders, errors = [], []
+
+        def book(user, start_date):
+            try:
+                barrier.wait()
+                orders.append(get_allocator().reserve(user, start_date, 10, size='small'))
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connections.close_all()
+
+        threads = [
+            threading.Thread(target=book, args=(user, start_date))
+            for user, start_date in zip(self.users, start_dates)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        return [order for order in orders if order is not None]
+
+    def assert_no_overlaps(self):
+        overlapping = Order.objects.blocking().filter(Exists(
+            Order.objects.blocking()
+            .filter(
+                storage_unit=OuterRef('storage_unit'),
+                start_date__lt=OuterRef('end_date'),
+                end_date__gt=OuterRef('start_date'),
+            )
+            .exclude(pk=OuterRef('pk'))
+        ))
+        self.assertFalse(overlapping.exists())
+
+    def test_same_period_books_each_unit_once(self):
+        for strategy in ('random', 'first_fit', 'load_balancing'):
+            with self.subTest(strategy=strategy):
+                Order.objects.all().delete()
+                configure_allocator(strategy)
+                orders = self.reserve_concurrently([self.start_date] * self.THREADS)
+
+                small_units = StorageUnit.objects.filter(warehouse=self.warehouse, size='small').count()
+                self.assertEqual(len(orders), small_units)
+                self.assertEqual(len({order.storage_unit_id for order in orders}), small_units)
+                self.assert_no_overlaps()
+                self.assertEqual(get_allocator().stats()['reserved'], small_units)
+
+    def test_shifted_periods_do_not_overlap(self):
+        start_dates = [self.start_date + timedelta(days=3 * (i % 4)) for i in range(self.THREADS)]
+        orders = self.reserve_concurrently(start_dates)
+
+        self.assertTrue(orders)
+        self.assert_no_overlaps()
+
+
+class OrderOccupancyTests(TestCase):
+    """Занятость ячеек и счетчики свободных ячеек при сохранении заказов."""
+
+    def setUp(self):
+        warehouse = Warehouse.objects.create(name='Склад', layout={'small': 2, 'medium': 0, 'large': 0})
+        self.unit, self.other_unit = StorageUnit.objects.filter(warehouse=warehouse).order_by('pk')
+        self.user = User.objects.create(name='Клиент', phone_number='+79990000000')
+        self.now = timezone.now()
+
+    def create_order(self, unit, start_date, duration=10):
+        return Order.objects.create(
+            user=self.user, storage_unit=unit, start_date=start_date, storage_duration=duration
+        )
+
+    def assert_occupancy(self, unit, occupied):
+        unit.refresh_from_db()
+        self.assertEqual(unit.is_occupied, occupied)
+        free_units = StorageUnit.objects.filter(warehouse=unit.warehouse, size=unit.size, is_occupied=False).count()
+        counter = FreeUnitCounter.objects.get(warehouse=unit.warehouse, size=unit.size)
+        self.assertEqual(counter.free_count, free_units)
+
+    def test_completed_order_keeps_unit_occupied_by_other_order(self):
+        active = self.create_order(self.unit, self.now - timedelta(days=1))
+        pending = self.create_order(self.unit, self.now + timedelta(days=30))
+        self.assert_occupancy(self.unit, True)
+
+        active.status = 'completed'
+        active.save()
+        self.assert_occupancy(self.unit, True)
+
+        pending.status = 'completed'
+        pending.save(update_fields=['status'])
+        self.assert_occupancy(self.unit, False)
+
+    def test_moved_order_releases_previous_unit(self):
+        order = self.create_order(self.unit, self.now - timedelta(days=1))
+        self.assert_occupancy(self.unit, True)
+
+        order = Order.objects.get(pk=order.pk)
+        order.storage_unit = self.other_unit
+        order.save()
+        self.assert_occupancy(self.unit, False)
+        self.assert_occupancy(self.other_unit, True)
+
+
+class OrderOverlapTests(TestCase):
+    """Проверка пересечений при изменении существующих заказов."""
+
+    def setUp(self):
+        warehouse = Warehouse.objects.create(name='Склад', layout={'small': 2, 'medium': 0, 'large': 0})
+        self.unit, self.other_unit = StorageUnit.objects.filter(warehouse=warehouse).order_by('pk')
+        self.user = User.objects.create(name='Клиент', phone_number='+79990000000')
+        start_date = timezone.now() + timedelta(days=1)
+        self.first = Order.objects.create(
+            user=self.user, storage_unit=self.unit, start_date=start_date, storage_duration=10
+        )
+        self.second = Order.objects.create(
+            user=self.user, storage_unit=self.unit, start_date=start_date + timedelta(days=20), storage_duration=10
+        )
+
+    def test_extending_into_next_order_is_rejected(self):
+        order = Order.objects.get(pk=self.first.pk)
+        order.storage_duration = 25
+        with self.assertRaises(ValidationError):
+            order.save()
+        self.assertEqual(Order.objects.get(pk=self.first.pk).storage_duration, 10)
+
+    def test_moving_start_date_into_other_order_is_rejected(self):
+        order = Order.objects.get(pk=self.second.pk)
+        order.start_date = self.first.start_date + timedelta(days=5)
+        with self.assertRaises(ValidationError):
+            order.save(update_fields=['start_date'])
+
+    def test_moving_to_busy_unit_is_rejected(self):
+        other = Order.objects.create(
+            user=self.user, storage_unit=self.other_unit, start_date=self.first.start_date, storage_duration=5
+        )
+        other = Order.objects.get(pk=other.pk)
+        other.storage_unit = self.unit
+        with self.assertRaises(ValidationError):
+            other.save()
+
+    def test_change_without_overlap_is_saved(self):
+        order = Order.objects.get(pk=self.first.pk)
+        order.storage_duration = 19
+        order.save()
+        self.assertEqual(Order.objects.get(pk=self.first.pk).storage_duration, 19)
+
+
+class OrderDateHierarchyTests(TestCase):
+    """Навигация по датам в списке заказов админки."""
+
+    def setUp(self):
+        warehouse = Warehouse.objects.create(name='Склад', layout={'small': 4, 'medium': 0, 'large': 0})
+        units = StorageUnit.objects.filter(warehouse=warehouse).order_by('pk')
+        user = User.objects.create(name='Клиент', phone_number='+79990000000')
+        tz = timezone.get_current_timezone()
+        self.start_dates = [
+            timezone.datetime(2024, 12, 31, 23, 30, tzinfo=tz),
+            timezone.datetime(2025, 1, 1, 0, 30, tzinfo=tz),
+            timezone.datetime(2025, 1, 15, 12, 0, tzinfo=tz),
+            timezone.datetime(2025, 3, 3, 9, 0, tzinfo=tz),
+        ]
+        for unit, start_date in zip(units, self.start_dates):
+            Order.objects.create(user=user, storage_unit=unit, start_date=start_date, storage_duration=10)
+        self.admin_user = AdminUser.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def changelist(self, **params):
+        request = RequestFactory().get(reverse('admin:reservations_order_changelist'), params)
+        request.user = self.admin_user
+        return site._registry[Order].get_changelist_instance(request)
+
+    def test_order_queryset_keeps_django_behaviour(self):
+        latest = Order.objects.order_by('-start_date')[:3].aggregate(first=Max('start_date'))
+        self.assertEqual(latest['first'], self.start_dates[-1])
+        self.assertIsInstance(Order.objects.datetimes('start_date', 'month'), QuerySet)
+
+    def test_choices_match_django_date_hierarchy(self):
+        for params in (
+            {},
+            {'start_date__year': '2025'},
+            {'start_date__year': '2025', 'start_date__month': '1'},
+            {'start_date__year': '2025', 'status__exact': 'pending'},
+        ):
+            with self.subTest(params=params):
+                cl = self.changelist(**params)
+                expected = date_hierarchy(cl)
+                # Границы дат запрашиваются только без выбранного периода
+                bounds_queries = 0 if params else 2
+                with self.assertNumQueries(bounds_queries + len(expected['choices']) + 1):
+                    result = order_date_hierarchy(cl)
+                self.assertEqual(result['choices'], expected['choices'])
+                self.assertEqual(result['back'], expected['back'])
+
+    def test_changelist_renders_years(self):
+        self.client.force_login(self.admin_user)
+        response = self.client.get(reverse('admin:reservations_order_changelist'))
+        self.assertContains(response, '?start_date__year=2024')
+        self.assertContains(response, '?start_date__year=2025')
+
+
+class VKStubMixin:
+    """Запускает локальную заглушку API VK и клиент, направленный на нее."""
+
+    def setUp(self):
+        super().setUp()
+        self.server = VKStubServer(('127.0.0.1', 0))
+        self.server.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.client = self.make_client()
+        self.addCleanup(self.client.close)
+
+    def make_client(self, **kwargs):
+        kwargs = {'backoff': 0.01, 'requests_per_second': None, **kwargs}
+        host, port = self.server.server_address
+        return VKClient('token', base_url=f'http://{host}:{port}/method/', **kwargs)
+
+
+class VKClientTests(VKStubMixin, SimpleTestCase):
+    """Клиент API VK против локальной заглушки."""
+
+    def test_transient_errors_are_retried(self):
+        self.server.fail_requests = 2
+        self.assertTrue(self.client.shorten_link('https://example.com/').startswith('https://vk.cc/'))
+        self.assertEqual(self.server.requests_count, 3)
+
+    def test_retries_stop_after_max_retries(self):
+        self.server.fail_requests = 10
+        client = self.make_client(max_retries=2)
+        with self.assertRaises(requests.HTTPError):
+            client.shorten_link('https://example.com/')
+        self.assertEqual(self.server.requests_count, 3)
+
+    def test_retries_take_tokens(self):
+        self.server.fail_requests = 2
+        client = self.make_client(backoff=0, requests_per_second=10)
+        client.shorten_link('https://example.com/')
+        # Три попытки забрали три токена из десяти, за время запросов успело накопиться немного
+        self.assertLess(client.bucket.tokens, 8)
+
+    def test_execute_batches_links(self):
+        urls = [f'https://example.com/{i}' for i in range(VK_EXECUTE_LIMIT * 2 + 1)]
+        short_urls = self.client.shorten_links(urls)
+        self.assertEqual(self.server.requests_count, 3)
+        self.assertEqual(len(set(short_urls)), len(urls))
+
+        self.server.add_clicks(short_urls[0], 5)
+        self.assertEqual(self.client.count_clicks_many(short_urls)[:2], [5, 0])
+        self.assertEqual(self.server.requests_count, 6)
+
+    def test_failed_link_does_not_fail_chunk(self):
+        short_url = self.client.shorten_link('https://example.com/')
+        self.server.add_clicks(short_url, 2)
+        self.assertEqual(self.client.count_clicks_many([short_url, 'https://vk.cc/missing']), [2, None])
+
+    def test_shared_client_is_created_once(self):
+        saved_client = link_statistics._vk_client
+        link_statistics._vk_client = None
+        self.addCleanup(setattr, link_statistics, '_vk_client', saved_client)
+
+        def slow_token():
+            # Пока первый поток читает токен, остальные успевают проверить клиент
+            time.sleep(0.05)
+            return 'token'
+
+        clients = []
+        barrier = threading.Barrier(8)
+
+        def get_client():
+            barrier.wait()
+            clients.append(link_statistics.get_vk_client())
+
+        with mock.patch.object(link_statistics, 'get_token', side_effect=slow_token) as get_token:
+            threads = [threading.Thread(target=get_client) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(get_token.call_count, 1)
+        self.assertEqual(len({id(client) for client in clients}), 1)
+
+
+class LinkRefresherTests(VKStubMixin, TransactionTestCase):
+    """Фоновое обновление ссылок через локальную заглушку API VK."""
+
+    def setUp(self):
+        super().setUp()
+        previous_client = link_statistics._vk_client
+        link_statistics._vk_client = self.client
+        self.addCleanup(setattr, link_statistics, '_vk_client', previous_client)
+
+    def test_links_are_shortened_and_counted(self):
+        links = [Link.objects.create(original_url=f'https://example.com/{i}') for i in range(VK_EXECUTE_LIMIT + 5)]
+        result = asyncio.run(refresh_link_stats())
+        self.assertEqual((result['refreshed'], result['failed']), (len(links), 0))
+        self.assertEqual(self.server.requests_count, 2)
+
+        first = Link.objects.get(pk=links[0].pk)
+        self.server.add_clicks(first.short_url, 7)
+        Link.objects.filter(pk=links[1].pk).update(short_url='https://vk.cc/missing')
+        missing_updated_at = Link.objects.get(pk=links[1].pk).stats_updated_at
+        result = asyncio.run(refresh_link_stats(max_age=timedelta(0)))
+        self.assertEqual((result['refreshed'], result['failed']), (len(links) - 1, 1))
+        self.assertEqual(Link.objects.get(pk=first.pk).click_count, 7)
+        self.assertEqual(Link.objects.get(pk=links[1].pk).stats_updated_at, missing_updated_at)
+
+
+class PriorityRateLimiterTests(SimpleTestCase):
+    """Очередь исходящих запросов бота против локальной заглушки Bot API."""
+
+    def setUp(self):
+        self.server = TelegramStubServer(('127.0.0.1', 0))
+        self.server.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def send(self, limiter, messages, delayed=()):
+        """Отправляет сообщения (chat_id, text, priority), а `delayed` - чуть позже остальных."""
+        host, port = self.server.server_address
+        bot = ExtBot('123:token', base_url=f'http://{host}:{port}/bot', rate_limiter=limiter)
+
+        async def scenario():
+            async with bot:
+                async def send_later():
+                    await asyncio.sleep(0.05)
+                    await asyncio.gather(*(
+                        bot.send_message(chat_id, text, rate_limit_args=priority) for chat_id, text, priority in delayed
+                    ))
+
+                await asyncio.gather(send_later(), *(
+                    bot.send_message(chat_id, text, rate_limit_args=priority) for chat_id, text, priority in messages
+                ))
+
+        asyncio.run(scenario())
+        return self.server.sent()
+
+    def test_interactive_messages_overtake_bulk(self):
+        limiter = PriorityRateLimiter(global_rate=5)
+        bulk = [(chat_id, f'bulk {chat_id}', BULK) for chat_id in range(1, 11)]
+        interactive = [(100, 'interactive', None), (101, 'interactive', None)]
+        texts = [params['text'] for _, params in self.send(limiter, bulk, delayed=interactive)]
+
+        # Первые пять рассылок получили токены сразу, ответы пользователям идут следующими
+        self.assertEqual(texts[5:7], ['interactive', 'interactive'])
+        self.assertEqual(limiter.stats()['sent_bulk'], 10)
+
+    def test_global_rate_is_limited(self):
+        limiter = PriorityRateLimiter(global_rate=5)
+        sent = self.send(limiter, [(chat_id, 'text', None) for chat_id in range(1, 11)])
+        # Пять сообщений уходят сразу, еще пять - по одному раз в 0.2 с
+        self.assertGreater(sent[-1][0] - sent[0][0], 0.9)
+
+    def test_chat_rate_is_limited(self):
+        limiter = PriorityRateLimiter(chat_rate=5, chat_burst=1)
+        sent = self.send(limiter, [(1, 'text', None)] * 3 + [(2, 'other chat', None)])
+        chat_times = [received_at for received_at, params in sent if params['chat_id'] == '1']
+        self.assertGreater(chat_times[-1] - chat_times[0], 0.35)
+        # Другой чат не ждет, пока освободится первый
+        self.assertEqual([params['text'] for _, params in sent].index('other chat'), 1)
+
+    def test_retry_after_pauses_all_sending(self):
+        self.server.retry_after_requests = 1
+        limiter = PriorityRateLimiter()
+        with self.assertLogs('reservations.rate_limiter', 'WARNING'):
+            sent = self.send(limiter, [(1, 'first', None)], delayed=[(2, 'second', None)])
+
+        self.assertEqual([params['text'] for _, params in sent], ['first', 'first', 'second'])
+        # После 429 повтор и сообщения других чатов ждут retry_after
+        for received_at, _ in sent[1:]:
+            self.assertGreater(received_at - sent[0][0], self.server.retry_after - 0.1)
+        self.assertEqual(limiter.stats()['retried'], 1)
+
+    def test_idle_chat_buckets_are_evicted_oldest_first(self):
+        limiter = PriorityRateLimiter()
+        busy = limiter._chat_bucket(0)
+        busy.consume()
+        for chat_id in range(1, MAX_CHAT_BUCKETS + 10):
+            limiter._chat_bucket(chat_id)
+
+        # Чат с неполным запасом токенов не вытесняется, пока не восстановится
+        self.assertIs(limiter._chat_bucket(0), busy)
+        self.assertNotIn(1, limiter._chat_buckets)
+        for chat_id in range(MAX_CHAT_BUCKETS + 10, MAX_CHAT_BUCKETS + 20):
+            limiter._chat_bucket(chat_id)
+        self.assertEqual(len(limiter._chat_buckets), MAX_CHAT_BUCKETS)
+
+
+class DashboardTests(TestCase):
+    """Сводка по складам и заказам в админке."""
+
+    def setUp(self):
+        cache.delete(DASHBOARD_CACHE_KEY)
+        self.addCleanup(cache.delete, DASHBOARD_CACHE_KEY)
+        self.warehouse = Warehouse.objects.create(name='Склад', layout={'small': 2, 'medium': 1, 'large': 0})
+        self.small, self.other_small = StorageUnit.objects.filter(warehouse=self.warehouse, size='small').order_by('pk')
+        self.medium = StorageUnit.objects.get(warehouse=self.warehouse, size='medium')
+        self.user = User.objects.create(name='Клиент', phone_number='+79990000000')
+        self.now = timezone.now()
+        self.active = self.create_order(self.small, self.now - timedelta(days=1), 5)
+        self.pending = self.create_order(self.medium, self.now + timedelta(days=10), 20)
+        self.completed = self.create_order(self.other_small, self.now - timedelta(days=30), 3)
+        self.completed.status = 'completed'
+        self.completed.save()
+
+    def create_order(self, unit, start_date, duration):
+        return Order.objects.create(user=self.user, storage_unit=unit, start_date=start_date, storage_duration=duration)
+
+    def test_stats_are_aggregated(self):
+        stats = collect_dashboard_stats(self.now)
+
+        occupancy = {row['size']: (row['total'], row['occupied']) for row in stats['occupancy']}
+        sizes = dict(StorageUnit.SIZE_CHOICES)
+        self.assertEqual(occupancy, {sizes['small']: (2, 1), sizes['medium']: (1, 1)})
+        self.assertEqual((stats['units_total'], stats['units_occupied']), (3, 2))
+        self.assertEqual(
+            {row['status']: row['count'] for row in stats['orders_by_status']},
+            {'Ожидает': 1, 'Активен': 1, 'Просрочен': 0, 'Закончен': 1},
+        )
+        # Выручка только по ожидающим и активным заказам: 5 дней по 100 и 20 дней по 300
+        self.assertEqual({row['status']: row['revenue'] for row in stats['revenue']}, {'Активен': 500, 'Ожидает': 6000})
+        self.assertEqual(stats['revenue_total'], 6500)
+        self.assertEqual(stats['expiring_soon'], [self.active])
+        self.assertEqual(stats['expiring_soon_count'], 1)
+
+    def test_cached_stats_are_reset_on_changes(self):
+        self.assertEqual(get_dashboard_stats()['revenue_total'], 6500)
+        with self.assertNumQueries(0):
+            get_dashboard_stats()
+
+        self.create_order(self.other_small, self.now + timedelta(days=1), 1)
+        self.assertEqual(get_dashboard_stats()['revenue_total'], 6600)
+
+        Order.objects.filter(pk=self.pending.pk).delete()
+        self.assertEqual(get_dashboard_stats()['revenue_total'], 600)
+
+    def test_cache_reset_is_visible_to_other_processes(self):
+        def cached_in_other_process():
+            # Отдельный процесс Django, как админка рядом с ботом
+            result = subprocess.run(
+                [sys.executable, 'manage.py', 'shell', '-c',
+                 f'from django.core.cache import cache; print(cache.has_key({DASHBOARD_CACHE_KEY!r}))'],
+                cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+            )
+            return result.stdout.strip() == 'True'
+
+        get_dashboard_stats()
+        self.assertTrue(cached_in_other_process())
+
+        self.active.storage_duration = 6
+        self.active.save()
+        self.assertFalse(cached_in_other_process())
+
+
+class ChatOrderedUpdateProcessorTests(SimpleTestCase):
+    """Обработка обновлений по порядку внутри чата и параллельно между чатами."""
+
+    @staticmethod
+    def update(chat_id):
+        return SimpleNamespace(effective_chat=SimpleNamespace(id=chat_id))
+
+    def test_chat_updates_run_in_order(self):
+        processor = ChatOrderedUpdateProcessor(workers=4)
+        events = []
+
+        async def handle(number, delay):
+            events.append(('start', number))
+            await asyncio.sleep(delay)
+            events.append(('end', number))
+
+        async def scenario():
+            # Первое обновление обрабатывается дольше следующих, но они его не обгоняют
+            await asyncio.gather(*(
+                processor.process_update(self.update(1), handle(number, delay))
+                for number, delay in enumerate([0.05, 0.01, 0])
+            ))
+
+        asyncio.run(scenario())
+        self.assertEqual(events, [('start', 0), ('end', 0), ('start', 1), ('end', 1), ('start', 2), ('end', 2)])
+
+    def test_chats_run_in_parallel_up_to_workers(self):
+        processor = ChatOrderedUpdateProcessor(workers=2)
+        running, max_running = 0, 0
+
+        async def handle():
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.02)
+            running -= 1
+
+        async def scenario():
+            await asyncio.gather(*(processor.process_update(self.update(chat_id), handle()) for chat_id in range(5)))
+
+        asyncio.run(scenario())
+        self.assertEqual(max_running, 2)
+        self.assertEqual(processor.stats()['processed'], 5)
+
+    def test_failed_and_cancelled_updates_release_the_chat(self):
+        processor = ChatOrderedUpdateProcessor(workers=2)
+        handled = []
+
+        async def fail():
+            raise RuntimeError('ошибка обработчика')
+
+        async def hang():
+            await asyncio.sleep(60)
+
+        async def handle(name):
+            handled.append(name)
+
+        async def scenario():
+            failed = asyncio.create_task(processor.process_update(self.update(1), fail()))
+            running = asyncio.create_task(processor.process_update(self.update(1), hang()))
+            waiting = asyncio.create_task(processor.process_update(self.update(1), hang()))
+            last = asyncio.create_task(processor.process_update(self.update(1), handle('last')))
+            await asyncio.sleep(0.01)
+            # Зависшее обновление отменяется во время обработки, следующее - пока ждет очереди
+            running.cancel()
+            waiting.cancel()
+            results = await asyncio.gather(failed, running, waiting, last, return_exceptions=True)
+            return results
+
+        results = asyncio.run(scenario())
+        self.assertIsInstance(results[0], RuntimeError)
+        self.assertIsInstance(results[1], asyncio.CancelledError)
+        self.assertIsInstance(results[2], asyncio.CancelledError)
+        self.assertEqual(handled, ['last'])
+        stats = processor.stats()
+        self.assertEqual((stats['pending'], stats['running'], stats['queued_chats']), (0, 0, 0))
+
+    def test_stats_report_queue_depth_and_wait(self):
+        processor = ChatOrderedUpdateProcessor(workers=2)
+        release = None
+
+        async def block():
+            await release.wait()
+
+        async def handle():
+            pass
+
+        async def scenario():
+            nonlocal release
+            release = asyncio.Event()
+            tasks = [asyncio.create_task(processor.process_update(self.update(1), block()))]
+            tasks += [asyncio.create_task(processor.process_update(self.update(1), handle())) for _ in range(2)]
+            tasks.append(asyncio.create_task(processor.process_update(self.update(2), handle())))
+            await asyncio.sleep(0.05)
+            busy = processor.stats()
+            release.set()
+            await asyncio.gather(*tasks)
+            return busy
+
+        busy = asyncio.run(scenario())
+        self.assertEqual(busy['running'], 1)
+        self.assertEqual(busy['pending'], 2)
+        self.assertEqual(busy['queued_chats'], 1)
+        self.assertEqual(busy['max_chat_queue_depth'], 3)
+        self.assertEqual(busy['processed'], 1)
+
+        done = processor.stats()
+        self.assertEqual((done['pending'], done['running'], done['processed']), (0, 0, 4))
+        self.assertGreaterEqual(done['max_wait'], 0.05)
+        self.assertGreater(done['avg_wait'], 0)
+
+
+class BulkDeleteTests(TestCase):
+    """Массовое удаление заказов и пользователей с освобождением ячеек."""
+
+    def setUp(self):
+        self.warehouse = Warehouse.objects.create(name='Склад', layout={'small': 3, 'medium': 0, 'large': 0})
+        self.shared_unit, self.unit, self.free_unit = StorageUnit.objects.filter(warehouse=self.warehouse).order_by('pk')
+        self.owner = User.objects.create(name='Клиент', phone_number='+79990000000')
+        self.other = User.objects.create(name='Другой клиент', phone_number='+79990000001')
+        now = timezone.now()
+        self.deleted_shared = self.create_order(self.owner, self.shared_unit, now - timedelta(days=1))
+        self.remaining = self.create_order(self.other, self.shared_unit, now + timedelta(days=30))
+        self.deleted = self.create_order(self.owner, self.unit, now - timedelta(days=1))
+
+    @staticmethod
+    def create_order(user, unit, start_date):
+        return Order.objects.create(user=user, storage_unit=unit, start_date=start_date, storage_duration=10)
+
+    def assert_units_after_delete(self):
+        occupied = dict(StorageUnit.objects.filter(warehouse=self.warehouse).values_list('pk', 'is_occupied'))
+        self.assertEqual(occupied, {self.shared_unit.pk: True, self.unit.pk: False, self.free_unit.pk: False})
+        counter = FreeUnitCounter.objects.get(warehouse=self.warehouse, size='small')
+        self.assertEqual(counter.free_count, sum(not value for value in occupied.values()))
+        self.assertEqual(list(Order.objects.values_list('pk', flat=True)), [self.remaining.pk])
+
+    def test_order_queryset_delete_frees_only_unused_units(self):
+        with CaptureQueriesContext(connection) as queries:
+            deleted, by_model = Order.objects.filter(user=self.owner).delete()
+
+        self.assertEqual((deleted, by_model), (2, {'reservations.Order': 2}))
+        self.assert_units_after_delete()
+        statements = [query['sql'] for query in queries.captured_queries]
+        self.assertEqual(sum(sql.startswith('UPDATE "reservations_storageunit"') for sql in statements), 1)
+        self.assertEqual(sum(sql.startswith('DELETE FROM "reservations_order"') for sql in statements), 1)
+
+    def test_admin_bulk_delete_of_users_releases_units(self):
+        admin_user = AdminUser.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(admin_user)
+        response = self.client.post(reverse('admin:reservations_user_changelist'), {
+            'action': 'delete_selected',
+            '_selected_action': [self.owner.pk],
+            'post': 'yes',
+        })
+
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(User.objects.filter(pk=self.owner.pk).exists())
+        self.assert_units_after_delete()
+
+
+class SweepOrderStatusesTests(TestCase):
+    """Перевод заказов в актуальные статусы по датам."""
+
+    def test_statuses_occupancy_and_counters_follow_now(self):
+        warehouse = Warehouse.objects.create(name='Склад', layout={'small': 4, 'medium': 0, 'large': 0})
+        started_unit, ended_unit, shared_unit, free_unit = StorageUnit.objects.filter(warehouse=warehouse).order_by('pk')
+        user = User.objects.create(name='Клиент', phone_number='+79990000000')
+        now = timezone.now()
+
+        def create_order(unit, start_days, duration, status):
+            order = Order.objects.create(
+                user=user, storage_unit=unit, start_date=now + timedelta(days=start_days), storage_duration=duration
+            )
+            Order.objects.filter(pk=order.pk).update(status=status)
+            return order.pk
+
+        started = create_order(started_unit, -1, 10, 'pending')
+        ended = create_order(ended_unit, -20, 10, 'active')
+        ended_pending = create_order(shared_unit, -20, 5, 'pending')
+        upcoming = create_order(shared_unit, 5, 10, 'pending')
+        # Счетчики заведомо устарели: обход пересобирает их по ячейкам
+        FreeUnitCounter.objects.filter(warehouse=warehouse).update(free_count=0)
+
+        result = sweep_order_statuses(now)
+
+        self.assertEqual((result['activated'], result['expired']), (1, 2))
+        statuses = dict(Order.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses, {started: 'active', ended: 'expired', ended_pending: 'expired', upcoming: 'pending'})
+        occupied = dict(StorageUnit.objects.filter(warehouse=warehouse).values_list('pk', 'is_occupied'))
+        self.assertEqual(occupied, {
+            started_unit.pk: True, ended_unit.pk: False, shared_unit.pk: True, free_unit.pk: False,
+        })
+        self.assertEqual(FreeUnitCounter.objects.get(warehouse=warehouse, size='small').free_count, 2)
+
+        # Повторный обход ничего не меняет
+        repeated = sweep_order_statuses(now)
+        self.assertEqual((repeated['activated'], repeated['expired'], repeated['units_updated']), (0, 0, 0))
+
+
+class LinkRedirectTests(TransactionTestCase):
+    """Переходы по собственным коротким ссылкам и учет кликов."""
+
+    def setUp(self):
+        link_cache.clear()
+        self.addCleanup(link_cache.clear)
+        self.buffer = ClickBuffer(daily=True)
+        previous_buffer = redirects._click_buffer
+        redirects._click_buffer = self.buffer
+        self.addCleanup(setattr, redirects, '_click_buffer', previous_buffer)
+        self.link = Link.objects.create(original_url='https://example.com/first')
+        self.other = Link.objects.create(original_url='https://example.com/second')
+
+    def visit(self, link):
+        return self.client.get(reverse('link_redirect', args=[link.code]))
+
+    def test_clicks_are_written_on_flush(self):
+        for link in (self.link, self.link, self.other):
+            response = self.visit(link)
+            self.assertRedirects(response, link.original_url, fetch_redirect_response=False)
+        self.assertEqual(Link.objects.get(pk=self.link.pk).redirect_clicks, 0)
+
+        self.assertEqual(self.buffer.flush(), 3)
+        self.visit(self.link)
+        self.assertEqual(self.buffer.flush(), 1)
+
+        clicks = dict(Link.objects.values_list('pk', 'redirect_clicks'))
+        self.assertEqual(clicks, {self.link.pk: 3, self.other.pk: 1})
+        days = dict(LinkClickDay.objects.filter(day=timezone.localdate()).values_list('link_id', 'clicks'))
+        self.assertEqual(days, {self.link.pk: 3, self.other.pk: 1})
+
+    def test_empty_flush_does_not_query(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(self.buffer.flush(), 0)
+
+    def test_unknown_code_returns_404(self):
+        response = self.client.get(reverse('link_redirect', args=['missing']))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.buffer.flush(), 0)
+
+    def test_changed_link_is_removed_from_cache(self):
+        self.visit(self.link)
+        self.assertEqual(link_cache.get(self.link.code), (self.link.pk, self.link.original_url))
+
+        self.link.original_url = 'https://example.com/changed'
+        self.link.save()
+        self.assertIsNone(link_cache.get(self.link.code))
+        self.assertRedirects(self.visit(self.link), 'https://example.com/changed', fetch_redirect_response=False)
+
+
+class LinkCacheTests(SimpleTestCase):
+    """LRU-кэш коротких кодов со сроком жизни записей."""
+
+    def test_least_recently_used_code_is_evicted(self):
+        cache = LinkCache(maxsize=2)
+        cache.set('a', 1, 'https://example.com/a')
+        cache.set('b', 2, 'https://example.com/b')
+        cache.get('a')
+        cache.set('c', 3, 'https://example.com/c')
+
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), (1, 'https://example.com/a'))
+        self.assertEqual(cache.get('c'), (3, 'https://example.com/c'))
+
+    def test_expired_code_is_dropped(self):
+        cache = LinkCache(timeout=0)
+        cache.set('a', 1, 'https://example.com/a')
+        self.assertIsNone(cache.get('a'))
+
+
+class TelegramWebhookTests(SimpleTestCase):
+    """Прием обновлений Telegram через вебхук."""
+
+    UPDATE = {
+        'update_id': 1,
+        'message': {'message_id': 1, 'date': 0, 'chat': {'id': 5, 'type': 'private'}, 'text': '/start'},
+    }
+
+    def setUp(self):
+        self.application = Application.builder().token('123:token').updater(None).build()
+        self.addCleanup(setattr, webhook, '_application', webhook._application)
+        self.addCleanup(setattr, webhook, '_secret_token', webhook._secret_token)
+        webhook._application = self.application
+        webhook._secret_token = 'secret'
+
+    def post(self, body, secret='secret'):
+        headers = {webhook.SECRET_TOKEN_HEADER: secret} if secret is not None else {}
+        return self.client.post(
+            reverse('telegram_webhook'), data=body, content_type='application/json', headers=headers
+        )
+
+    def test_update_is_queued(self):
+        response = self.post(json.dumps(self.UPDATE))
+        self.assertEqual(response.status_code, 200)
+        update = self.application.update_queue.get_nowait()
+        self.assertIsInstance(update, Update)
+        self.assertEqual(update.effective_chat.id, 5)
+
+    def test_wrong_or_missing_secret_is_rejected(self):
+        for secret in (None, '', 'wrong'):
+            with self.subTest(secret=secret):
+                self.assertEqual(self.post(json.dumps(self.UPDATE), secret=secret).status_code, 403)
+        self.assertTrue(self.application.update_queue.empty())
+
+    def test_malformed_body_is_rejected(self):
+        for body in ('not json', '{}', '[]', 'null'):
+            with self.subTest(body=body):
+                self.assertEqual(self.post(body).status_code, 400)
+        self.assertTrue(self.application.update_queue.empty())
+
+    def test_unavailable_before_startup(self):
+        webhook._application = None
+        self.assertEqual(self.post(json.dumps(self.UPDATE)).status_code, 503)
+
+
+class ImportWarehousesTests(TestCase):
+    """Массовое создание складов командой import_warehouses."""
+
+    def import_file(self, suffix, content, *args):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / f'warehouses{suffix}'
+            path.write_text(content, encoding='utf-8')
+            call_command('import_warehouses', str(path), *args, stdout=StringIO())
+
+    def units_by_size(self, warehouse):
+        return dict(
+            StorageUnit.objects.filter(warehouse=warehouse)
+            .values('size').annotate(count=Count('pk')).values_list('size', 'count')
+        )
+
+    def counters_by_size(self, warehouse):
+        return dict(FreeUnitCounter.objects.filter(warehouse=warehouse).values_list('size', 'free_count'))
+
+    def test_json_import_creates_units_and_counters(self):
+        self.import_file('.json', json.dumps([
+            {'name': 'Склад 1', 'layout': {'small': 3, 'large': 2}},
+            {'name': 'Склад 2', 'warehouse_address': 'ул. Ленина, 1', 'layout': {'medium': 4}},
+            {'name': 'Склад 3', 'layout': {'small': 1}},
+        ]), '--batch-size', '2')
+
+        self.assertEqual(Warehouse.objects.count(), 3)
+        expected = {
+            'Склад 1': {'small': 3, 'large': 2},
+            'Склад 2': {'medium': 4},
+            'Склад 3': {'small': 1},
+        }
+        for warehouse in Warehouse.objects.all():
+            with self.subTest(warehouse=warehouse.name):
+                self.assertEqual(self.units_by_size(warehouse), expected[warehouse.name])
+                self.assertEqual(self.counters_by_size(warehouse), expected[warehouse.name])
+
+    def test_csv_import_creates_units_and_counters(self):
+        self.import_file('.csv', 'name,warehouse_address,small,medium,large\nСклад,,2,,1\n')
+
+        warehouse = Warehouse.objects.get()
+        self.assertEqual(self.units_by_size(warehouse), {'small': 2, 'large': 1})
+        self.assertEqual(self.counters_by_size(warehouse), {'small': 2, 'large': 1})
+
+    def test_unknown_size_is_rejected(self):
+        with self.assertRaises(CommandError):
+            self.import_file('.json', json.dumps([{'name': 'Склад', 'layout': {'small': 1, 'huge': 5}}]))
+        self.assertFalse(Warehouse.objects.exists())
+
+    def test_provision_many_counts_only_known_sizes(self):
+        warehouse, = Warehouse.provision_many([Warehouse(name='Склад', layout={'small': 2, 'huge': 5})])
+
+        self.assertEqual(self.units_by_size(warehouse), {'small': 2})
+        self.assertEqual(self.counters_by_size(warehouse), {'small': 2})
+
+
+class ReminderClaimTests(TransactionTestCase):
+    """Отметка заказов, по которым пора отправить напоминание.
+
+    TransactionTestCase: check_and_send_reminders обращается к базе из пула потоков.
+    """
+
+    def setUp(self):
+        warehouse = Warehouse.objects.create(name='Склад', layout={'small': 2, 'medium': 0, 'large': 0})
+        user = User.objects.create(name='Клиент', phone_number='+79990000000')
+        self.now = timezone.now()
+        unit, other_unit = StorageUnit.objects.filter(warehouse=warehouse).order_by('pk')
+        self.due = Order.objects.create(
+            user=user, storage_unit=unit, start_date=self.now - timedelta(days=1), storage_duration=10
+        )
+        Order.objects.create(
+            user=user, storage_unit=other_unit, start_date=self.now - timedelta(days=1), storage_duration=60
+        )
+
+    def test_second_claim_gets_nothing(self):
+        claimed = claim_due_reminders(self.now)
+        self.assertEqual([reminder['order_id'] for reminder in claimed], [self.due.order_id])
+        self.due.refresh_from_db()
+        self.assertEqual(self.due.reminder_sent_at, self.now)
+
+        self.assertEqual(claim_due_reminders(self.now + timedelta(seconds=1)), [])
+
+    def test_released_reminder_is_claimed_again(self):
+        claim_due_reminders(self.now)
+        release_reminders([self.due.order_id])
+
+        self.due.refresh_from_db()
+        self.assertIsNone(self.due.reminder_sent_at)
+        retried_at = self.now + timedelta(seconds=1)
+        claimed = claim_due_reminders(retried_at)
+        self.assertEqual([reminder['order_id'] for reminder in claimed], [self.due.order_id])
+
+    def test_failed_send_is_released(self):
+        sent_to = []
+
+        async def send_message(chat_id, text, rate_limit_args=None):
+            sent_to.append(chat_id)
+            raise TelegramError('Сеть недоступна')
+
+        context = SimpleNamespace(bot=SimpleNamespace(send_message=send_message))
+        asyncio.run(check_and_send_reminders(context))
+
+        self.assertEqual(sent_to, [self.due.user_id])
+        self.due.refresh_from_db()
+        self.assertIsNone(self.due.reminder_sent_at)
+
+
+class OrderDatesTests(SimpleTestCase):
+    """Даты окончания аренды и напоминания у заказа."""
+
+    def test_unsaved_order_is_expired_by_duration(self):
+        now = timezone.now()
+        self.assertTrue(Order(start_date=now - timedelta(days=11), storage_duration=10).is_expired())
+        self.assertFalse(Order(start_date=now - timedelta(days=9), storage_duration=10).is_expired())
+
+
+class OrderDatesMigrationTests(TransactionTestCase):
+    """Заполнение дат окончания аренды и напоминания миграцией 0030."""
+
+    migrate_from = [('reservations', '0029_order_reminder_sent_at')]
+    migrate_to = [('reservations', '0030_order_end_date_reminder_date')]
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        self.latest = executor.loader.graph.leaf_nodes('reservations')
+        executor.migrate(self.migrate_from)
+        self.addCleanup(self.migrate_to_latest)
+
+    def migrate_to_latest(self):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(self.latest)
+
+    def test_dates_are_filled(self):
+        apps = MigrationExecutor(connection).loader.project_state(self.migrate_from).apps
+        warehouse = apps.get_model('reservations', 'Warehouse').objects.create(name='Склад')
+        unit = apps.get_model('reservations', 'StorageUnit').objects.create(warehouse=warehouse, size='small')
+        user = apps.get_model('reservations', 'User').objects.create(name='Клиент', phone_number='+79990000000')
+        start_date = timezone.now()
+        orders = {
+            duration: apps.get_model('reservations', 'Order').objects.create(
+                user=user, storage_unit=unit, start_date=start_date, storage_duration=duration
+            ).pk
+            for duration in (7, 60)
+        }
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_to)
+        apps = executor.loader.project_state(self.migrate_to).apps
+        Order = apps.get_model('reservations', 'Order')
+
+        short = Order.objects.get(pk=orders[7])
+        self.assertEqual(short.end_date, start_date + timedelta(days=7))
+        self.assertEqual(short.reminder_date, start_date)
+        long = Order.objects.get(pk=orders[60])
+        self.assertEqual(long.end_date, start_date + timedelta(days=60))
+        self.assertEqual(long.reminder_date, start_date + timedelta(days=46))
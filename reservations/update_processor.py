@@ -0,0 +1,131 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Deque, Dict, Hashable, Optional
+
+from telegram.ext import BaseUpdateProcessor
+
+# Сколько обновлений может ожидать обработки, прежде чем приложение перестанет
+# забирать новые из очереди
+DEFAULT_MAX_PENDING_UPDATES = 4096
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Обработчик очереди обновлений: по порядку внутри чата, параллельно между чатами.
+
+    Обновления одного чата выполняются строго последовательно в порядке поступления,
+    поэтому состояния ConversationHandler и `context.user_data` не портятся.
+    Обновления разных чатов выполняются параллельно, но не более `workers` одновременно.
+
+    Атрибуты:
+        workers (int): Количество одновременно обрабатываемых обновлений.
+
+    Методы:
+        stats(): Возвращает статистику очереди: глубину и время ожидания.
+    """
+
+    def __init__(self, workers: int, max_pending_updates: int = DEFAULT_MAX_PENDING_UPDATES) -> None:
+        super().__init__(max(max_pending_updates, workers))
+        if workers < 1:
+            raise ValueError("Количество обработчиков должно быть положительным.")
+        self.workers = workers
+        self._workers_semaphore = asyncio.BoundedSemaphore(workers)
+        self._chat_queues: Dict[Hashable, Deque[asyncio.Future]] = {}
+        self._pending = 0
+        self._running = 0
+        self._processed = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    @staticmethod
+    def _chat_key(update: object) -> Optional[Hashable]:
+        """Возвращает ключ, по которому сериализуются обновления (ID чата)."""
+        chat = getattr(update, 'effective_chat', None)
+        if chat is not None:
+            return chat.id
+        user = getattr(update, 'effective_user', None)
+        if user is not None:
+            return user.id
+        return None
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        """Дожидается очереди чата и свободного обработчика, затем обрабатывает обновление.
+
+        Args:
+            update (object): Обновление от Telegram.
+            coroutine (Awaitable): Корутина обработки обновления.
+        """
+        key = self._chat_key(update)
+        enqueued_at = time.monotonic()
+        turn = None
+        started = False
+        self._pending += 1
+
+        if key is not None:
+            turn = asyncio.get_running_loop().create_future()
+            queue = self._chat_queues.setdefault(key, deque())
+            queue.append(turn)
+            if len(queue) == 1:
+                turn.set_result(None)
+
+        try:
+            if turn is not None:
+                await turn
+            async with self._workers_semaphore:
+                started = True
+                self._record_start(enqueued_at)
+                try:
+                    await coroutine
+                finally:
+                    self._running -= 1
+                    self._processed += 1
+        finally:
+            if not started:
+                self._pending -= 1
+                coroutine.close()
+            if turn is not None:
+                self._release_turn(key, turn)
+
+    def _record_start(self, enqueued_at: float) -> None:
+        """Учитывает время ожидания обновления перед началом обработки."""
+        wait = time.monotonic() - enqueued_at
+        self._pending -= 1
+        self._running += 1
+        self._total_wait += wait
+        self._max_wait = max(self._max_wait, wait)
+
+    def _release_turn(self, key: Hashable, turn: asyncio.Future) -> None:
+        """Убирает обновление из очереди чата и передает очередь следующему."""
+        queue = self._chat_queues[key]
+        was_first = queue[0] is turn
+        queue.remove(turn)
+        if not queue:
+            del self._chat_queues[key]
+        elif was_first and not queue[0].done():
+            queue[0].set_result(None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Возвращает статистику обработки обновлений.
+
+        Returns:
+            Dict[str, Any]: Количество ожидающих и выполняемых обновлений, число чатов
+            в очереди, максимальная глубина очереди чата, количество обработанных
+            обновлений, среднее и максимальное время ожидания в секундах.
+        """
+        started = self._processed + self._running
+        return {
+            'workers': self.workers,
+            'pending': self._pending,
+            'running': self._running,
+            'queued_chats': len(self._chat_queues),
+            'max_chat_queue_depth': max((len(q) for q in self._chat_queues.values()), default=0),
+            'processed': self._processed,
+            'avg_wait': self._total_wait / started if started else 0.0,
+            'max_wait': self._max_wait,
+        }
+
+    async def initialize(self) -> None:
+        """Ничего не делает: ресурсы создаются в конструкторе."""
+
+    async def shutdown(self) -> None:
+        """Ничего не делает: обработка завершается вместе с приложением."""
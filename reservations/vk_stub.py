@@ -0,0 +1,164 @@
+import itertools
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlparse
+
+# Адрес, на который заглушка выдает сокращенные ссылки
+STUB_SHORT_URL = 'https://vk.cc/'
+
+_CALL_RE = re.compile(r'API\.([\w.]+)\(')
+
+
+class StubAPIError(Exception):
+    """Ошибка метода API в заглушке."""
+
+    def __init__(self, code: int, message: str) -> None:
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class VKStubServer(ThreadingHTTPServer):
+    """Локальная заглушка API VK для разработки и проверок без сети.
+
+    Отвечает на методы utils.getShortLink, utils.getLinkStats и execute
+    в формате VK. Клиент направляется на заглушку переменной окружения
+    VK_API_BASE_URL, например http://127.0.0.1:8766/method/.
+
+    Атрибуты:
+        token (str, optional): Ожидаемый токен доступа; если не задан, принимается любой.
+        links (Dict[str, str]): Ключи сокращенных ссылок и исходные адреса.
+        clicks (Dict[str, int]): Количество кликов по ключам ссылок.
+        fail_requests (int): Сколько следующих запросов завершить ответом 503.
+        requests_count (int): Сколько запросов получила заглушка.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int] = ('127.0.0.1', 8766), token: Optional[str] = None) -> None:
+        super().__init__(address, VKStubHandler)
+        self.token = token
+        self.links: Dict[str, str] = {}
+        self.clicks: Dict[str, int] = {}
+        self.fail_requests = 0
+        self.requests_count = 0
+        self._keys = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def start(self) -> threading.Thread:
+        """Запускает заглушку в фоновом потоке.
+
+        Returns:
+            threading.Thread: Поток, обслуживающий запросы.
+        """
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+    def add_clicks(self, short_url: str, count: int = 1) -> None:
+        """Добавляет клики по сокращенной ссылке."""
+        key = urlparse(short_url).path[1:]
+        with self._lock:
+            self.clicks[key] = self.clicks.get(key, 0) + count
+
+    def call_method(self, method: str, params: Dict[str, Any]) -> Any:
+        """Выполняет метод API и возвращает его результат.
+
+        Raises:
+            StubAPIError: Если метод завершился ошибкой VK.
+        """
+        if method == 'utils.getShortLink':
+            if not params.get('url'):
+                raise StubAPIError(100, 'One of the parameters specified was missing or invalid: url is undefined')
+            with self._lock:
+                key = format(next(self._keys), 'x')
+                self.links[key] = params['url']
+            return {'short_url': STUB_SHORT_URL + key, 'url': params['url'], 'key': key, 'access_key': ''}
+        if method == 'utils.getLinkStats':
+            key = params.get('key', '')
+            if key not in self.links:
+                raise StubAPIError(100, 'One of the parameters specified was missing or invalid: key is invalid')
+            views = self.clicks.get(key, 0)
+            return {'key': key, 'stats': [{'timestamp': 0, 'views': views}] if views else []}
+        raise StubAPIError(3, 'Unknown method passed')
+
+    def execute(self, code: str) -> Tuple[List[Any], List[Dict[str, Any]]]:
+        """Выполняет код вида `return [API.method({...}), ...];`.
+
+        Returns:
+            Tuple[List[Any], List[Dict[str, Any]]]: Результаты методов (False для
+            завершившихся ошибкой) и ошибки в формате execute_errors.
+        """
+        decoder = json.JSONDecoder()
+        results: List[Any] = []
+        errors: List[Dict[str, Any]] = []
+        position = 0
+        while True:
+            match = _CALL_RE.search(code, position)
+            if not match:
+                break
+            params, position = decoder.raw_decode(code, match.end())
+            try:
+                results.append(self.call_method(match.group(1), params))
+            except StubAPIError as error:
+                results.append(False)
+                errors.append({'method': match.group(1), 'error_code': error.code, 'error_msg': error.message})
+        return results, errors
+
+
+class VKStubHandler(BaseHTTPRequestHandler):
+    """Обработчик запросов к заглушке API VK (GET и POST /method/<название>)."""
+
+    server: VKStubServer
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self) -> None:
+        self._handle(dict(parse_qsl(urlparse(self.path).query)))
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length).decode()
+        params = dict(parse_qsl(urlparse(self.path).query))
+        params.update(parse_qsl(body))
+        self._handle(params)
+
+    def _handle(self, params: Dict[str, Any]) -> None:
+        server = self.server
+        with server._lock:
+            server.requests_count += 1
+            fail = server.fail_requests > 0
+            if fail:
+                server.fail_requests -= 1
+        if fail:
+            self._send(503, {'error': 'Service Unavailable'})
+            return
+
+        method = urlparse(self.path).path.rsplit('/', 1)[-1]
+        if server.token is not None and params.get('access_token') != server.token:
+            self._send(200, {'error': {'error_code': 5, 'error_msg': 'User authorization failed: invalid access_token'}})
+            return
+        if method == 'execute':
+            results, errors = server.execute(params.get('code', ''))
+            payload: Dict[str, Any] = {'response': results}
+            if errors:
+                payload['execute_errors'] = errors
+            self._send(200, payload)
+            return
+        try:
+            self._send(200, {'response': server.call_method(method, params)})
+        except StubAPIError as error:
+            self._send(200, {'error': {'error_code': error.code, 'error_msg': error.message}})
+
+    def _send(self, status: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
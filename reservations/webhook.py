@@ -0,0 +1,131 @@
+import hmac
+import json
+import logging
+from typing import Any, Callable, Optional
+
+from django.http import HttpRequest, HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from environs import Env
+from telegram import Update
+from telegram.ext import Application
+
+logger = logging.getLogger(__name__)
+
+SECRET_TOKEN_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+_application: Optional[Application] = None
+_secret_token: Optional[str] = None
+
+
+def is_webhook_mode(env: Env) -> bool:
+    """Проверяет, включен ли режим приема обновлений через вебхук.
+
+    Args:
+        env (Env): Переменные окружения.
+
+    Returns:
+        bool: True, если задан адрес вебхука TG_WEBHOOK_URL.
+    """
+    return bool(env.str('TG_WEBHOOK_URL', ''))
+
+
+async def start_webhook_bot() -> None:
+    """Запускает бота в режиме вебхука внутри ASGI-приложения.
+
+    Создает приложение бота без long polling, запускает обработку очереди
+    обновлений и регистрирует вебхук в Telegram с секретным токеном.
+    """
+    global _application, _secret_token
+    from reservations.bot import create_application
+
+    env = Env()
+    env.read_env()
+    if not is_webhook_mode(env):
+        return
+
+    _secret_token = env.str('TG_WEBHOOK_SECRET')
+    application = create_application(env, webhook=True)
+    # post_init и post_shutdown вызываются вручную, как это делает run_polling
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    await application.start()
+    await application.bot.set_webhook(
+        url=env.str('TG_WEBHOOK_URL'),
+        secret_token=_secret_token,
+        allowed_updates=Update.ALL_TYPES,
+    )
+    _application = application
+    logger.info("Бот запущен в режиме вебхука")
+
+
+async def stop_webhook_bot() -> None:
+    """Останавливает бота, запущенного в режиме вебхука."""
+    global _application
+    if _application is None:
+        return
+    application, _application = _application, None
+    await application.stop()
+    await application.shutdown()
+    if application.post_shutdown:
+        await application.post_shutdown(application)
+
+
+async def handle_lifespan(receive: Callable, send: Callable) -> None:
+    """Обрабатывает события жизненного цикла ASGI-сервера.
+
+    При запуске сервера запускает бота в режиме вебхука, при остановке - останавливает.
+
+    Args:
+        receive (Callable): Функция получения событий ASGI.
+        send (Callable): Функция отправки событий ASGI.
+    """
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            try:
+                await start_webhook_bot()
+            except Exception as e:
+                logger.exception("Не удалось запустить бота в режиме вебхука")
+                await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                return
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await stop_webhook_bot()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+@csrf_exempt
+@require_POST
+async def telegram_webhook(request: HttpRequest) -> HttpResponse:
+    """Принимает обновления Telegram и передает их во внутреннюю очередь бота.
+
+    Проверяет секретный токен вебхука и отвечает сразу, не дожидаясь обработки
+    обновления.
+
+    Args:
+        request (HttpRequest): Запрос от серверов Telegram.
+
+    Returns:
+        HttpResponse: 200 - обновление принято, 403 - неверный секретный токен,
+        400 - некорректное тело запроса, 503 - бот не запущен.
+    """
+    if _application is None:
+        return HttpResponse(status=503)
+
+    secret_token = request.headers.get(SECRET_TOKEN_HEADER, '')
+    if not hmac.compare_digest(secret_token.encode(), _secret_token.encode()):
+        return HttpResponse(status=403)
+
+    try:
+        data: Any = json.loads(request.body)
+        update = Update.de_json(data, _application.bot)
+    except (ValueError, TypeError, KeyError):
+        return HttpResponse(status=400)
+    if update is None:
+        return HttpResponse(status=400)
+
+    _application.update_queue.put_nowait(update)
+    return HttpResponse(status=200)
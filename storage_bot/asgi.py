@@ -13,4 +13,18 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'storage_bot.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from reservations.webhook import handle_lifespan  # noqa: E402
+
+
+async def application(scope, receive, send):
+    """ASGI-приложение Django с запуском Telegram-бота в режиме вебхука.
+
+    События lifespan запускают и останавливают бота, остальные запросы
+    обрабатывает Django.
+    """
+    if scope['type'] == 'lifespan':
+        await handle_lifespan(receive, send)
+        return
+    await django_application(scope, receive, send)
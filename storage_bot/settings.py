@@ -78,6 +78,29 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Сколько секунд ждать освобождения базы другими транзакциями.
+            # Бронирование начинает транзакцию с BEGIN IMMEDIATE
+            # (см. reservations.allocation.reservation_transaction)
+            'timeout': 20,
+        },
+        # Тесты работают с файлом, чтобы параллельные подключения блокировали базу как в работе
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
+    }
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+# Бот и админка работают в разных процессах, поэтому кэш хранится в файлах:
+# сброс кэша сводки при изменении заказов в боте виден и в админке
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
     }
 }
 
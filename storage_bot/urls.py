@@ -1,7 +1,12 @@
 from django.contrib import admin
 from django.urls import path
 
+from reservations.redirects import link_redirect
+from reservations.webhook import telegram_webhook
+
 urlpatterns = [
+    path('telegram/webhook/', telegram_webhook, name='telegram_webhook'),
+    path('l/<str:code>/', link_redirect, name='link_redirect'),
     # path('admin/', admin.site.urls),
     path('', admin.site.urls),
     